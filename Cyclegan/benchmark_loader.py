@@ -0,0 +1,59 @@
+"""Measure the throughput of the training data loader for combinations of loader options.
+
+Every combination of '--threads_list', '--prefetch_list', '--persistent_list' and '--cache_mb_list' creates the
+dataset and its DataLoader as train.py does and reads '--bench_epochs' epochs. The first epoch includes starting the
+loader threads and filling the decoded-sample cache (data/sample_cache.py); the later epochs show the steady state.
+Only the loading is timed: no model is created, so the numbers are an upper bound of the training speed.
+
+Example:
+    python benchmark_loader.py --dataroot datasets/maps --dataset_mode single --batch_size 4
+    python benchmark_loader.py --dataroot datasets/maps --dataset_mode single --threads_list 2,4,8 --cache_mb_list 0,2048 --bench_batches 200
+
+See options/benchmark_options.py for more options.
+"""
+
+import copy
+import itertools
+import time
+
+from data import CustomDatasetDataLoader
+from options.benchmark_options import LoaderBenchmarkOptions
+
+
+def int_list(values):
+    return [int(value) for value in values.split(",") if value.strip()]
+
+
+def measure(opt):
+    """Return the samples/s of every epoch, and the cache statistics, of a loader created with <opt>."""
+    loader = CustomDatasetDataLoader(opt)
+    rates = []
+    for epoch in range(opt.bench_epochs):
+        loader.set_epoch(epoch)
+        samples = 0
+        start = time.perf_counter()
+        for i, data in enumerate(loader):
+            samples += len(data["A"])
+            if opt.bench_batches and i + 1 >= opt.bench_batches:
+                break
+        rates.append(samples / (time.perf_counter() - start))
+    cache = getattr(loader.dataset, "sample_cache", None)
+    return rates, cache.stats() if cache is not None else None
+
+
+if __name__ == "__main__":
+    opt = LoaderBenchmarkOptions().parse()  # get benchmark options
+    results = []
+    for threads, prefetch, persistent, cache_mb in itertools.product(int_list(opt.threads_list), int_list(opt.prefetch_list), int_list(opt.persistent_list), int_list(opt.cache_mb_list)):
+        if threads == 0 and (prefetch != int_list(opt.prefetch_list)[0] or persistent):
+            continue  # prefetching and persistence need loader threads
+        run_opt = copy.copy(opt)
+        run_opt.num_threads, run_opt.prefetch_factor, run_opt.persistent_workers, run_opt.sample_cache_mb = threads, prefetch, bool(persistent), cache_mb
+        label = f"--num_threads {threads}{f' --prefetch_factor {prefetch}' if threads else ''}{' --persistent_workers' if persistent else ''} --sample_cache_mb {cache_mb}"
+        rates, stats = measure(run_opt)
+        steady = sum(rates[1:]) / len(rates[1:]) if len(rates) > 1 else rates[0]
+        results.append((steady, label))
+        cache_message = f", cache: {stats['images']} images, {stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions" if stats else ""
+        print(f"{label}: first epoch {rates[0]:.1f} samples/s, later epochs {steady:.1f} samples/s{cache_message}")
+    steady, label = max(results)
+    print(f"fastest: {label} ({steady:.1f} samples/s after the first epoch)")
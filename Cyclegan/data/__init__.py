@@ -17,6 +17,9 @@ from torch.utils.data.distributed import DistributedSampler
 import torch.distributed as dist
 import os
 from data.base_dataset import BaseDataset
+from data.bucket_sampler import bucket_loader_args, collate_buckets
+from data.inference_sampler import InferenceSampler
+from functools import partial
 
 
 def find_dataset_using_name(dataset_name):
@@ -75,6 +78,31 @@ class CustomDatasetDataLoader:
         dataset_class = find_dataset_using_name(opt.dataset_mode)
         self.dataset = dataset_class(opt)
         print("dataset [%s] was created" % type(self.dataset).__name__)
+        self.dataloader = self.create_dataloader()
+
+    def create_dataloader(self):
+        """Create the multi-threaded data loader of <self.dataset>."""
+        opt = self.opt
+        # Packed shards: every loader worker reads its own region of the shard files; see data/shard_dataset.py
+        if hasattr(self.dataset, "worker_batch_sampler") and "LOCAL_RANK" not in os.environ:
+            self.sampler = None
+            granularity = getattr(opt, "bucket_granularity", 0)
+            batch_sampler = self.dataset.worker_batch_sampler(opt.batch_size, int(opt.num_threads), not opt.serial_batches, granularity)
+            return torch.utils.data.DataLoader(self.dataset, batch_sampler=batch_sampler, collate_fn=partial(collate_buckets, granularity=granularity), **self.loader_kwargs())
+
+        # Distributed inference: every rank loads its own deterministic share of the inputs; see data/inference_sampler.py
+        if not opt.isTrain and dist.is_initialized():
+            self.sampler = InferenceSampler(self.dataset)
+            if opt.batch_size > 1 and hasattr(self.dataset, "output_size"):
+                loader_args = bucket_loader_args(self.dataset, opt.batch_size, getattr(opt, "bucket_granularity", 0), list(self.sampler))
+                return torch.utils.data.DataLoader(self.dataset, **loader_args, **self.loader_kwargs())
+            return torch.utils.data.DataLoader(self.dataset, batch_size=opt.batch_size, sampler=self.sampler, **self.loader_kwargs())
+
+        # At test time, batches are made of images of equal (or padded-to-equal) size; see data/bucket_sampler.py
+        if not opt.isTrain and opt.batch_size > 1 and hasattr(self.dataset, "output_size"):
+            self.sampler = None
+            loader_args = bucket_loader_args(self.dataset, opt.batch_size, getattr(opt, "bucket_granularity", 0))
+            return torch.utils.data.DataLoader(self.dataset, **loader_args, **self.loader_kwargs())
 
         # Use DistributedSampler for DDP training
         if "LOCAL_RANK" in os.environ:
@@ -85,23 +113,46 @@ class CustomDatasetDataLoader:
             self.sampler = None
             shuffle = not opt.serial_batches
 
-        self.dataloader = torch.utils.data.DataLoader(self.dataset, batch_size=opt.batch_size, shuffle=shuffle, sampler=self.sampler, num_workers=int(opt.num_threads))
+        return torch.utils.data.DataLoader(self.dataset, batch_size=opt.batch_size, shuffle=shuffle, sampler=self.sampler, **self.loader_kwargs())
+
+    def loader_kwargs(self):
+        """Return the worker, prefetching and memory-pinning arguments of the DataLoader, from the options."""
+        num_workers = int(self.opt.num_threads)
+        kwargs = {"num_workers": num_workers, "pin_memory": getattr(self.opt, "pin_memory", False) and torch.cuda.is_available()}
+        if num_workers > 0:  # only valid with worker processes
+            kwargs["persistent_workers"] = getattr(self.opt, "persistent_workers", False)
+            kwargs["prefetch_factor"] = getattr(self.opt, "prefetch_factor", 2)
+        return kwargs
+
+    def skip(self, paths):
+        """Leave the inputs in <paths> out of the following epochs, e.g. results that a resumed test run already has."""
+        self.dataset.A_paths = [path for path in self.dataset.A_paths if path not in paths]
+        self.dataloader = self.create_dataloader()
 
     def load_data(self):
         return self
 
     def __len__(self):
-        """Return the number of data in the dataset"""
+        """Return the number of data in the dataset (in a distributed run: in this rank's share of it)"""
+        if self.sampler is not None:
+            return min(len(self.sampler), self.opt.max_dataset_size)
         return min(len(self.dataset), self.opt.max_dataset_size)
 
     def __iter__(self):
         """Return a batch of data"""
         for i, data in enumerate(self.dataloader):
-            if i * self.opt.batch_size >= self.opt.max_dataset_size:
+            # (size-bucketed test batches can be partial; there the dataset itself holds at most max_dataset_size images)
+            if self.dataloader.batch_size is not None and i * self.opt.batch_size >= self.opt.max_dataset_size:
                 break
             yield data
 
     def set_epoch(self, epoch):
-        """Set epoch for DistributedSampler to ensure proper shuffling"""
+        """Set epoch for DistributedSampler (and datasets that redraw their samples every epoch) to ensure proper shuffling
+
+        Call it before every epoch of a distributed run: the ranks shuffle with the same seed plus the epoch, so that
+        their shares stay disjoint, and without it every epoch repeats the order of the first one.
+        """
         if self.sampler is not None:
             self.sampler.set_epoch(epoch)
+        if hasattr(self.dataset, "set_epoch"):  # e.g. the A/B pairs of the unaligned dataset
+            self.dataset.set_epoch(epoch)
@@ -3,6 +3,8 @@
 It also includes common transformation functions (e.g., get_transform, __scale_width), which can be later used in subclasses.
 """
 
+import hashlib
+import io
 import random
 import numpy as np
 import torch.utils.data as data
@@ -48,6 +50,24 @@ class BaseDataset(data.Dataset, ABC):
         """Return the total number of images in the dataset."""
         return 0
 
+    def load_image(self, path):
+        """Return the image at <path> as an RGB PIL image, through the decoded-sample cache if the dataset has one.
+
+        A dataset enables the cache by setting <self.sample_cache> (see data/sample_cache.py and '--sample_cache_mb').
+        """
+        cache = getattr(self, "sample_cache", None)
+        return cache.load(path) if cache is not None else Image.open(path).convert("RGB")
+
+    def load_image_hashed(self, path):
+        """Return (RGB PIL image, hex SHA-256 of the file) of the image at <path>, reading the file once.
+
+        Used when the run records what it read (opt.hash_inputs, set by test.py for its manifest); the decoded-sample
+        cache is bypassed, since it does not keep the file bytes.
+        """
+        with open(path, "rb") as f:
+            content = f.read()
+        return Image.open(io.BytesIO(content)).convert("RGB"), hashlib.sha256(content).hexdigest()
+
     @abstractmethod
     def __getitem__(self, index):
         """Return a data point and its metadata information.
@@ -113,6 +133,24 @@ def get_transform(opt, params=None, grayscale=False, method=transforms.Interpola
     return transforms.Compose(transform_list)
 
 
+def get_output_size(opt, size):
+    """Return the (height, width) of the tensor that <get_transform(opt)> makes of an image of PIL size (w, h).
+
+    Computed from the image header alone, this lets test-time batching group images by size without decoding them.
+    The size of the loaded tensor is checked against the batch's bucket by <collate_buckets> (data/bucket_sampler.py).
+    """
+    w, h = size
+    if "resize" in opt.preprocess:
+        w = h = opt.load_size
+    elif "scale_width" in opt.preprocess and not (w == opt.load_size and h >= opt.crop_size):
+        w, h = opt.load_size, int(max(opt.load_size * h / w, opt.crop_size))
+    if "crop" in opt.preprocess:
+        w = h = opt.crop_size
+    if opt.preprocess == "none":
+        w, h = int(round(w / 4) * 4), int(round(h / 4) * 4)
+    return h, w
+
+
 def __transforms2pil_resize(method):
     mapper = {
         transforms.InterpolationMode.BILINEAR: Image.BILINEAR,
@@ -0,0 +1,92 @@
+"""Batching of test-time images by size.
+
+Test images keep their own size (e.g. with '--preprocess none' or 'scale_width'), so a batch can only hold images
+whose tensors have the same shape. <BucketBatchSampler> groups the dataset into buckets of equal output size and cuts
+every bucket into batches; images are never resized to make them fit.
+
+With a <granularity> > 0, sizes are rounded up to a multiple of it, so images of similar size share a bucket:
+<collate_buckets> pads each image (reflection, at the right and bottom) to its bucket size and records the original
+size of every image in 'A_sizes', so that <save_images> can crop each result back to it. Padding is not free for
+generators with instance normalization: the padded border takes part in the normalization statistics, so padded
+results differ slightly from unpadded ones. The default (granularity 0) batches equal sizes only and is exact.
+"""
+
+from functools import partial
+
+import torch
+import torch.nn.functional as F
+from torch.utils.data import Sampler
+from torch.utils.data.dataloader import default_collate
+
+
+def bucket_size(size, granularity=0):
+    """Return <size> rounded up to a multiple of <granularity> in both dimensions (unchanged if it is 0)."""
+    if granularity <= 0:
+        return tuple(size)
+    return tuple(-(-s // granularity) * granularity for s in size)
+
+
+class BucketBatchSampler(Sampler):
+    """Yield batches of dataset indices whose images share one bucket size.
+
+    Buckets are visited in the order in which their first image appears, and every bucket keeps the dataset order,
+    so with --serial_batches the run is deterministic. Only the last batch of each bucket can be smaller than
+    <batch_size>.
+    """
+
+    def __init__(self, sizes, batch_size, granularity=0):
+        """Initialize the BucketBatchSampler class
+
+        Parameters:
+            sizes (list)      -- the output size of every image of the dataset, in dataset order
+            batch_size (int)  -- images per batch
+            granularity (int) -- bucket sizes are multiples of this; 0 only batches images of exactly equal size
+        """
+        buckets = {}
+        for index, size in enumerate(sizes):
+            buckets.setdefault(bucket_size(size, granularity), []).append(index)
+        self.batches = [indices[i : i + batch_size] for indices in buckets.values() for i in range(0, len(indices), batch_size)]
+        print(f"batching {len(sizes)} images in {len(buckets)} size buckets ({len(self.batches)} batches)")
+
+    def __iter__(self):
+        return iter(self.batches)
+
+    def __len__(self):
+        return len(self.batches)
+
+
+def collate_buckets(batch, granularity=0):
+    """Stack the images of one bucket into a single 'A' tensor, padded to the bucket size.
+
+    The other entries (paths, ...) are collated as usual; 'A_sizes' holds the (height, width) of every image
+    before padding. The batch was formed from the recorded sizes (<get_output_size> of the image index); an image
+    whose loaded tensor falls in another bucket than the rest of the batch changed since it was measured, and is an
+    error rather than being padded or cropped to a bucket it does not belong to.
+    """
+    sizes = [tuple(item["A"].shape[1:]) for item in batch]
+    buckets = {bucket_size(size, granularity) for size in sizes}
+    if len(buckets) > 1:
+        found = ", ".join(f"{item['A_paths']} ({h}x{w})" for item, (h, w) in zip(batch, sizes))
+        raise ValueError(f"images of one size bucket were loaded at different sizes: {found}; an image changed since its size was recorded")
+    th, tw = bucket_size((max(h for h, _ in sizes), max(w for _, w in sizes)), granularity)
+    images = []
+    for item, (h, w) in zip(batch, sizes):
+        image = item["A"]
+        if (h, w) != (th, tw):
+            mode = "reflect" if th - h < h and tw - w < w else "replicate"  # reflection needs padding < size
+            image = F.pad(image.unsqueeze(0), (0, tw - w, 0, th - h), mode=mode)[0]
+        images.append(image)
+    data = default_collate([{key: value for key, value in item.items() if key != "A"} for item in batch])
+    data["A"] = torch.stack(images)
+    data["A_sizes"] = sizes
+    return data
+
+
+def bucket_loader_args(dataset, batch_size, granularity=0, indices=None):
+    """Return the <batch_sampler> and <collate_fn> arguments of a DataLoader that batches <dataset> (or only its
+    items <indices>, e.g. one rank's share of it) by size."""
+    if indices is None:
+        indices = range(len(dataset))
+    batch_sampler = BucketBatchSampler([dataset.output_size(index) for index in indices], batch_size, granularity)
+    batch_sampler.batches = [[indices[i] for i in batch] for batch in batch_sampler.batches]  # positions in <indices> -> dataset indices
+    return {"batch_sampler": batch_sampler, "collate_fn": partial(collate_buckets, granularity=granularity)}
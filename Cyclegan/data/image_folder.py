@@ -2,8 +2,17 @@
 
 We modify the official PyTorch image folder (https://github.com/pytorch/vision/blob/master/torchvision/datasets/folder.py)
 so that this class can load images from both current directory and its subdirectories.
+
+Listings come from a persistent <ImageIndex> of every image folder (paths, file sizes and image dimensions), so a
+start-up only re-lists the directories that changed since the last one.
 """
 
+import atexit
+import hashlib
+import itertools
+import json
+import os
+import time
 import torch.utils.data as data
 from pathlib import Path
 from PIL import Image
@@ -27,18 +36,150 @@ IMG_EXTENSIONS = [
 
 
 def is_image_file(filename):
-    return any(filename.endswith(extension) for extension in IMG_EXTENSIONS)
+    return filename.endswith(tuple(IMG_EXTENSIONS))
+
+
+class ImageIndex:
+    """A persistent listing of the images below a directory, with their file sizes and image dimensions.
+
+    The index is kept in one JSON file per directory tree under $CYCLEGAN_INDEX_DIR (default
+    $XDG_CACHE_HOME/cyclegan/image_index, with XDG_CACHE_HOME defaulting to ~/.cache) and holds, for every
+    sub-directory, its mtime and its sorted entries (sub-directories and image files). On a refresh, a directory whose
+    mtime is unchanged is not listed again: adding, removing or renaming a file updates the mtime of its directory, so
+    only the directories that changed are re-scanned. Image dimensions are read from the file header the first time
+    they are asked for; <size> checks the file's size and mtime before it returns them from the index, so a file
+    rewritten in place (same name) is measured again.
+
+    The index is written by <save>; the indexes of <get_image_index> are also saved when the process exits.
+    """
+
+    VERSION = 2  # format of the index file; files of another version are ignored
+
+    def __init__(self, root, cache_dir=None):
+        """Initialize the ImageIndex class
+
+        Parameters:
+            root (str)      -- the directory tree to index
+            cache_dir (str) -- where index files are kept (default: $CYCLEGAN_INDEX_DIR or $XDG_CACHE_HOME/cyclegan/image_index)
+        """
+        self.root = Path(root)
+        cache_dir = cache_dir or os.environ.get("CYCLEGAN_INDEX_DIR") or Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "cyclegan" / "image_index"
+        key = hashlib.sha1(str(self.root.resolve()).encode()).hexdigest()[:16]
+        self.cache_path = Path(cache_dir) / f"{key}.json"
+        self.dirs = {}  # relative directory -> {"mtime": mtime_ns or None, "entries": [[name, is_dir, size, mtime_ns, width, height], ...]}
+        self.files = {}  # path (as yielded by <paths>) -> its entry
+        self.dirty = False
+        try:
+            with open(self.cache_path, "rt") as f:
+                cached = json.load(f)
+            if cached.get("version") == self.VERSION and cached.get("root") == str(self.root.resolve()):
+                self.dirs = cached["dirs"]
+        except (OSError, ValueError, KeyError):
+            pass  # no usable index yet: everything is listed
+
+    def _entries(self, rel):
+        """Return the entries of directory <rel>, listing it again only if its mtime changed."""
+        path = self.root / rel
+        mtime = os.stat(path).st_mtime_ns
+        cached = self.dirs.get(rel)
+        if cached is not None and cached["mtime"] == mtime:
+            return cached["entries"]
+        old = {entry[0]: entry for entry in cached["entries"]} if cached is not None else {}
+        entries = []
+        with os.scandir(path) as it:
+            for e in it:
+                if e.is_dir() and not e.is_symlink():  # like Path.rglob, symlinked directories are not followed
+                    entries.append([e.name, 1, 0, 0, 0, 0])
+                elif is_image_file(e.name) and e.is_file():
+                    st = e.stat()
+                    entry = old.get(e.name)
+                    if entry is None or entry[1] or entry[2] != st.st_size or entry[3] != st.st_mtime_ns:
+                        entry = [e.name, 0, st.st_size, st.st_mtime_ns, 0, 0]  # dimensions unknown until asked for
+                    entries.append(entry)
+        entries.sort(key=lambda entry: entry[0])
+        for name in {entry[0] for entry in old.values() if entry[1]} - {entry[0] for entry in entries if entry[1]}:
+            removed = f"{rel}/{name}" if rel else name
+            for key in [key for key in self.dirs if key == removed or key.startswith(removed + "/")]:
+                del self.dirs[key]
+        # a directory changed within the mtime resolution of the scan may change again unnoticed: list it next time too
+        recent = time.time_ns() - mtime < 2_000_000_000
+        self.dirs[rel] = {"mtime": None if recent else mtime, "entries": entries}
+        self.dirty = True
+        return entries
+
+    def _walk(self, rel):
+        prefix = os.path.join(str(self.root / rel), "")  # the paths are spelled like those of Path(root).rglob
+        for entry in self._entries(rel):
+            if entry[1]:
+                yield from self._walk(f"{rel}/{entry[0]}" if rel else entry[0])
+            else:
+                path = prefix + entry[0]
+                self.files[path] = entry
+                yield path
+
+    def paths(self):
+        """Yield the image paths below the root lazily, in the order of sorted(Path(root).rglob("*"))."""
+        return self._walk("")
+
+    def size(self, path):
+        """Return the (width, height) of the image at <path>, from the index if the file is unchanged since it was measured."""
+        entry = self.files.get(path)
+        if entry is not None:
+            st = os.stat(path)
+            if entry[2] != st.st_size or entry[3] != st.st_mtime_ns:  # rewritten in place since it was indexed
+                entry[2:] = [st.st_size, st.st_mtime_ns, 0, 0]
+                self.dirty = True
+            elif entry[4]:
+                return entry[4], entry[5]
+        with Image.open(path) as img:
+            size = img.size
+        if entry is not None:
+            entry[4], entry[5] = size
+            self.dirty = True
+        return size
+
+    def save(self):
+        """Write the index to its cache file if anything changed (atomically; failures only print a warning)."""
+        if not self.dirty:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            with open(tmp_path, "wt") as f:
+                json.dump({"version": self.VERSION, "root": str(self.root.resolve()), "dirs": self.dirs}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.cache_path)
+            self.dirty = False
+        except OSError as e:
+            print(f"warning: could not save the image index {self.cache_path}: {e}")
+
+
+_indexes = {}
+
+
+def get_image_index(dir):
+    """Return the <ImageIndex> of directory <dir>, shared by every dataset of this process."""
+    key = str(dir)
+    if key not in _indexes:
+        _indexes[key] = ImageIndex(dir)
+    return _indexes[key]
+
+
+@atexit.register
+def _save_indexes():
+    """Save the dimensions measured since the listing (by <ImageIndex.size>) when the process exits."""
+    for index in _indexes.values():
+        index.save()
 
 
 def make_dataset(dir, max_dataset_size=float("inf")):
-    images = []
     dir_path = Path(dir)
     assert dir_path.is_dir(), f"{dir} is not a valid directory"
 
-    for path in sorted(dir_path.rglob("*")):
-        if path.is_file() and is_image_file(path.name):
-            images.append(str(path))
-    return images[: min(max_dataset_size, len(images))]
+    index = get_image_index(dir)
+    limit = None if max_dataset_size == float("inf") else int(max_dataset_size)
+    images = list(itertools.islice(index.paths(), limit))  # stops listing once <limit> images are found
+    index.save()
+    return images
 
 
 def default_loader(path):
@@ -0,0 +1,22 @@
+"""Deterministic sharding of a test-time dataset across the ranks of a distributed run (see test.py).
+
+<InferenceSampler> is a DistributedSampler without shuffling and without the padding that DistributedSampler adds
+to give every rank the same number of samples: rank r of N gets the dataset indices r, r + N, r + 2N, ..., so every
+input is stylized exactly once and the split only depends on the dataset order and the number of ranks.
+"""
+
+from torch.utils.data.distributed import DistributedSampler
+
+
+class InferenceSampler(DistributedSampler):
+    """The indices of one rank's share of a dataset, in dataset order (uses the default process group unless
+    <num_replicas> and <rank> are given)."""
+
+    def __init__(self, dataset, num_replicas=None, rank=None):
+        DistributedSampler.__init__(self, dataset, num_replicas=num_replicas, rank=rank, shuffle=False)
+
+    def __iter__(self):
+        return iter(list(DistributedSampler.__iter__(self))[: len(self)])
+
+    def __len__(self):
+        return len(range(self.rank, len(self.dataset), self.num_replicas))
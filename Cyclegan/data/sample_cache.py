@@ -0,0 +1,87 @@
+"""A cache of decoded images in shared memory, for DataLoader workers.
+
+Every epoch, every loader worker decodes the JPEGs/PNGs of its samples again; on datasets of small images the decode
+is the most expensive part of loading. With '--sample_cache_mb N', a dataset keeps the decoded RGB pixels of its
+images in one N MB shared-memory arena, which is created in the main process before the workers start and is seen by
+all of them, and by the workers of later epochs. Random crops and flips are still applied after the cache, so
+augmentation is unchanged.
+
+The arena is filled as a ring: a new image is written after the previous one, wrapping around at the end, and the
+images it overwrites are evicted (first in, first out). When the decoded dataset fits into the arena, every image is
+decoded once; otherwise the cache keeps the most recently decoded N MB. Images larger than the arena are not cached.
+"""
+
+import numpy as np
+import torch
+import torch.multiprocessing as mp
+from PIL import Image
+
+OFFSET, NBYTES, HEIGHT, WIDTH = range(4)
+
+
+class SampleCache:
+    """Decoded RGB images of a fixed set of paths, in shared memory (works with fork and spawn loader workers)."""
+
+    def __init__(self, paths, capacity_bytes):
+        """Initialize the SampleCache class
+
+        Parameters:
+            paths (list)         -- the images that may be cached
+            capacity_bytes (int) -- size of the shared arena
+        """
+        self.keys = {path: i for i, path in enumerate(paths)}
+        self.arena = torch.empty(capacity_bytes, dtype=torch.uint8).share_memory_()
+        self.table = torch.zeros(len(paths), 4, dtype=torch.int64).share_memory_()  # per path: offset, bytes (0: not cached), height, width
+        self.state = torch.zeros(4, dtype=torch.int64).share_memory_()  # write head, hits, misses, evictions
+        self.lock = mp.Lock()
+
+    @staticmethod
+    def from_opt(opt, paths):
+        """Return a cache of <paths> sized by '--sample_cache_mb', or None if the option is 0 (or not defined)."""
+        capacity_mb = getattr(opt, "sample_cache_mb", 0)
+        if capacity_mb <= 0:
+            return None
+        return SampleCache(paths, capacity_mb << 20)
+
+    def load(self, path):
+        """Return the image at <path> as an RGB PIL image, decoding (and caching) it only if it is not cached."""
+        key = self.keys.get(path)
+        if key is None:
+            return Image.open(path).convert("RGB")
+        with self.lock:
+            offset, nbytes, h, w = self.table[key].tolist()
+            if nbytes:
+                pixels = self.arena[offset : offset + nbytes].numpy().copy()  # copied under the lock: the slot may be reused right after
+            self.state[1 if nbytes else 2] += 1
+        if nbytes:
+            return Image.frombuffer("RGB", (w, h), pixels, "raw", "RGB", 0, 1)
+        img = Image.open(path).convert("RGB")
+        self._store(key, img)
+        return img
+
+    def _store(self, key, img):
+        w, h = img.size
+        nbytes = w * h * 3
+        capacity = self.arena.numel()
+        if nbytes > capacity:
+            return
+        with self.lock:
+            if self.table[key, NBYTES]:  # another worker cached it meanwhile
+                return
+            start = int(self.state[0])
+            if start + nbytes > capacity:
+                start = 0
+            end = start + nbytes
+            offsets, sizes = self.table[:, OFFSET], self.table[:, NBYTES]
+            overwritten = (sizes > 0) & (offsets < end) & (offsets + sizes > start)
+            self.state[3] += int(overwritten.sum())
+            sizes[overwritten] = 0
+            self.arena.numpy()[start:end] = np.asarray(img).reshape(-1)
+            self.table[key] = torch.tensor([start, nbytes, h, w])
+            self.state[0] = end
+
+    def stats(self):
+        """Return a dict with the number of cached images, cached bytes, hits, misses and evictions."""
+        sizes = self.table[:, NBYTES]
+        _, hits, misses, evictions = self.state.tolist()
+        return {"images": int((sizes > 0).sum()), "bytes": int(sizes.sum()), "hits": hits, "misses": misses, "evictions": evictions}
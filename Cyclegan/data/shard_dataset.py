@@ -0,0 +1,103 @@
+from data.base_dataset import BaseDataset, get_transform, get_output_size
+from data.bucket_sampler import bucket_size
+from data.shards import ShardReader
+import random
+from torch.utils.data import Sampler
+
+
+class ShardDataset(BaseDataset):
+    """This dataset class loads one set of images from packed shard files (see data/shards.py and pack_shards.py).
+
+    '--dataroot' is a directory written by pack_shards.py. Samples are read through memory maps instead of opening
+    one file per image, and every DataLoader worker reads its own contiguous region of the shards (<ShardBatchSampler>).
+    It can be used wherever '--dataset_mode single' is, e.g. with '--model test'.
+    """
+
+    def __init__(self, opt):
+        """Initialize this dataset class.
+
+        Parameters:
+            opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseDataset.__init__(self, opt)
+        self.reader = ShardReader(opt.dataroot)
+        self.A_paths = self.reader.paths[: min(opt.max_dataset_size, len(self.reader))]
+        self.positions = {path: i for i, path in enumerate(self.reader.paths)}  # source path -> sample in the shards
+        input_nc = self.opt.output_nc if self.opt.direction == "BtoA" else self.opt.input_nc
+        self.transform = get_transform(opt, grayscale=(input_nc == 1))
+
+    def __getitem__(self, index):
+        """Return a data point and its metadata information.
+
+        Parameters:
+            index - - a random integer for data indexing
+
+        Returns a dictionary that contains A and A_paths (and A_sha256 if opt.hash_inputs is set and the index has hashes)
+            A(tensor) - - an image in one domain
+            A_paths(str) - - the path the image was packed from
+            A_sha256(str) - - the hash of that file, from the shard index (the source file is not read)
+        """
+        A_path = self.A_paths[index]
+        A = self.transform(self.reader.image(self.positions[A_path]))
+        if getattr(self.opt, "hash_inputs", False) and self.reader.sha256 is not None:
+            return {"A": A, "A_paths": A_path, "A_sha256": self.reader.content_hash(self.positions[A_path])}
+        return {"A": A, "A_paths": A_path}
+
+    def content_hash(self, path):
+        """Return the hash recorded in the shard index for the source <path> (see util/manifest.py), or None."""
+        return self.reader.content_hash(self.positions[path])
+
+    def output_size(self, index):
+        """Return the (height, width) of the tensor of sample <index>, from the shard index."""
+        return get_output_size(self.opt, self.reader.size(self.positions[self.A_paths[index]]))
+
+    def worker_batch_sampler(self, batch_size, num_workers, shuffle=False, granularity=0):
+        """Return a <ShardBatchSampler> that gives each of <num_workers> loader workers its own region of the shards."""
+        return ShardBatchSampler([self.output_size(i) for i in range(len(self))], batch_size, num_workers, shuffle, granularity)
+
+    def __len__(self):
+        """Return the total number of images in the dataset."""
+        return len(self.A_paths)
+
+
+class ShardBatchSampler(Sampler):
+    """Batch a packed dataset so that each DataLoader worker reads one contiguous region of the shard files.
+
+    The samples (in packing order) are split into <num_workers> contiguous regions, and each region is cut into
+    batches of one bucket size (see data/bucket_sampler.py), so batches also work for images of different sizes.
+    The DataLoader hands batch j to worker j % num_workers, so the batches of the regions are interleaved
+    round-robin: worker k only ever reads region k, front to back (until the shorter regions run out).
+    With <shuffle>, the order within every region is shuffled each epoch; the regions stay disjoint.
+    """
+
+    def __init__(self, sizes, batch_size, num_workers=1, shuffle=False, granularity=0):
+        self.sizes = sizes
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.granularity = granularity
+        n, num_workers = len(sizes), max(1, num_workers)
+        bounds = [n * k // num_workers for k in range(num_workers + 1)]
+        self.regions = [list(range(bounds[k], bounds[k + 1])) for k in range(num_workers)]
+
+    def _region_batches(self, region):
+        if self.shuffle:
+            region = random.sample(region, len(region))
+        buckets = {}
+        for index in region:
+            buckets.setdefault(bucket_size(self.sizes[index], self.granularity), []).append(index)
+        return [indices[i : i + self.batch_size] for indices in buckets.values() for i in range(0, len(indices), self.batch_size)]
+
+    def __iter__(self):
+        per_region = [self._region_batches(region) for region in self.regions]
+        for j in range(max((len(batches) for batches in per_region), default=0)):
+            for batches in per_region:
+                if j < len(batches):
+                    yield batches[j]
+
+    def __len__(self):
+        buckets = [{} for _ in self.regions]
+        for counts, region in zip(buckets, self.regions):
+            for index in region:
+                key = bucket_size(self.sizes[index], self.granularity)
+                counts[key] = counts.get(key, 0) + 1
+        return sum(-(-count // self.batch_size) for counts in buckets for count in counts.values())
@@ -0,0 +1,119 @@
+"""Packed image shards: many samples in a few large files, read through memory maps.
+
+A packed directory (written by pack_shards.py) holds
+    shard-00000.bin, shard-00001.bin, ...  -- the payloads of consecutive samples, back to back
+    index.npz                              -- per sample: shard, offset, length, height, width, the source path and the
+                                              SHA-256 of the source file (which identifies the sample to test.py's manifest)
+    shards.json                            -- the payload type and the packing parameters
+
+Payloads are either 'encoded' (the original JPEG/PNG bytes) or 'raw' (decoded RGB pixels, H x W x 3 uint8, optionally
+resized when packing), which trades disk space for skipping the decode at load time. Reading a sample touches one
+contiguous range of one shard file and no file-system metadata.
+"""
+
+import io
+import json
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+
+class ShardWriter:
+    """Append samples to the shard files of a directory and write its index on <close>."""
+
+    def __init__(self, directory, payload="encoded", shard_bytes=1 << 30, **meta):
+        """Initialize the ShardWriter class
+
+        Parameters:
+            directory (str)   -- the output directory
+            payload (str)     -- encoded | raw
+            shard_bytes (int) -- a new shard file is started once the current one reaches this size
+            meta              -- packing parameters recorded in shards.json
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.payload = payload
+        self.shard_bytes = shard_bytes
+        self.meta = meta
+        self.columns = {"shard": [], "offset": [], "length": [], "height": [], "width": [], "paths": [], "sha256": []}
+        self.shard = -1
+        self.file = None
+
+    def add(self, data, size, path, sha256=""):
+        """Append the payload bytes <data> of the image at <path>, whose stored (width, height) is <size> and whose file hashes to <sha256>."""
+        if self.file is None or self.file.tell() >= self.shard_bytes:
+            self._next_shard()
+        self.columns["shard"].append(self.shard)
+        self.columns["offset"].append(self.file.tell())
+        self.columns["length"].append(len(data))
+        self.columns["width"].append(size[0])
+        self.columns["height"].append(size[1])
+        self.columns["paths"].append(str(path))
+        self.columns["sha256"].append(sha256)
+        self.file.write(data)
+
+    def _next_shard(self):
+        if self.file is not None:
+            self.file.close()
+        self.shard += 1
+        self.file = open(self.directory / f"shard-{self.shard:05d}.bin", "wb")
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+        arrays = {key: np.asarray(values, dtype=np.int64) for key, values in self.columns.items() if key not in ("paths", "sha256")}
+        np.savez(self.directory / "index.npz", paths=np.asarray(self.columns["paths"], dtype=str), sha256=np.asarray(self.columns["sha256"], dtype=str), **arrays)
+        with open(self.directory / "shards.json", "wt") as f:
+            json.dump({"payload": self.payload, "shards": self.shard + 1, "samples": len(self.columns["paths"]), **self.meta}, f, indent=2)
+
+
+class ShardReader:
+    """Random access to the samples of a packed directory.
+
+    Shard files are memory-mapped lazily in the process that reads them, so a reader can be handed to DataLoader
+    workers: every worker maps the files itself instead of receiving a copy of their content.
+    """
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "shards.json", "rt") as f:
+            self.meta = json.load(f)
+        self.payload = self.meta["payload"]
+        with np.load(self.directory / "index.npz") as index:
+            self.paths = [str(path) for path in index["paths"]]
+            self.shard, self.offset, self.length = index["shard"], index["offset"], index["length"]
+            self.width, self.height = index["width"], index["height"]
+            self.sha256 = [str(h) or None for h in index["sha256"]] if "sha256" in index.files else None  # packed before hashes were recorded
+        self.maps = {}
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state["maps"] = {}  # memory maps are not sent to other processes; they map the files on first use
+        return state
+
+    def __len__(self):
+        return len(self.paths)
+
+    def size(self, i):
+        """Return the stored (width, height) of sample <i>."""
+        return int(self.width[i]), int(self.height[i])
+
+    def content_hash(self, i):
+        """Return the SHA-256 of the file sample <i> was packed from, or None if the index does not record it."""
+        return self.sha256[i] if self.sha256 is not None else None
+
+    def payload_bytes(self, i):
+        """Return a zero-copy view of the payload of sample <i>."""
+        shard = int(self.shard[i])
+        if shard not in self.maps:
+            self.maps[shard] = np.memmap(self.directory / f"shard-{shard:05d}.bin", dtype=np.uint8, mode="r")
+        offset = int(self.offset[i])
+        return self.maps[shard][offset : offset + int(self.length[i])]
+
+    def image(self, i):
+        """Return sample <i> as an RGB PIL image."""
+        data = self.payload_bytes(i)
+        if self.payload == "raw":
+            return Image.frombuffer("RGB", self.size(i), data, "raw", "RGB", 0, 1)
+        return Image.open(io.BytesIO(data)).convert("RGB")
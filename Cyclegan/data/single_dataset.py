@@ -1,6 +1,6 @@
-from data.base_dataset import BaseDataset, get_transform
-from data.image_folder import make_dataset
-from PIL import Image
+from data.base_dataset import BaseDataset, get_transform, get_output_size
+from data.image_folder import get_image_index, make_dataset
+from data.sample_cache import SampleCache
 
 
 class SingleDataset(BaseDataset):
@@ -17,6 +17,7 @@ class SingleDataset(BaseDataset):
         """
         BaseDataset.__init__(self, opt)
         self.A_paths = sorted(make_dataset(opt.dataroot, opt.max_dataset_size))
+        self.sample_cache = SampleCache.from_opt(opt, self.A_paths)
         input_nc = self.opt.output_nc if self.opt.direction == "BtoA" else self.opt.input_nc
         self.transform = get_transform(opt, grayscale=(input_nc == 1))
 
@@ -26,15 +27,23 @@ class SingleDataset(BaseDataset):
         Parameters:
             index - - a random integer for data indexing
 
-        Returns a dictionary that contains A and A_paths
+        Returns a dictionary that contains A and A_paths (and A_sha256 if opt.hash_inputs is set)
             A(tensor) - - an image in one domain
             A_paths(str) - - the path of the image
+            A_sha256(str) - - the hash of the file content that was read
         """
         A_path = self.A_paths[index]
-        A_img = Image.open(A_path).convert("RGB")
+        if getattr(self.opt, "hash_inputs", False):
+            A_img, A_sha256 = self.load_image_hashed(A_path)
+            return {"A": self.transform(A_img), "A_paths": A_path, "A_sha256": A_sha256}
+        A_img = self.load_image(A_path)
         A = self.transform(A_img)
         return {"A": A, "A_paths": A_path}
 
+    def output_size(self, index):
+        """Return the (height, width) of the tensor of image <index>, from the image index (used to batch by size)."""
+        return get_output_size(self.opt, get_image_index(self.opt.dataroot).size(self.A_paths[index]))
+
     def __len__(self):
         """Return the total number of images in the dataset."""
         return len(self.A_paths)
@@ -0,0 +1,81 @@
+from data.base_dataset import BaseDataset, get_transform
+from data.image_folder import make_dataset
+from data.sample_cache import SampleCache
+from pathlib import Path
+import torch
+
+
+class UnalignedDataset(BaseDataset):
+    """
+    This dataset class can load unaligned/unpaired datasets.
+
+    It requires two directories to host training images from domain A '/path/to/data/trainA'
+    and from domain B '/path/to/data/trainB' respectively.
+    You can train the model with the dataset flag '--dataroot /path/to/data'.
+    Similarly, you need to prepare two directories:
+    '/path/to/data/testA' and '/path/to/data/testB' during test time.
+
+    Which B image goes with every A image is decided once per epoch (<set_epoch>) for the whole dataset: a table of
+    (A index, B index) pairs in shared memory, so <__getitem__> only reads one row of it, and loader processes that
+    persist across epochs see the pairs of the new epoch.
+    """
+
+    def __init__(self, opt):
+        """Initialize this dataset class.
+
+        Parameters:
+            opt (Option class) -- stores all the experiment flags; needs to be a subclass of BaseOptions
+        """
+        BaseDataset.__init__(self, opt)
+        self.dir_A = Path(opt.dataroot) / f"{opt.phase}A"  # create a path '/path/to/data/trainA'
+        self.dir_B = Path(opt.dataroot) / f"{opt.phase}B"  # create a path '/path/to/data/trainB'
+
+        self.A_paths = sorted(make_dataset(self.dir_A, opt.max_dataset_size))  # load images from '/path/to/data/trainA'
+        self.B_paths = sorted(make_dataset(self.dir_B, opt.max_dataset_size))  # load images from '/path/to/data/trainB'
+        self.A_size = len(self.A_paths)  # get the size of dataset A
+        self.B_size = len(self.B_paths)  # get the size of dataset B
+        self.sample_cache = SampleCache.from_opt(opt, self.A_paths + self.B_paths)
+        btoA = self.opt.direction == "BtoA"
+        input_nc = self.opt.output_nc if btoA else self.opt.input_nc  # get the number of channels of input image
+        output_nc = self.opt.input_nc if btoA else self.opt.output_nc  # get the number of channels of output image
+        self.transform_A = get_transform(self.opt, grayscale=(input_nc == 1))
+        self.transform_B = get_transform(self.opt, grayscale=(output_nc == 1))
+
+        self.pairs = torch.zeros(len(self), 2, dtype=torch.int64).share_memory_()  # per index: (A index, B index)
+        self.pairs[:, 0] = torch.arange(len(self)) % self.A_size
+        self.seed = int(torch.randint(1 << 31, ()))
+        self.set_epoch(0)
+
+    def set_epoch(self, epoch):
+        """Draw the B partner of every A image for <epoch> (in order with --serial_batches, at random otherwise)."""
+        if self.opt.serial_batches:  # make sure index is within the range
+            self.pairs[:, 1] = torch.arange(len(self)) % self.B_size
+        else:  # randomize the index for domain B to avoid fixed pairs.
+            self.pairs[:, 1] = torch.randint(self.B_size, (len(self),), generator=torch.Generator().manual_seed(self.seed + epoch))
+
+    def __getitem__(self, index):
+        """Return a data point and its metadata information.
+
+        Parameters:
+            index (int)      -- a random integer for data indexing
+
+        Returns a dictionary that contains A, B, A_paths and B_paths
+            A (tensor)       -- an image in the input domain
+            B (tensor)       -- its corresponding image in the target domain
+            A_paths (str)    -- image paths
+            B_paths (str)    -- image paths
+        """
+        index_A, index_B = self.pairs[index].tolist()
+        A_path = self.A_paths[index_A]
+        B_path = self.B_paths[index_B]
+        A = self.transform_A(self.load_image(A_path))
+        B = self.transform_B(self.load_image(B_path))
+        return {"A": A, "B": B, "A_paths": A_path, "B_paths": B_path}
+
+    def __len__(self):
+        """Return the total number of images in the dataset.
+
+        As we have two datasets with potentially different number of images,
+        we take the maximum of the two.
+        """
+        return max(self.A_size, self.B_size)
@@ -87,9 +87,8 @@ class BaseModel(ABC):
         for name in self.model_names:
             if isinstance(name, str):
                 net = getattr(self, "net" + name)
-                net = networks.init_net(net, opt.init_type, opt.init_gain)
 
-                # Load networks if needed
+                # Load networks if needed; random initialization is skipped since every weight gets overwritten
                 if not self.isTrain or opt.continue_train:
                     load_suffix = f"iter_{opt.load_iter}" if opt.load_iter > 0 else opt.epoch
                     load_filename = f"{load_suffix}_net_{name}.pth"
@@ -98,30 +97,29 @@ class BaseModel(ABC):
                     if isinstance(net, torch.nn.parallel.DistributedDataParallel):
                         net = net.module
                     print(f"loading the model from {load_path}")
-
-                    state_dict = torch.load(load_path, map_location=str(self.device), weights_only=True)
-
-                    if hasattr(state_dict, "_metadata"):
-                        del state_dict._metadata
-
-                    # patch InstanceNorm checkpoints
-                    for key in list(state_dict.keys()):
-                        self.__patch_instance_norm_state_dict(state_dict, net, key.split("."))
-                    net.load_state_dict(state_dict)
+                    networks.load_checkpoint(net, load_path, self.device)
+                else:
+                    net = networks.init_net(net, opt.init_type, opt.init_gain)
 
                 # Move network to device
                 net.to(self.device)
 
-                # Wrap networks with DDP after loading
-                if dist.is_initialized():
-                    # Check if using syncbatch normalization for DDP
-                    if self.opt.norm == "syncbatch":
-                        raise ValueError(f"For distributed training, opt.norm must be 'syncbatch' or 'inst', but got '{self.opt.norm}'. " "Please set --norm syncbatch for multi-GPU training.")
+                # Wrap networks with DDP after loading (for training only: distributed inference has no gradients to synchronize)
+                if dist.is_initialized() and self.isTrain:
+                    # Batch statistics have to be synchronized across ranks, and SyncBatchNorm only runs on GPUs
+                    if self.opt.norm == "batch" or (self.opt.norm == "syncbatch" and self.device.type != "cuda"):
+                        raise ValueError(f"For distributed training, opt.norm must be 'syncbatch' (GPU only) or 'instance', but got '{self.opt.norm}' on {self.device.type}. " "Please set --norm syncbatch for multi-GPU training, or --norm instance.")
 
-                    net = torch.nn.parallel.DistributedDataParallel(net, device_ids=[self.device.index])
+                    # device_ids only for GPU ranks; CPU ranks (gloo) keep the module on the CPU
+                    device_ids = [self.device.index] if self.device.type == "cuda" else None
+                    net = torch.nn.parallel.DistributedDataParallel(net, device_ids=device_ids, bucket_cap_mb=getattr(opt, "ddp_bucket_cap_mb", 25), gradient_as_bucket_view=True)
                     # Sync all processes after DDP wrapping
                     dist.barrier()
 
+                # inference precision / memory layout (see options/test_options.py)
+                if not self.isTrain:
+                    net = networks.set_inference_precision(net, getattr(opt, "precision", "fp32"), getattr(opt, "channels_last", False), self.device)
+
                 setattr(self, "net" + name, net)
 
         self.print_networks(opt.verbose)
@@ -206,18 +204,6 @@ class BaseModel(ABC):
                     # 3. Save the final, clean state_dict
                     torch.save(model_to_save.state_dict(), save_path)
 
-    def __patch_instance_norm_state_dict(self, state_dict, module, keys, i=0):
-        """Fix InstanceNorm checkpoints incompatibility (prior to 0.4)"""
-        key = keys[i]
-        if i + 1 == len(keys):  # at the end, pointing to a parameter/buffer
-            if module.__class__.__name__.startswith("InstanceNorm") and (key == "running_mean" or key == "running_var"):
-                if getattr(module, key) is None:
-                    state_dict.pop(".".join(keys))
-            if module.__class__.__name__.startswith("InstanceNorm") and (key == "num_batches_tracked"):
-                state_dict.pop(".".join(keys))
-        else:
-            self.__patch_instance_norm_state_dict(state_dict, getattr(module, key), keys, i + 1)
-
     def load_networks(self, epoch):
         """Load all networks from the disk for DDP."""
 
@@ -230,16 +216,7 @@ class BaseModel(ABC):
                 if isinstance(net, torch.nn.parallel.DistributedDataParallel):
                     net = net.module
                 print(f"loading the model from {load_path}")
-
-                state_dict = torch.load(load_path, map_location=str(self.device), weights_only=True)
-
-                if hasattr(state_dict, "_metadata"):
-                    del state_dict._metadata
-
-                # patch InstanceNorm checkpoints
-                for key in list(state_dict.keys()):
-                    self.__patch_instance_norm_state_dict(state_dict, net, key.split("."))
-                net.load_state_dict(state_dict)
+                networks.load_checkpoint(net, load_path, self.device)
 
         # Add a barrier to sync all processes before continuing
         if dist.is_initialized():
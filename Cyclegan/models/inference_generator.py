@@ -0,0 +1,126 @@
+"""This module converts a trained ResnetGenerator into an inference-only module with uint8 image I/O.
+
+The training graph does several full passes over memory that inference does not need:
+    -- <get_transform> normalizes the input with Normalize((0.5,)*3, (0.5,)*3) before the network runs;
+    -- every conv is preceded by a separate ReflectionPad2d that materializes a padded copy of its input;
+    -- <ResnetBlock.forward> allocates a new tensor for the residual sum;
+    -- <util.tensor2im> rescales the tanh output with (x + 1) / 2 * 255 in numpy and then casts it to uint8.
+
+<to_inference_generator> removes them: the input normalization is folded into the first conv's weights and bias,
+padding is done by the convs themselves (padding_mode='reflect'), residuals are added in place and the output is
+rescaled and quantized in place. The resulting module takes and returns uint8 NxHxWx3 (or HxWx3) tensors.
+With <example> given, the module is additionally traced, frozen and optimized for inference, which pre-packs the
+conv weights for oneDNN on CPU; <PrepackedGenerator> does the same with the first input it is called with.
+
+The output matches <util.tensor2im(net(normalized input))> up to float rounding, i.e. within one intensity level.
+
+Example:
+    >>> fast = to_inference_generator(model.netG)
+    >>> image = fast(torch.from_numpy(np.asarray(Image.open(path).convert("RGB"))))  # uint8 HxWx3 in and out
+"""
+
+import copy
+import torch
+import torch.nn as nn
+from . import networks
+
+
+class InplaceResnetBlock(nn.Module):
+    """ResnetBlock whose skip connection is added in place into the conv block output."""
+
+    def __init__(self, block):
+        super(InplaceResnetBlock, self).__init__()
+        self.conv_block = block.conv_block
+
+    def forward(self, x):
+        return self.conv_block(x).add_(x)
+
+
+class InferenceGenerator(nn.Module):
+    """ResNet generator specialized for inference: uint8 NxHxWxC in, uint8 NxHxWxC out."""
+
+    def __init__(self, model):
+        """Initialize the InferenceGenerator class
+
+        Parameters:
+            model (nn.Sequential) -- converted generator body, without the final Tanh
+        """
+        super(InferenceGenerator, self).__init__()
+        self.model = model
+
+    def forward(self, input):
+        squeeze = input.dim() == 3
+        if squeeze:
+            input = input.unsqueeze(0)
+        x = input.permute(0, 3, 1, 2).float()  # NHWC uint8 -> NCHW float (channels_last strides, no copy of the layout)
+        y = self.model(x).tanh_().add_(1.0).mul_(127.5).clamp_(0, 255)
+        out = y.to(torch.uint8).permute(0, 2, 3, 1).contiguous()
+        return out[0] if squeeze else out
+
+
+def fold_input_normalization(conv, mean=0.5, std=0.5):
+    """Fold <((x / 255) - mean) / std> into <conv> so that it takes raw 0-255 inputs.
+
+    conv(((x / 255) - mean) / std) = (W / (255 * std)) * x + (b - (mean / std) * sum(W))
+    The reflection padding of the conv commutes with this per-pixel affine map, so the fold is exact.
+    """
+    with torch.no_grad():
+        weight = conv.weight.clone()
+        bias = conv.bias.clone() if conv.bias is not None else torch.zeros(conv.out_channels, device=weight.device)
+        conv.weight.copy_(weight / (255.0 * std))
+        new_bias = bias - (mean / std) * weight.sum(dim=(1, 2, 3))
+        if conv.bias is None:
+            conv.bias = nn.Parameter(new_bias)
+        else:
+            conv.bias.copy_(new_bias)
+    return conv
+
+
+def to_inference_generator(net, example=None):
+    """Return an inference-only copy of a ResnetGenerator with uint8 HWC input and output.
+
+    Parameters:
+        net (ResnetGenerator)    -- a loaded generator (left unchanged)
+        example (uint8 tensor)   -- if given, an NxHxWxC input used to trace, freeze and pre-pack the module
+
+    Returns an InferenceGenerator, or a frozen TorchScript module if <example> is given.
+    """
+    if not isinstance(net, networks.ResnetGenerator):
+        raise NotImplementedError("inference conversion is only implemented for ResnetGenerator, got [%s]" % type(net).__name__)
+    net = networks.fold_reflection_padding(copy.deepcopy(net).eval())
+    layers = list(net.model)
+    if not isinstance(layers[-1], nn.Tanh):
+        raise NotImplementedError("expected the generator to end with Tanh")
+    layers = [InplaceResnetBlock(layer) if isinstance(layer, networks.ResnetBlock) else layer for layer in layers[:-1]]
+    first_conv = next(layer for layer in layers if isinstance(layer, nn.Conv2d))
+    fold_input_normalization(first_conv)
+    module = InferenceGenerator(nn.Sequential(*layers)).eval()
+    for param in module.parameters():
+        param.requires_grad_(False)
+    if example is None:
+        return module
+    return prepack(module, example)
+
+
+def prepack(module, example):
+    """Trace <module> with the uint8 NxHxWxC input <example>, then freeze it and optimize it for inference."""
+    with torch.no_grad():
+        traced = torch.jit.trace(module, example, check_trace=False)
+        return torch.jit.optimize_for_inference(torch.jit.freeze(traced))
+
+
+class PrepackedGenerator:
+    """Run an InferenceGenerator as a pre-packed TorchScript module that is traced with its first input.
+
+    Streams (e.g. video frames) only know their frame size once the first frames are decoded, so the trace, freeze and
+    weight pre-packing of <prepack> happen on the first call. Later calls may differ in batch size.
+    """
+
+    def __init__(self, module):
+        self.module = module
+        self.packed = None
+
+    def __call__(self, input):
+        if self.packed is None:
+            self.packed = prepack(self.module, input)
+        return self.packed(input)
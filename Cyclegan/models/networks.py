@@ -2,7 +2,9 @@ import torch
 import torch.nn as nn
 from torch.nn import init
 import functools
+from pathlib import Path
 from torch.optim import lr_scheduler
+from util import util
 
 
 ###############################################################################
@@ -129,6 +131,182 @@ def init_net(net, init_type="normal", init_gain=0.02):
     return net
 
 
+def patch_instance_norm_state_dict(state_dict, net):
+    """Fix InstanceNorm checkpoints incompatibility (prior to 0.4)
+
+    Parameters:
+        state_dict (dict) -- a state dict loaded from disk; patched in place
+        net (network)     -- the network the state dict will be loaded into
+    """
+    for key in list(state_dict.keys()):
+        __patch_instance_norm_state_dict(state_dict, net, key.split("."))
+
+
+def __patch_instance_norm_state_dict(state_dict, module, keys, i=0):
+    key = keys[i]
+    if i + 1 == len(keys):  # at the end, pointing to a parameter/buffer
+        if module.__class__.__name__.startswith("InstanceNorm") and (key == "running_mean" or key == "running_var"):
+            if getattr(module, key) is None:
+                state_dict.pop(".".join(keys))
+        if module.__class__.__name__.startswith("InstanceNorm") and (key == "num_batches_tracked"):
+            state_dict.pop(".".join(keys))
+    else:
+        __patch_instance_norm_state_dict(state_dict, getattr(module, key), keys, i + 1)
+
+
+def safetensors_path(load_path):
+    """Return the path of the converted safetensors checkpoint next to a .pth checkpoint."""
+    return Path(load_path).with_suffix(".safetensors")
+
+
+def load_checkpoint(net, load_path, device="cpu", mmap=True):
+    """Load the weights saved at <load_path> into <net> with as few copies as possible.
+
+    Parameters:
+        net (network)          -- the network to load into; may be built on the meta device (see <TestModel>)
+        load_path (str)        -- a <epoch>_net_<name>.pth checkpoint
+        device (str or device) -- where the loaded tensors are placed
+        mmap (bool)            -- keep CPU weights memory-mapped from the checkpoint file instead of reading them into memory
+
+    A <safetensors_path(load_path)> file written by <convert_checkpoint> is preferred when it is at least as new as the
+    .pth file: it is already patched. Otherwise the .pth file is loaded (legacy non-zip checkpoints cannot be
+    memory-mapped and are always read) and patched with <patch_instance_norm_state_dict>.
+    Parameters of a meta-device network are replaced by the loaded tensors (assign=True) instead of copied into.
+
+    With <mmap>, CPU parameters stay backed by a mapping of the checkpoint file: if the file is later overwritten in
+    place, the network reads the new (possibly half-written) bytes or dies with SIGBUS. Long-lived networks whose
+    checkpoints may be replaced while they serve (serving/registry.py) are therefore loaded with mmap=False.
+    """
+    load_path = Path(load_path)
+    converted = safetensors_path(load_path)
+    state_dict = None
+    if converted.is_file() and (not load_path.is_file() or converted.stat().st_mtime >= load_path.stat().st_mtime):
+        try:
+            from safetensors.torch import load, load_file
+        except ImportError:
+            print(f"safetensors is not installed, ignoring {converted}")
+        else:
+            state_dict = load_file(str(converted), device=str(device)) if mmap else {k: v.to(device) for k, v in load(converted.read_bytes()).items()}
+    if state_dict is None:
+        try:
+            state_dict = torch.load(load_path, map_location=str(device), weights_only=True, mmap=mmap)
+        except RuntimeError:  # checkpoints saved before the zip format cannot be memory-mapped
+            state_dict = torch.load(load_path, map_location=str(device), weights_only=True)
+        if hasattr(state_dict, "_metadata"):
+            del state_dict._metadata
+        patch_instance_norm_state_dict(state_dict, net)
+    net.load_state_dict(state_dict, assign=any(t.is_meta for t in net.state_dict().values()))
+    return net
+
+
+def convert_checkpoint(net, load_path):
+    """Write the patched state dict of the .pth checkpoint <load_path> to <safetensors_path(load_path)>.
+
+    Parameters:
+        net (network)   -- a network of the checkpoint's architecture, used to patch the keys; may be on the meta device
+        load_path (str) -- the .pth checkpoint to convert
+
+    Returns the path of the safetensors file.
+    """
+    from safetensors.torch import save_file
+
+    state_dict = torch.load(load_path, map_location="cpu", weights_only=True)
+    if hasattr(state_dict, "_metadata"):
+        del state_dict._metadata
+    patch_instance_norm_state_dict(state_dict, net)
+    path = safetensors_path(load_path)
+    save_file({key: value.contiguous() for key, value in state_dict.items()}, str(path))
+    return path
+
+
+def fold_reflection_padding(net):
+    """Replace every <ReflectionPad2d, Conv2d(padding=0)> pair by a single Conv2d with padding_mode='reflect'.
+
+    Parameters:
+        net (network) -- the network to convert; modified in place
+
+    The output is unchanged. The conv then pads by itself, which saves a separate pass over the activations and
+    lets quantization keep the padded tensor in int8. Return the converted network.
+    """
+    for name, child in net.named_children():
+        if not isinstance(child, nn.Sequential):
+            fold_reflection_padding(child)
+            continue
+        layers, folded = list(child), []
+        i = 0
+        while i < len(layers):
+            layer = layers[i]
+            conv = layers[i + 1] if i + 1 < len(layers) else None
+            if isinstance(layer, nn.ReflectionPad2d) and type(conv) is nn.Conv2d and conv.padding == (0, 0) and len(set(layer.padding)) == 1:
+                new_conv = nn.Conv2d(conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride, layer.padding[0], conv.dilation, conv.groups, conv.bias is not None, "reflect")
+                new_conv.load_state_dict(conv.state_dict())
+                folded.append(new_conv.to(conv.weight.device))
+                i += 2
+            else:
+                fold_reflection_padding(layer)
+                folded.append(layer)
+                i += 1
+        setattr(net, name, nn.Sequential(*folded))
+    return net
+
+
+def bf16_supported(device="cpu"):
+    """Return True if <device> runs bfloat16 convolutions natively.
+
+    On CPU this requires AVX-512 BF16 or AMX; elsewhere bfloat16 is emulated and slower than fp32.
+    """
+    device = torch.device(device)
+    if device.type == "cuda":
+        return torch.cuda.is_bf16_supported()
+    checks = [getattr(torch.cpu, "_is_avx512_bf16_supported", None), getattr(torch.cpu, "_is_amx_tile_supported", None)]
+    return any(check() for check in checks if check is not None)
+
+
+def set_inference_precision(net, precision="fp32", channels_last=False, device="cpu", min_psnr=30.0, sample=None):
+    """Return <net> set up to run inference in the requested precision and memory layout.
+
+    Parameters:
+        net (network)        -- the loaded network
+        precision (str)      -- fp32 | bf16 | auto; bf16 runs the network under autocast, auto picks bf16 where it is native
+        channels_last (bool) -- if True, weights and activations use the channels_last (NHWC) memory layout
+        device (str)         -- the device the network runs on
+        min_psnr (float)     -- bf16 is only kept if its output on <sample> is at least this close (dB) to fp32
+        sample (tensor)      -- a 1xCxHxW image in [-1, 1] the outputs are compared on (default: <util.natural_image>)
+
+    bf16 falls back to fp32 if the host has no native bfloat16 support or the quality check fails; auto is bf16 on
+    hosts with native support (still subject to the quality check) and fp32 elsewhere.
+
+    The check compares the bf16 and fp32 outputs on a photograph-like image, measured on the 0-255 scale. A healthy
+    generator reaches about 45 dB, on the default sample as on photographs; the default threshold of 30 dB (an RMS
+    error of 8 levels, where banding becomes visible) only rejects networks that are numerically unstable in bf16.
+    """
+    if precision not in ("fp32", "bf16", "auto"):
+        raise NotImplementedError("precision [%s] is not implemented" % precision)
+    if precision == "auto":
+        precision = "bf16" if bf16_supported(device) else "fp32"
+        print(f"inference precision auto: using {precision}")
+    elif precision == "bf16" and not bf16_supported(device):
+        print("bfloat16 is not supported natively on this host, using fp32")
+        precision = "fp32"
+    if precision == "fp32" and not channels_last:
+        return net
+    if channels_last:
+        net = net.to(memory_format=torch.channels_last)
+    wrapped = PrecisionWrapper(net, torch.bfloat16 if precision == "bf16" else torch.float32, channels_last)
+    if precision == "bf16":
+        if sample is None:
+            sample = util.natural_image(next(m for m in net.modules() if isinstance(m, nn.Conv2d)).in_channels)
+        sample = sample.to(device)
+        with torch.no_grad():
+            reference, output = net(sample), wrapped(sample)
+        psnr, ssim = util.psnr(output, reference), util.ssim(output, reference)
+        print(f"bf16 vs fp32 on the sample image: PSNR {psnr:.2f} dB, SSIM {ssim:.4f}")
+        if psnr < min_psnr:
+            print(f"bf16 output is below {min_psnr} dB PSNR, using fp32")
+            wrapped.dtype = torch.float32
+    return wrapped
+
+
 def define_G(input_nc, output_nc, ngf, netG, norm="batch", use_dropout=False, init_type="normal", init_gain=0.02):
     """Create a generator
 
@@ -310,6 +488,23 @@ def cal_gradient_penalty(netD, real_data, fake_data, device, type="mixed", const
         return 0.0, None
 
 
+class PrecisionWrapper(nn.Module):
+    """Run a network under autocast in <dtype>, optionally on channels_last inputs; outputs are returned as contiguous float32."""
+
+    def __init__(self, net, dtype=torch.float32, channels_last=False):
+        super(PrecisionWrapper, self).__init__()
+        self.net = net
+        self.dtype = dtype
+        self.channels_last = channels_last
+
+    def forward(self, input):
+        if self.channels_last:
+            input = input.contiguous(memory_format=torch.channels_last)
+        with torch.autocast(input.device.type, dtype=self.dtype, enabled=self.dtype != torch.float32):
+            output = self.net(input)
+        return output.float().contiguous()
+
+
 class ResnetGenerator(nn.Module):
     """Resnet-based generator that consists of Resnet blocks between a few downsampling/upsampling operations.
 
@@ -1,3 +1,4 @@
+import torch
 from .base_model import BaseModel
 from . import networks
 
@@ -43,7 +44,9 @@ class TestModel(BaseModel):
         self.visual_names = ["real", "fake"]
         # specify the models you want to save to the disk. The training/test scripts will call <BaseModel.save_networks> and <BaseModel.load_networks>
         self.model_names = ["G" + opt.model_suffix]  # only generator is needed.
-        self.netG = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm, not opt.no_dropout, opt.init_type, opt.init_gain)
+        # build on the meta device: no memory is allocated or initialized for weights that <setup> loads from the checkpoint
+        with torch.device("meta"):
+            self.netG = networks.define_G(opt.input_nc, opt.output_nc, opt.ngf, opt.netG, opt.norm, not opt.no_dropout, opt.init_type, opt.init_gain)
 
         # assigns the model to self.netG_[suffix] so that it can be loaded
         # please see <BaseModel.load_networks>
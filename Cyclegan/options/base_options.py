@@ -41,6 +41,10 @@ class BaseOptions:
         parser.add_argument("--direction", type=str, default="AtoB", help="AtoB or BtoA")
         parser.add_argument("--serial_batches", action="store_true", help="if true, takes images in order to make batches, otherwise takes them randomly")
         parser.add_argument("--num_threads", default=4, type=int, help="# threads for loading data")
+        parser.add_argument("--prefetch_factor", type=int, default=2, help="batches loaded in advance by each loader thread")
+        parser.add_argument("--persistent_workers", action="store_true", help="keep the loader processes alive between epochs instead of starting new ones every epoch")
+        parser.add_argument("--pin_memory", action="store_true", help="load batches into page-locked memory for faster copies to the GPU (ignored without CUDA)")
+        parser.add_argument("--sample_cache_mb", type=int, default=0, help="keep up to this many MB of decoded images in shared memory for all loader threads and epochs; 0 disables the cache. See data/sample_cache.py")
         parser.add_argument("--batch_size", type=int, default=1, help="input batch size")
         parser.add_argument("--load_size", type=int, default=286, help="scale images to this size")
         parser.add_argument("--crop_size", type=int, default=256, help="then crop to this size")
@@ -116,6 +120,8 @@ class BaseOptions:
         """Parse our options, create checkpoints directory suffix, and set up gpu device."""
         opt = self.gather_options()
         opt.isTrain = self.isTrain  # train or test
+        if getattr(opt, "names", ""):  # test-time --names runs several experiments; the options are saved with the first
+            opt.name = opt.names.split(",")[0]
 
         # process opt.suffix
         if opt.suffix:
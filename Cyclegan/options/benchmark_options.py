@@ -0,0 +1,19 @@
+from .train_options import TrainOptions
+
+
+class LoaderBenchmarkOptions(TrainOptions):
+    """This class includes options for measuring data loading throughput with benchmark_loader.py.
+
+    It also includes shared options defined in TrainOptions and BaseOptions; the dataset is loaded as for training.
+    Every '*_list' option is a comma-separated list of values to try; all their combinations are measured.
+    """
+
+    def initialize(self, parser):
+        parser = TrainOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--threads_list', type=str, default='0,2,4', help='values of --num_threads to try')
+        parser.add_argument('--prefetch_list', type=str, default='2,4', help='values of --prefetch_factor to try (only with loader threads)')
+        parser.add_argument('--persistent_list', type=str, default='0,1', help='values of --persistent_workers to try (0 or 1; only with loader threads)')
+        parser.add_argument('--cache_mb_list', type=str, default='0', help='values of --sample_cache_mb to try, e.g. 0,1024')
+        parser.add_argument('--bench_epochs', type=int, default=3, help='epochs measured per combination; the first one includes starting the loader threads and filling the cache')
+        parser.add_argument('--bench_batches', type=int, default=0, help='stop every epoch after this many batches; 0 reads the whole dataset')
+        return parser
@@ -9,12 +9,29 @@ class TestOptions(BaseOptions):
 
     def initialize(self, parser):
         parser = BaseOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--names', type=str, default='', help='comma-separated experiment names (e.g. several styles) to run on every input; results are saved per name. Overrides --name')
         parser.add_argument('--results_dir', type=str, default='./results/', help='saves results here.')
         parser.add_argument('--aspect_ratio', type=float, default=1.0, help='aspect ratio of result images')
         parser.add_argument('--phase', type=str, default='test', help='train, val, test, etc')
         # Dropout and Batchnorm has different behavioir during training and test.
         parser.add_argument('--eval', action='store_true', help='use eval mode during test time.')
         parser.add_argument('--num_test', type=int, default=50, help='how many test images to run')
+        # inference precision and memory layout
+        parser.add_argument('--precision', type=str, default='fp32', help='inference precision [fp32 | bf16 | auto]. bf16 runs under autocast and falls back to fp32 on hosts without native bfloat16 support; auto uses bf16 only where it is native')
+        parser.add_argument('--channels_last', action='store_true', help='use the channels_last memory layout for weights and activations')
+        # batching: images are grouped into batches of equal size, see data/bucket_sampler.py
+        parser.add_argument('--bucket_granularity', type=int, default=0, help='with --batch_size > 1, pad images up to a multiple of this many pixels so that similar sizes share a batch (results are cropped back, but instance norm sees the padding); 0 batches only images of equal size')
+        # result writing
+        parser.add_argument('--resume', action='store_true', help='skip inputs that manifest.jsonl in the results directory records as done with the current checkpoint')
+        parser.add_argument('--no_manifest', action='store_true', help='do not write manifest.jsonl (and do not hash the inputs); the run cannot be resumed with --resume')
+        parser.add_argument('--save_mode', type=str, default='files', help='files: one image file per result | array: append the results to chunked memory-mapped arrays in <results>/arrays (see util/array_store.py)')
+        parser.add_argument('--array_chunk_size', type=int, default=256, help='images per chunk file of --save_mode array')
+        parser.add_argument('--save_workers', type=int, default=2, help='threads that encode and write result images in the background; 0 writes them synchronously')
+        parser.add_argument('--max_pending_saves', type=int, default=0, help='result images that may wait to be written before inference blocks; 0 = 2 per save worker')
+        parser.add_argument('--save_format', type=str, default='png', help='format of the result images [png | jpg | webp]')
+        parser.add_argument('--save_compress_level', type=int, default=6, help='zlib level of PNG results, 0 (fastest) .. 9 (smallest)')
+        parser.add_argument('--save_quality', type=int, default=95, help='quality of JPEG and WebP results, 1 .. 100')
+        parser.add_argument('--rows_per_page', type=int, default=500, help='results per page of the HTML report; larger runs are split into index.html, index_2.html, ...')
         # rewrite devalue values
         parser.set_defaults(model='test')
         # To avoid cropping, the load_size should be the same as crop_size
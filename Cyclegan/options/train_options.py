@@ -30,6 +30,9 @@ class TrainOptions(BaseOptions):
         parser.add_argument('--pool_size', type=int, default=50, help='the size of image buffer that stores previously generated images')
         parser.add_argument('--lr_policy', type=str, default='linear', help='learning rate policy. [linear | step | plateau | cosine]')
         parser.add_argument('--lr_decay_iters', type=int, default=50, help='multiply by a gamma every lr_decay_iters iterations')
+        # distributed training parameters (launched with torchrun; see util/util.py init_ddp)
+        parser.add_argument('--threads_per_rank', type=int, default=0, help='torch threads of every process of a CPU run; 0 divides the cores of the host between its processes')
+        parser.add_argument('--ddp_bucket_cap_mb', type=int, default=25, help='size of the gradient buckets that DDP all-reduces together; larger buckets mean fewer, bigger messages')
 
         self.isTrain = True
         return parser
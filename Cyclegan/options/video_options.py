@@ -0,0 +1,19 @@
+from .test_options import TestOptions
+
+
+class VideoOptions(TestOptions):
+    """This class includes options for stylizing videos and animated GIFs with stylize_video.py.
+
+    It also includes shared options defined in TestOptions and BaseOptions.
+    '--dataroot' is the path of the input video or GIF.
+    """
+
+    def initialize(self, parser):
+        parser = TestOptions.initialize(self, parser)  # define shared options
+        parser.add_argument('--output_path', type=str, default='', help='where to write the stylized clip; defaults to [results_dir]/[name]/[input stem]_fake[input suffix]. Use a .gif suffix to write a GIF.')
+        parser.add_argument('--diff_threshold', type=float, default=2.0, help='mean absolute pixel difference (0-255) under which a frame reuses the previous output; 0 stylizes every frame')
+        parser.add_argument('--inference_graph', action='store_true', help='run a ResnetGenerator converted by models/inference_generator.py (folded input normalization, uint8 frames in and out)')
+        parser.add_argument('--queue_size', type=int, default=16, help='capacity of the queues between the decode, inference and encode stages')
+        # frames keep their size unless a scale_width preprocess is requested
+        parser.set_defaults(preprocess='none', batch_size=4)
+        return parser
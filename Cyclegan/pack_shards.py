@@ -0,0 +1,74 @@
+"""Pack an image folder into shard files for '--dataset_mode shard'.
+
+Reading millions of small image files is dominated by file-system metadata operations and small random reads.
+This script walks the folder once and writes the images back to back into a few large shard files plus an index
+(see data/shards.py); ShardDataset then reads them through memory maps.
+
+Payloads are the original encoded files by default. '--payload raw' stores decoded RGB pixels instead, so loading
+skips the JPEG/PNG decode; with '--preprocess resize' or 'scale_width' the images are also resized once at packing
+time (to '--load_size', as the same options of the training and test scripts do), which keeps raw shards small.
+The random crop and flip of training stay at load time.
+
+Example:
+    python pack_shards.py --dataroot datasets/photos --output_dir datasets/photos_packed
+    python pack_shards.py --dataroot datasets/photos --output_dir datasets/photos_raw256 --payload raw --preprocess resize --load_size 256 --workers 8
+    python test.py --dataroot datasets/photos_packed --dataset_mode shard --name style_monet_pretrained --model test --no_dropout
+"""
+
+import argparse
+import hashlib
+import io
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache, partial
+from pathlib import Path
+
+from PIL import Image
+
+from data.base_dataset import get_transform
+from data.image_folder import make_dataset
+from data.shards import ShardWriter
+
+
+@lru_cache(maxsize=None)
+def packing_transform(preprocess, load_size):
+    """Return the resize part of <get_transform> (built in each worker process: its lambdas cannot be pickled)."""
+    return get_transform(argparse.Namespace(preprocess=preprocess, load_size=load_size, crop_size=load_size, no_flip=True), convert=False)
+
+
+def load_payload(path, payload, preprocess="none", load_size=256):
+    """Return (payload bytes, stored (width, height), SHA-256 of the file) of the image at <path>, reading it once."""
+    content = Path(path).read_bytes()
+    sha256 = hashlib.sha256(content).hexdigest()
+    if payload == "encoded":
+        with Image.open(io.BytesIO(content)) as img:
+            return content, img.size, sha256
+    img = Image.open(io.BytesIO(content)).convert("RGB")
+    if preprocess != "none":
+        img = packing_transform(preprocess, load_size)(img)
+    return img.tobytes(), img.size, sha256
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack an image folder into shard files.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--dataroot", required=True, help="folder of images (searched recursively)")
+    parser.add_argument("--output_dir", required=True, help="directory the shards and the index are written to")
+    parser.add_argument("--payload", type=str, default="encoded", choices=["encoded", "raw"], help="store the original files, or decoded RGB pixels")
+    parser.add_argument("--preprocess", type=str, default="none", choices=["none", "resize", "scale_width"], help="resize raw payloads when packing")
+    parser.add_argument("--load_size", type=int, default=256, help="target size of --preprocess")
+    parser.add_argument("--shard_mb", type=int, default=1024, help="size of a shard file in MB")
+    parser.add_argument("--workers", type=int, default=4, help="processes that read (and decode) the images")
+    args = parser.parse_args()
+    if args.preprocess != "none" and args.payload != "raw":
+        parser.error("--preprocess requires --payload raw")
+
+    paths = make_dataset(args.dataroot)
+    writer = ShardWriter(args.output_dir, args.payload, args.shard_mb << 20, preprocess=args.preprocess, load_size=args.load_size, dataroot=str(args.dataroot))
+    start = time.perf_counter()
+    with ProcessPoolExecutor(args.workers) as pool:
+        for i, (path, (data, size, sha256)) in enumerate(zip(paths, pool.map(partial(load_payload, payload=args.payload, preprocess=args.preprocess, load_size=args.load_size), paths, chunksize=64))):
+            writer.add(data, size, path, sha256)
+            if (i + 1) % 1000 == 0:
+                print(f"packed {i + 1}/{len(paths)} images")
+    writer.close()
+    print(f"packed {len(paths)} images into {writer.shard + 1} shards in {args.output_dir} ({time.perf_counter() - start:.1f}s)")
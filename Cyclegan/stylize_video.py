@@ -0,0 +1,43 @@
+"""Stylize a video or an animated GIF with a trained generator.
+
+Frames are decoded, stylized and encoded as a stream, so memory use does not grow with the clip length.
+Frames that barely changed since the last stylized frame reuse its output (see '--diff_threshold').
+Decoding, inference and encoding run in overlapping threads; per-stage throughput is printed at the end.
+
+Example:
+    python stylize_video.py --dataroot clip.mp4 --name style_monet_pretrained --no_dropout --batch_size 4
+    python stylize_video.py --dataroot clip.gif --name style_vangogh_pretrained --no_dropout --output_path out.gif
+    python stylize_video.py --dataroot clip.mp4 --name style_ukiyoe_pretrained --no_dropout --preprocess scale_width --load_size 512
+    python stylize_video.py --dataroot clip.mp4 --name style_cezanne_pretrained --no_dropout --inference_graph
+
+See options/video_options.py for more options.
+"""
+
+from pathlib import Path
+from options.video_options import VideoOptions
+from models import create_model
+from models.inference_generator import PrepackedGenerator, to_inference_generator
+from util.video import VideoStylizer
+import torch
+
+
+if __name__ == "__main__":
+    opt = VideoOptions().parse()  # get video options
+    opt.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    opt.num_threads = 0  # frames are read by the pipeline itself, not by a DataLoader
+
+    model = create_model(opt)  # create a model given opt.model and other options
+    model.setup(opt)  # regular setup: load and print networks
+    if opt.eval:
+        model.eval()
+
+    input_path = Path(opt.dataroot)
+    output_path = Path(opt.output_path) if opt.output_path else Path(opt.results_dir) / opt.name / f"{input_path.stem}_fake{input_path.suffix}"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # the inference graph is traced and its weights pre-packed with the first batch of frames, whose size is known only then
+    netG = PrepackedGenerator(to_inference_generator(model.netG)) if opt.inference_graph else model.netG
+
+    load_size = opt.load_size if "scale_width" in opt.preprocess else None
+    stylizer = VideoStylizer(netG, opt.device, batch_size=opt.batch_size, diff_threshold=opt.diff_threshold, queue_size=opt.queue_size, load_size=load_size, uint8_io=opt.inference_graph)
+    stylizer.run(input_path, output_path)
@@ -19,6 +19,15 @@ Example (You need to train models first or download pre-trained models from our
     which is sometimes unnecessary. The results will be saved at ./results/.
     Use '--results_dir <directory_path_to_save_result>' to specify the results directory.
 
+    Test several styles in one pass (each input is loaded once and run through every generator):
+        python test.py --dataroot datasets/photos --names style_monet_pretrained,style_vangogh_pretrained --model test --no_dropout
+
+    Resume an interrupted run (inputs recorded in each results directory's manifest.jsonl are skipped):
+        python test.py --dataroot datasets/photos --name style_monet_pretrained --model test --no_dropout --resume
+
+    Split a large folder across 4 processes (or several hosts; see util/distributed_inference.py):
+        torchrun --nproc_per_node 4 test.py --dataroot datasets/photos --name style_monet_pretrained --model test --no_dropout
+
     Test a pix2pix model:
         python test.py --dataroot ./datasets/facades --name facades_pix2pix --model pix2pix --direction BtoA
 
@@ -27,12 +36,18 @@ See training and test tips at: https://github.com/junyanz/pytorch-CycleGAN-and-p
 See frequently asked questions at: https://github.com/junyanz/pytorch-CycleGAN-and-pix2pix/blob/master/docs/qa.md
 """
 
+import copy
 import os
+import time
 from pathlib import Path
 from options.test_options import TestOptions
 from data import create_dataset
 from models import create_model
 from util.visualizer import save_images
+from util.image_writer import ImageWriter
+from util.manifest import Manifest, checkpoint_hash
+from util.array_store import ArrayStoreWriter
+from util.distributed_inference import init_inference_group, merge_results, union_across_ranks
 from util import html
 import torch
 
@@ -42,38 +57,102 @@ except ImportError:
     print('Warning: wandb package cannot be found. The option "--use_wandb" will result in error.')
 
 
+def select(data, keep):
+    """Return the items <keep> (a list of indices) of a collated batch."""
+    return {key: value[keep] if isinstance(value, torch.Tensor) else [value[j] for j in keep] for key, value in data.items()}
+
+
 if __name__ == "__main__":
     opt = TestOptions().parse()  # get test options
-    opt.device = torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+    rank, world_size = init_inference_group()  # launched by torchrun: this process stylizes its share of the inputs
+    opt.device = torch.device(f"cuda:{int(os.environ.get('LOCAL_RANK', 0))}" if torch.cuda.is_available() else "cpu")
     # hard-code some parameters for test
-    opt.num_threads = 0  # test code only supports num_threads = 0
-    opt.batch_size = 1  # test code only supports batch_size = 1
+    # --batch_size > 1 batches images of equal size (see data/bucket_sampler.py); --num_threads loader processes decode ahead
+    opt.max_dataset_size = min(opt.max_dataset_size, opt.num_test)  # only apply our model to opt.num_test images.
     opt.serial_batches = True  # disable data shuffling; comment this line if results on randomly chosen images are needed.
     opt.no_flip = True  # no flip; comment this line if results on flipped images are needed.
     
+    if opt.resume and (opt.save_mode == "array" or opt.no_manifest):
+        raise ValueError("--resume needs the manifest and the result files of --save_mode files")
+    if opt.no_manifest and world_size > 1:
+        raise ValueError("--no_manifest is not supported by distributed runs: the ranks' reports are merged from their manifests")
+    # the manifest records the hash of the bytes the dataset reads for inference, so no input is read twice
+    opt.hash_inputs = opt.save_mode == "files" and not opt.no_manifest
     dataset = create_dataset(opt)  # create a dataset given opt.dataset_mode and other options
-    model = create_model(opt)  # create a model given opt.model and other options
-    model.setup(opt)  # regular setup: load and print networks; create schedulers
-
-    # create a website
-    web_dir = Path(opt.results_dir) / opt.name / f"{opt.phase}_{opt.epoch}"  # define the website directory
-    if opt.load_iter > 0:  # load_iter is 0 by default
-        web_dir = Path(f"{web_dir}_iter{opt.load_iter}")
-    print(f"creating web directory {web_dir}")
-    webpage = html.HTML(web_dir, f"Experiment = {opt.name}, Phase = {opt.phase}, Epoch = {opt.epoch}")
-    # test with eval mode. This only affects layers like batchnorm and dropout.
-    # For [pix2pix]: we use batchnorm and dropout in the original pix2pix. You can experiment it with and without eval() mode.
-    # For [CycleGAN]: It should not affect CycleGAN as CycleGAN uses instancenorm without dropout.
-    if opt.eval:
-        model.eval()
-    for i, data in enumerate(dataset):
-        if i >= opt.num_test:  # only apply our model to opt.num_test images.
-            break
-        model.set_input(data)  # unpack data from data loader
-        model.test()  # run inference
-        visuals = model.get_current_visuals()  # get image results
-        img_path = model.get_image_paths()  # get image paths
-        if i % 5 == 0:  # save images to an HTML file
-            print(f"processing ({i:04d})-th image... {img_path}")
-        save_images(webpage, visuals, img_path, aspect_ratio=opt.aspect_ratio, width=opt.display_winsize)
-    webpage.save()  # save the HTML
\ No newline at end of file
+    # with --names, every input batch is decoded and transformed once and then run through the generator of every style
+    names = opt.names.split(",") if opt.names else [opt.name]
+    runs = []  # (options, model, webpage, manifest, store) of every style
+    for name in names:
+        style_opt = copy.copy(opt)
+        style_opt.name = name
+        model = create_model(style_opt)  # create a model given opt.model and other options
+        model.setup(style_opt)  # regular setup: load and print networks; create schedulers
+
+        # create a website
+        web_dir = Path(opt.results_dir) / name / f"{opt.phase}_{opt.epoch}"  # define the website directory
+        if opt.load_iter > 0:  # load_iter is 0 by default
+            web_dir = Path(f"{web_dir}_iter{opt.load_iter}")
+        print(f"creating web directory {web_dir}")
+        # with --save_mode array, the results go to one chunked array container per style (and rank) instead of image files;
+        # the container's index lists them, so no report or manifest is written (those of an earlier file run stay as they are)
+        store = ArrayStoreWriter(web_dir / ("arrays" if world_size == 1 else f"arrays-rank{rank}"), opt.array_chunk_size) if opt.save_mode == "array" else None
+        # the report is written row by row as results complete (and split into pages), so it survives a crash
+        # (in a distributed run, every rank writes its own pages; rank 0 merges them into index.html at the end)
+        webpage = html.StreamingHTML(web_dir, f"Experiment = {name}, Phase = {opt.phase}, Epoch = {opt.epoch}", rows_per_page=opt.rows_per_page, name="index" if world_size == 1 else f"rank{rank}") if store is None else None
+        # test with eval mode. This only affects layers like batchnorm and dropout.
+        # For [pix2pix]: we use batchnorm and dropout in the original pix2pix. You can experiment it with and without eval() mode.
+        # For [CycleGAN]: It should not affect CycleGAN as CycleGAN uses instancenorm without dropout.
+        if opt.eval:
+            model.eval()
+        # finished inputs are recorded as their results land on disk, so an interrupted run can be resumed
+        manifest_path = web_dir / ("manifest.jsonl" if world_size == 1 else f"manifest.rank{rank}.jsonl")
+        earlier_manifests = [path for path in [web_dir / "manifest.jsonl", *sorted(web_dir.glob("manifest.rank*.jsonl"))] if path != manifest_path]
+        content_hash = getattr(dataset.dataset, "content_hash", None)  # packed inputs are identified by the shard index, not their source files
+        manifest = Manifest(manifest_path, checkpoint_hash(model, style_opt), resume=opt.resume, read_paths=earlier_manifests, content_hash=content_hash) if opt.hash_inputs else None
+        runs.append((style_opt, model, webpage, manifest, store))
+    finished = {style_opt.name: set() for style_opt, _, _, _, _ in runs}  # inputs each style already has
+    if opt.resume:  # skip them, and list their existing results in the new report
+        for style_opt, _, webpage, manifest, _ in runs:
+            # every rank checks a part of the inputs; the union is the same on all ranks, so they all split the rest alike
+            finished[style_opt.name] = union_across_ranks(manifest.finished(dataset.dataset.A_paths[rank::world_size]))
+            if world_size == 1:  # (a distributed run lists every result in its merged report instead)
+                for path in sorted(finished[style_opt.name]):
+                    outputs = manifest.outputs(path)
+                    webpage.add_header(Path(path).stem)
+                    webpage.add_images([file for _, file in outputs], [label for label, _ in outputs], [file for _, file in outputs], width=opt.display_winsize)
+        dataset.skip(set.intersection(*finished.values()))  # inputs that only some styles have are loaded for the others
+        print(f"resuming: {', '.join(f'{name} has {len(done)} inputs' for name, done in finished.items())}; {len(dataset)} inputs to load")
+    # encode and write the results in background threads while the next image is processed
+    writer = ImageWriter(opt.save_workers, opt.max_pending_saves or None, opt.save_format, opt.save_compress_level, opt.save_quality)
+    with writer:
+        num_images, start = 0, time.perf_counter()
+        for i, data in enumerate(dataset):
+            for style_opt, model, webpage, manifest, store in runs:
+                keep = [j for j, path in enumerate(data["A_paths"]) if path not in finished[style_opt.name]]
+                if not keep:
+                    continue
+                batch = data if len(keep) == len(data["A_paths"]) else select(data, keep)
+                model.set_input(batch)  # unpack data from data loader
+                if manifest is not None:
+                    manifest.loaded(batch["A_paths"], batch.get("A_sha256"))
+                model.test()  # run inference
+                visuals = model.get_current_visuals()  # get image results
+                img_path = model.get_image_paths()  # get image paths
+                sizes = data.get("A_sizes")
+                save_images(webpage, visuals, img_path, aspect_ratio=opt.aspect_ratio, width=opt.display_winsize, writer=writer, image_sizes=sizes and [sizes[j] for j in keep], on_saved=manifest and manifest.add, store=store)
+            if i % 5 == 0:  # save images to an HTML file
+                print(f"processing ({num_images:04d})-th image... {data['A_paths']}")
+            num_images += len(data["A_paths"])
+    elapsed = time.perf_counter() - start
+    print(f"stylized {num_images} images with {len(runs)} styles in {elapsed:.2f}s ({num_images * len(runs) / max(elapsed, 1e-9):.2f} results/s)")
+    for style_opt, model, webpage, manifest, store in runs:
+        if store is not None:
+            store.close()
+            continue
+        webpage.save()  # close the last page of the HTML
+        if world_size > 1:
+            merge_results(manifest, webpage, width=opt.display_winsize)  # rank 0 writes manifest.jsonl and index.html
+        elif manifest is not None:
+            manifest.close()
+    if world_size > 1:
+        torch.distributed.destroy_process_group()
@@ -0,0 +1,96 @@
+"""General-purpose training script for image-to-image translation.
+
+This script works for various models (with option '--model': e.g., cycle_gan) and
+different datasets (with option '--dataset_mode': e.g., unaligned, single).
+You need to specify the dataset ('--dataroot'), experiment name ('--name'), and model ('--model').
+
+It first creates model, dataset, and visualizer given the option.
+It then does standard network training. During the training, it also visualize/save the images, print/save the loss plot, and save models.
+The script supports continue/resume training. Use '--continue_train' to resume your previous training.
+
+Every '--print_freq' iterations it also reports the throughput since the last report: images per second, and how the
+time of an iteration splits into waiting for the data loader and the rest (forward, backward, optimizer steps). A
+large data-wait share means the loader is the bottleneck; see benchmark_loader.py and '--sample_cache_mb'.
+
+Example:
+    Train a CycleGAN model:
+        python train.py --dataroot ./datasets/maps --name maps_cyclegan --model cycle_gan
+    Fine-tune a pretrained style (its generators are loaded with --continue_train; --epoch selects the checkpoint):
+        python train.py --dataroot ./datasets/photo2monet --name style_monet --model cycle_gan --continue_train
+    Train with 4 processes on one machine (GPUs with NCCL, or CPU cores with gloo; see util/util.py init_ddp):
+        torchrun --nproc_per_node 4 train.py --dataroot ./datasets/maps --name maps_cyclegan --model cycle_gan
+
+See options/base_options.py and options/train_options.py for more training options.
+See training and test tips at: https://github.com/junyanz/pytorch-CycleGAN-and-pix2pix/blob/master/docs/tips.md
+See frequently asked questions at: https://github.com/junyanz/pytorch-CycleGAN-and-pix2pix/blob/master/docs/qa.md
+"""
+
+import time
+from options.train_options import TrainOptions
+from data import create_dataset
+from models import create_model
+from util.visualizer import Visualizer
+from util.util import init_ddp, cleanup_ddp
+
+
+if __name__ == "__main__":
+    opt = TrainOptions().parse()  # get training options
+    opt.device = init_ddp(opt.threads_per_rank)  # join the process group of a torchrun launch, if any
+    dataset = create_dataset(opt)  # create a dataset given opt.dataset_mode and other options
+    dataset_size = len(dataset)  # get the number of images in the dataset (of this process, in a distributed run)
+    print(f"The number of training images = {dataset_size}")
+
+    model = create_model(opt)  # create a model given opt.model and other options
+    model.setup(opt)  # regular setup: load and print networks; create schedulers
+    visualizer = Visualizer(opt)  # create a visualizer that display/save images and plots
+    visualizer.set_dataset_size(dataset_size)
+    total_iters = 0  # the total number of training iterations
+
+    for epoch in range(opt.epoch_count, opt.n_epochs + opt.n_epochs_decay + 1):  # outer loop for different epochs; we save the model by <epoch_count>, <epoch_count>+<save_latest_freq>
+        epoch_start_time = time.perf_counter()  # timer for entire epoch
+        epoch_iter = 0  # the number of training iterations in current epoch, reset to 0 every epoch
+        visualizer.reset()  # reset the visualizer: make sure it saves the results to HTML at least once every epoch
+        dataset.set_epoch(epoch)  # reshuffle the distributed shares and redraw the A/B pairs of this epoch
+        window_start, window_images, window_iters, window_data, window_comp = time.perf_counter(), 0, 0, 0.0, 0.0  # throughput since the last report
+        iter_data_time = time.perf_counter()  # timer for data loading per iteration
+        for i, data in enumerate(dataset):  # inner loop within one epoch
+            iter_start_time = time.perf_counter()  # timer for computation per iteration
+            t_data = iter_start_time - iter_data_time  # time spent waiting for this batch
+            total_iters += opt.batch_size
+            epoch_iter += opt.batch_size
+            model.set_input(data)  # unpack data from dataset and apply preprocessing
+            model.optimize_parameters()  # calculate loss functions, get gradients, update network weights
+
+            if total_iters % opt.display_freq == 0:  # display images on visdom and save images to a HTML file
+                save_result = total_iters % opt.update_html_freq == 0
+                model.compute_visuals()
+                visualizer.display_current_results(model.get_current_visuals(), epoch, total_iters, save_result)
+
+            # (on a GPU, kernels run asynchronously: the compute time includes waiting for them wherever the host syncs, e.g. in the losses)
+            window_images += len(data["A"])
+            window_iters += 1
+            window_data += t_data
+            window_comp += time.perf_counter() - iter_start_time
+            if total_iters % opt.print_freq == 0:  # print training losses and save logging information to the disk
+                losses = model.get_current_losses()
+                visualizer.print_current_losses(epoch, epoch_iter, losses, window_comp / window_images, window_data / window_images)
+                visualizer.plot_current_losses(total_iters, losses)
+                visualizer.print_throughput(epoch, epoch_iter, window_images / (time.perf_counter() - window_start), window_data / window_iters, window_comp / window_iters)
+                window_start, window_images, window_iters, window_data, window_comp = time.perf_counter(), 0, 0, 0.0, 0.0
+
+            if total_iters % opt.save_latest_freq == 0:  # cache our latest model every <save_latest_freq> iterations
+                print(f"saving the latest model (epoch {epoch}, total_iters {total_iters})")
+                save_suffix = f"iter_{total_iters}" if opt.save_by_iter else "latest"
+                model.save_networks(save_suffix)
+
+            iter_data_time = time.perf_counter()
+
+        model.update_learning_rate()  # update learning rates at the end of every epoch
+        if epoch % opt.save_epoch_freq == 0:  # cache our model every <save_epoch_freq> epochs
+            print(f"saving the model at the end of epoch {epoch}, iters {total_iters}")
+            model.save_networks("latest")
+            model.save_networks(epoch)
+
+        print(f"End of epoch {epoch} / {opt.n_epochs + opt.n_epochs_decay} \t Time Taken: {time.perf_counter() - epoch_start_time:.0f} sec")
+
+    cleanup_ddp()
@@ -0,0 +1,147 @@
+"""This module implements a chunked, memory-mapped array container for bulk stylization results.
+
+Writing one PNG per result costs an inode, a compression pass and a small-file read later for every image. With
+'--save_mode array' the results are instead appended to a few large uint8 arrays:
+    <store>/<label>_<height>x<width>_<chunk>.npy  -- N x H x W x 3 chunks of <chunk_size> images of one label and size
+    <store>/index.jsonl                          -- one line per image: source path, label, chunk file, row, height, width
+
+Chunks are ordinary .npy files, so downstream numpy code reads them zero-copy with np.load(path, mmap_mode="r").
+A chunk's index lines are appended only once its data has been flushed to disk; a run that dies loses the results
+of its last, unfinished chunk but never indexes garbage. Results are stored as produced (--aspect_ratio is not
+applied) and can be converted to image files on demand:
+    python -m util.array_store export <store> <output_dir> [--format png]
+    python -m util.array_store info <store>
+"""
+
+import argparse
+import json
+from pathlib import Path
+
+import numpy as np
+
+
+def _shrink_npy(path, rows):
+    """Cut the .npy file at <path> down to its first <rows> rows by rewriting its header in place."""
+    with open(path, "r+b") as f:
+        version = np.lib.format.read_magic(f)
+        header_start = f.tell()
+        read_header = np.lib.format.read_array_header_1_0 if version == (1, 0) else np.lib.format.read_array_header_2_0
+        shape, fortran_order, dtype = read_header(f)
+        data_start = f.tell()
+        shape = (rows,) + tuple(shape[1:])
+        header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": fortran_order, "shape": shape})
+        length_bytes = 2 if version == (1, 0) else 4
+        header = header.ljust(data_start - header_start - length_bytes - 1) + "\n"  # keep the data where it is
+        f.seek(header_start + length_bytes)
+        f.write(header.encode("latin1"))
+        f.truncate(data_start + int(np.prod(shape)) * dtype.itemsize)
+
+
+class ArrayStoreWriter:
+    """Append results to the chunks of an array store."""
+
+    def __init__(self, directory, chunk_size=256):
+        """Initialize the ArrayStoreWriter class
+
+        Parameters:
+            directory (str)  -- the store directory; an existing store is appended to
+            chunk_size (int) -- images per chunk file
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.chunk_size = chunk_size
+        self.chunks = {}  # "<label>_<h>x<w>" -> [file name, memmap, records of the rows filled so far]
+        self.counters = {}  # "<label>_<h>x<w>" -> number of the next chunk file
+        for path in self.directory.glob("*.npy"):  # continue the numbering of an existing store
+            key, number = path.stem.rsplit("_", 1)
+            self.counters[key] = max(self.counters.get(key, 0), int(number) + 1)
+        self.index = open(self.directory / "index.jsonl", "at")
+
+    def add(self, image_numpy, source_path, label):
+        """Append one HxWx3 uint8 result of <source_path>; return the (chunk file, row) it is stored at."""
+        h, w = image_numpy.shape[:2]
+        key = f"{label}_{h}x{w}"
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            number = self.counters.get(key, 0)
+            self.counters[key] = number + 1
+            name = f"{key}_{number:05d}.npy"
+            array = np.lib.format.open_memmap(self.directory / name, mode="w+", dtype=np.uint8, shape=(self.chunk_size, h, w, 3))
+            chunk = self.chunks[key] = [name, array, []]
+        name, array, records = chunk
+        row = len(records)
+        array[row] = image_numpy  # the only copy: straight into the page cache of the chunk file
+        records.append({"source": str(source_path), "label": label, "chunk": name, "row": row, "height": h, "width": w})
+        if len(records) == self.chunk_size:
+            self._finish(key)
+        return name, row
+
+    def _finish(self, key):
+        """Flush a chunk, cut it to its filled rows and index them."""
+        name, array, records = self.chunks.pop(key)
+        array.flush()
+        del array
+        if len(records) < self.chunk_size:
+            _shrink_npy(self.directory / name, len(records))
+        for record in records:
+            self.index.write(json.dumps(record) + "\n")
+        self.index.flush()
+
+    def close(self):
+        """Finish every open chunk."""
+        for key in list(self.chunks):
+            self._finish(key)
+        self.index.close()
+
+
+class ArrayStore:
+    """Read-only view of an array store; every image is a zero-copy view of its memory-mapped chunk."""
+
+    def __init__(self, directory):
+        self.directory = Path(directory)
+        with open(self.directory / "index.jsonl", "rt") as f:
+            self.records = [json.loads(line) for line in f if line.endswith("\n")]
+        self.arrays = {}
+
+    def __len__(self):
+        return len(self.records)
+
+    def chunk(self, name):
+        """Return the N x H x W x 3 memory map of chunk file <name>."""
+        if name not in self.arrays:
+            self.arrays[name] = np.load(self.directory / name, mmap_mode="r")
+        return self.arrays[name]
+
+    def __getitem__(self, i):
+        """Return (record, HxWx3 image) of the i-th indexed result."""
+        record = self.records[i]
+        return record, self.chunk(record["chunk"])[record["row"]]
+
+    def export(self, output_dir, image_format="png"):
+        """Write every result as <output_dir>/<source name>_<label>.<format>; return the number of files written."""
+        from . import util
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        for i in range(len(self)):
+            record, image = self[i]
+            util.save_image(np.asarray(image), output_dir / f"{Path(record['source']).stem}_{record['label']}.{image_format}")
+        return len(self)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or export an array store written by test.py --save_mode array.")
+    parser.add_argument("command", choices=["info", "export"], help="print a summary, or write every result as an image file")
+    parser.add_argument("store", type=str, help="the store directory")
+    parser.add_argument("output_dir", type=str, nargs="?", help="where export writes the images")
+    parser.add_argument("--format", type=str, default="png", help="image format of export")
+    args = parser.parse_args()
+    store = ArrayStore(args.store)
+    if args.command == "info":
+        for name in sorted({record["chunk"] for record in store.records}):
+            print(f"{name}: {store.chunk(name).shape}")
+        print(f"{len(store)} images")
+    else:
+        if not args.output_dir:
+            parser.error("export requires an output directory")
+        print(f"wrote {store.export(args.output_dir, args.format)} images to {args.output_dir}")
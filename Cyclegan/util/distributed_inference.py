@@ -0,0 +1,77 @@
+"""This module implements the coordination of a distributed test run: several ranks stylize one dataset together.
+
+Launch test.py with torchrun; every rank is one process, on one or more hosts (CPU-only hosts work: the process
+group uses the gloo backend, and only small Python objects are exchanged through it):
+    torchrun --nproc_per_node 4 test.py --dataroot datasets/photos --name style_monet_pretrained --model test --no_dropout
+    torchrun --nnodes 2 --node_rank <0 or 1> --master_addr <host of rank 0> --master_port 29500 --nproc_per_node 8 test.py ...
+Every rank needs the same dataroot content and checkpoints (a shared file system, or identical copies).
+
+- the inputs are split deterministically: rank r of N stylizes inputs r, r + N, r + 2N, ... (data/inference_sampler.py)
+- every rank writes its own results into the results directory, with its own manifest (manifest.rank<r>.jsonl) and
+  report pages (rank<r>.html, ...)
+- at the end, rank 0 gathers the new manifest records of all ranks through the process group and writes the merged
+  manifest.jsonl and a merged report (index.html, ...) of every result, in input order; then the ranks remove their
+  own manifests. Without a shared file system, the result files stay on the host of the rank that wrote them.
+- --resume reads the merged and any leftover per-rank manifests; the inputs that are finished on any rank are
+  skipped before the split, so every rank skips the same inputs.
+
+Each rank runs torch with OMP_NUM_THREADS threads (torchrun sets 1 if it is not set); on a CPU host, set it to the
+number of cores divided by --nproc_per_node.
+"""
+
+import json
+import os
+from pathlib import Path
+
+import torch.distributed as dist
+
+
+def init_inference_group():
+    """Join the process group of a torchrun launch if there is more than one rank; return (rank, world size)."""
+    if int(os.environ.get("WORLD_SIZE", 1)) <= 1:
+        return 0, 1
+    if not dist.is_initialized():
+        dist.init_process_group(backend="gloo")
+    print(f"rank {dist.get_rank()} of {dist.get_world_size()} joined the test run")
+    return dist.get_rank(), dist.get_world_size()
+
+
+def union_across_ranks(items):
+    """Return the union of the sets <items> of every rank (the set itself without a process group)."""
+    if not dist.is_initialized():
+        return set(items)
+    gathered = [None] * dist.get_world_size()
+    dist.all_gather_object(gathered, set(items))
+    return set().union(*gathered)
+
+
+def merge_results(manifest, webpage, width=256):
+    """Merge the manifests of all ranks into <web_dir>/manifest.jsonl and write the merged report (on rank 0).
+
+    Parameters:
+        manifest (Manifest)      -- this rank's manifest; its records are merged, then its file is removed
+        webpage (StreamingHTML)  -- this rank's report; the merged one is written next to it with the same title
+        width (int)              -- the width of the images in the merged report
+    """
+    manifest.close()
+    gathered = [None] * dist.get_world_size()
+    dist.gather_object(manifest.added, gathered if dist.get_rank() == 0 else None, dst=0)
+    if dist.get_rank() == 0:
+        records = dict(manifest.records)  # the records resumed from earlier runs, and those of rank 0
+        for added in gathered:
+            records.update((record["input"], record) for record in added)
+        merged_path = manifest.path.with_name("manifest.jsonl")
+        tmp_path = merged_path.with_name(f"{merged_path.name}.tmp")
+        with open(tmp_path, "wt") as f:
+            for input_path in sorted(records):
+                f.write(json.dumps(records[input_path]) + "\n")
+        os.replace(tmp_path, merged_path)
+        report = type(webpage)(webpage.web_dir, webpage.title, rows_per_page=webpage.rows_per_page)
+        for input_path in sorted(records):
+            outputs = records[input_path]["outputs"]
+            report.add_header(Path(input_path).stem)
+            report.add_images([file for _, file in outputs], [label for label, _ in outputs], [file for _, file in outputs], width=width)
+        report.save()
+        print(f"merged the results of {dist.get_world_size()} ranks: {len(records)} inputs in {merged_path}")
+    dist.barrier()  # the merged manifest is written: the per-rank ones are redundant now
+    manifest.path.unlink(missing_ok=True)
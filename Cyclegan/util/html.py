@@ -52,17 +52,8 @@ class HTML:
             txts (str list)  -- a list of image names shown on the website
             links (str list) --  a list of hyperref links; when you click an image, it will redirect you to a new page
         """
-        self.t = table(border=1, style="table-layout: fixed;")  # Insert a table
+        self.t = image_table(ims, txts, links, width)  # Insert a table
         self.doc.add(self.t)
-        with self.t:
-            with tr():
-                for im, txt, link in zip(ims, txts, links):
-                    with td(style="word-wrap: break-word;", halign="center", valign="top"):
-                        with p():
-                            with a(href=Path("images") / link):
-                                img(style=f"width:{width}px", src=Path("images") / im)
-                            br()
-                            p(txt)
 
     def save(self):
         """save the current content to the HMTL file"""
@@ -71,6 +62,126 @@ class HTML:
             f.write(self.doc.render())
 
 
+class StreamingHTML:
+    """This class writes the same page as <HTML> incrementally, for test runs of any length.
+
+    Every <add_header> / <add_images> call is rendered on its own and appended (and flushed) to the current page
+    file right away, so memory use does not grow with the run and a crashed run still leaves every finished row on
+    disk. After <rows_per_page> image rows a new page is started: the first page is <web_dir>/index.html, the
+    following ones are index_2.html, index_3.html, ..., linked to each other. <save> closes the last page.
+    """
+
+    def __init__(self, web_dir, title, refresh=0, rows_per_page=500, name="index"):
+        """Initialize the StreamingHTML class
+
+        Parameters:
+            web_dir (str)       -- a directory that stores the webpage; pages are created at <web_dir>/index*.html, images at <web_dir>/images/
+            title (str)         -- the webpage name
+            refresh (int)       -- how often the website refresh itself; if 0; no refreshing
+            rows_per_page (int) -- image rows per page file
+            name (str)          -- the pages are <web_dir>/<name>.html, <name>_2.html, ...
+        """
+        self.title = title
+        self.refresh = refresh
+        self.rows_per_page = rows_per_page
+        self.name = name
+        self.web_dir = Path(web_dir)
+        self.img_dir = self.web_dir / "images"
+
+        self.web_dir.mkdir(parents=True, exist_ok=True)
+        self.img_dir.mkdir(parents=True, exist_ok=True)
+
+        self.page = 0
+        self.rows = 0  # image rows on the current page
+        self.pending_header = False  # the last fragment was a header, whose rows must stay on the same page
+        self.file = None
+        self.footer = ""
+
+    def get_image_dir(self):
+        """Return the directory that stores images"""
+        return self.img_dir
+
+    def page_name(self, page):
+        return f"{self.name}.html" if page == 1 else f"{self.name}_{page}.html"
+
+    def _open_page(self):
+        """Close the current page with a link to the next one and start the next page."""
+        if self.file is not None:
+            self.file.write(p(a("next page", href=self.page_name(self.page + 1))).render() + "\n")
+            self._close_page()
+        self.page += 1
+        self.rows = 0
+        doc = dominate.document(title=self.title if self.page == 1 else f"{self.title} (page {self.page})")
+        if self.refresh > 0:
+            with doc.head:
+                meta(http_equiv="refresh", content=str(self.refresh))
+        if self.page > 1:
+            with doc:
+                p(a("previous page", href=self.page_name(self.page - 1)))
+        # the document is rendered once; rows are written between its opening part and its closing </body></html>
+        opening, closing = doc.render().rsplit("</body>", 1)
+        self.footer = "</body>" + closing + "\n"
+        self.file = open(self.web_dir / self.page_name(self.page), "wt")
+        self.file.write(opening.rstrip() + "\n")
+        self.file.flush()
+
+    def _close_page(self):
+        self.file.write(self.footer)
+        self.file.close()
+        self.file = None
+
+    def _append(self, fragment):
+        self.file.write(fragment.render() + "\n")
+        self.file.flush()
+
+    def add_header(self, text):
+        """Append a header to the current page, starting a new page if the current one is full
+
+        Parameters:
+            text (str) -- the header text
+        """
+        if self.file is None or self.rows >= self.rows_per_page:
+            self._open_page()
+        self._append(h3(text))
+        self.pending_header = True
+
+    def add_images(self, ims, txts, links, width=400):
+        """Append a row of images to the current page
+
+        Parameters:
+            ims (str list)   -- a list of image paths
+            txts (str list)  -- a list of image names shown on the website
+            links (str list) --  a list of hyperref links; when you click an image, it will redirect you to a new page
+        """
+        if self.file is None or (self.rows >= self.rows_per_page and not self.pending_header):
+            self._open_page()
+        self._append(image_table(ims, txts, links, width))
+        self.rows += 1
+        self.pending_header = False
+
+    def save(self):
+        """Close the last page; the rows themselves are already on disk"""
+        if self.page == 0:
+            self._open_page()  # an empty run still gets its first page
+        if self.file is not None:
+            self._close_page()
+
+
+def image_table(ims, txts, links, width=400):
+    """Return a table tag with one row of images (see <HTML.add_images>)"""
+    t = table(border=1, style="table-layout: fixed;")
+    with t:
+        with tr():
+            for im, txt, link in zip(ims, txts, links):
+                with td(style="word-wrap: break-word;", halign="center", valign="top"):
+                    with p():
+                        with a(href=Path("images") / link):
+                            img(style=f"width:{width}px", src=Path("images") / im)
+                        br()
+                        p(txt)
+    return t
+
+
 if __name__ == "__main__":  # we show an example usage here.
     html = HTML("web/", "test_html")
     html.add_header("hello world")
@@ -0,0 +1,138 @@
+"""This module implements a bounded pool of background threads that encode and write result images.
+
+<save_images> used to encode every result (PNG compression dominates) on the thread that runs the model, so the CPU
+alternated between inference and compression. With an <ImageWriter> the encoding and the disk write of one batch
+overlap with the forward pass of the next: PIL releases the GIL while it compresses, so the writer threads run in
+parallel with torch.
+
+The number of images waiting to be written is bounded (<max_pending>), which caps the memory held by the queue. When
+the writers fall behind, <write> blocks; the time spent blocked (the write backpressure) is counted and reported by
+<close>. <close> (or leaving the with-block) waits until every image has been written and re-raises the first error.
+
+The writer also pools the uint8 buffers <save_images> converts a batch into (<buffer>, <recycle>): a buffer is handed
+out again only once every queued image that views it has been written, so steady-state batches of one shape reuse
+the same few buffers instead of allocating a new one per batch.
+
+Example:
+    >>> with ImageWriter(num_workers=2, image_format="png", compress_level=6) as writer:
+    ...     for data in dataset:
+    ...         ...
+    ...         save_images(webpage, visuals, img_path, writer=writer)
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import util
+
+EXTENSIONS = {"png": ".png", "jpg": ".jpg", "webp": ".webp"}
+
+
+class ImageWriter:
+    """Encode and write numpy images in background threads."""
+
+    def __init__(self, num_workers=2, max_pending=None, image_format="png", compress_level=6, quality=95):
+        """Initialize the ImageWriter class
+
+        Parameters:
+            num_workers (int)    -- number of writer threads; 0 writes synchronously on the calling thread
+            max_pending (int)    -- images that may wait to be written before <write> blocks (default: 2 per worker)
+            image_format (str)   -- png | jpg | webp; also determines the file extension
+            compress_level (int) -- zlib level of PNG files, 0 (fastest, largest) .. 9 (slowest, smallest)
+            quality (int)        -- quality of JPEG and WebP files, 1 .. 100
+        """
+        if image_format not in EXTENSIONS:
+            raise ValueError(f"unknown image format {image_format}; choose from {sorted(EXTENSIONS)}")
+        self.extension = EXTENSIONS[image_format]
+        self.save_kwargs = {"compress_level": compress_level} if image_format == "png" else {"quality": quality}
+        self.num_workers = num_workers
+        self.max_pending = max_pending or 2 * max(num_workers, 1)
+        self.executor = ThreadPoolExecutor(num_workers, thread_name_prefix="image-writer") if num_workers > 0 else None
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        self.errors = []
+        self.written = 0
+        self.encode_seconds = 0.0  # writer time spent encoding and writing
+        self.blocked_seconds = 0.0  # caller time spent waiting for a free slot
+        self.stalls = 0  # number of <write> calls that had to wait
+        self.buffers = []  # recycled conversion buffers, at most <max_pending>
+        self.closed = False
+
+    def buffer(self, shape):
+        """Return a recycled uint8 tensor of <shape> for <util.tensor2im_batch> to convert into, or None if there is none."""
+        with self.lock:
+            for i, buffer in enumerate(self.buffers):
+                if tuple(buffer.shape) == tuple(shape):
+                    return self.buffers.pop(i)
+        return None
+
+    def recycle(self, buffers):
+        """Make <buffers> available to <buffer> again; called once no queued image refers to them anymore."""
+        with self.lock:
+            self.buffers.extend(buffers)
+            del self.buffers[: -self.max_pending]  # keep the most recent ones
+
+    def write(self, image_numpy, path, aspect_ratio=1.0, callback=None):
+        """Queue <image_numpy> to be saved at <path>, which should end with <self.extension>.
+
+        The array must not be modified afterwards: <util.tensor2im> returns a fresh buffer on every call, and a buffer
+        from <buffer> must only be passed to <recycle> once the callbacks of its images have run.
+        <callback>, if given, is called without arguments once the file is on disk (on a writer thread).
+        """
+        if self.executor is None:
+            self._save(image_numpy, path, aspect_ratio)
+            if callback is not None:
+                callback()
+            return
+        if not self.slots.acquire(blocking=False):
+            start = time.perf_counter()
+            self.slots.acquire()
+            self.blocked_seconds += time.perf_counter() - start
+            self.stalls += 1
+        self.executor.submit(self._run, image_numpy, path, aspect_ratio, callback)
+
+    def _run(self, image_numpy, path, aspect_ratio, callback):
+        try:
+            self._save(image_numpy, path, aspect_ratio)
+            if callback is not None:
+                callback()
+        except Exception as e:
+            with self.lock:
+                self.errors.append((path, e))
+        finally:
+            self.slots.release()
+
+    def _save(self, image_numpy, path, aspect_ratio):
+        start = time.perf_counter()
+        util.save_image(image_numpy, path, aspect_ratio=aspect_ratio, **self.save_kwargs)
+        with self.lock:
+            self.written += 1
+            self.encode_seconds += time.perf_counter() - start
+
+    def close(self):
+        """Wait until every queued image is written, print the writer statistics and raise the first write error."""
+        if self.closed:
+            return
+        self.closed = True
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        print(
+            f"image writer: {self.written} images, {self.encode_seconds:.2f}s encoding on {self.num_workers} threads, "
+            f"blocked {self.blocked_seconds:.2f}s on {self.stalls} writes (max {self.max_pending} pending)"
+        )
+        if self.errors:
+            path, e = self.errors[0]
+            raise IOError(f"failed to write {len(self.errors)} images; {path}: {e}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is None:
+            self.close()
+        else:  # still flush what was queued, but let the original exception propagate
+            try:
+                self.close()
+            except IOError as e:
+                print(e)
@@ -0,0 +1,129 @@
+"""This module implements the completion manifest that makes test runs resumable.
+
+Every results directory (<results_dir>/<name>/<phase>_<epoch>) gets an append-only manifest.jsonl with one line per
+finished input:
+    {"input": <path>, "sha256": <input content hash>, "size": <bytes>, "mtime_ns": <mtime>, "checkpoint": <checkpoint hash>,
+     "outputs": [[label, file], ...]}
+A line is appended only after all of the input's result files are on disk, and result files are written atomically
+(<util.save_image> renames a finished temporary file into place). So a crashed run never records a partial result,
+and a half-written line at the end of the file (the crash happened mid-append) is ignored.
+
+The manifest never reads an input itself: the content hash is the one of the bytes the dataset read for inference
+(<loaded>), and packed inputs (--dataset_mode shard) are identified by the hash stored in the shard index, so their
+source files are not touched at all.
+
+With --resume, test.py skips the inputs whose latest line matches the input's current content and the current
+checkpoint and whose outputs still exist. An input file whose size and mtime are unchanged is taken as unchanged;
+only the others are hashed again. Inputs that were produced by an older checkpoint, or have changed since, are
+stylized again.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+
+def file_sha256(path):
+    """Return the hex SHA-256 of a file's content."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def checkpoint_hash(model, opt):
+    """Return a hash of every checkpoint file that <model.setup> loads for <opt>."""
+    load_suffix = f"iter_{opt.load_iter}" if opt.load_iter > 0 else opt.epoch
+    h = hashlib.sha256()
+    for name in model.model_names:
+        path = Path(model.save_dir) / f"{load_suffix}_net_{name}.pth"
+        if not path.is_file():
+            path = path.with_suffix(".safetensors")
+        h.update(f"{name}:{file_sha256(path) if path.is_file() else 'missing'}\n".encode())
+    return h.hexdigest()
+
+
+class Manifest:
+    """The completion records of one results directory."""
+
+    def __init__(self, path, checkpoint, resume=False, read_paths=(), content_hash=None):
+        """Initialize the Manifest class
+
+        Parameters:
+            path (str)              -- the manifest file
+            checkpoint (str)        -- hash of the checkpoint the results are produced with (see <checkpoint_hash>)
+            resume (bool)           -- keep the existing records; otherwise the manifest starts empty
+            read_paths (list)       -- with <resume>, other manifests of the same results directory to read first (e.g. the merged one of a distributed run)
+            content_hash (function) -- for inputs that are not files, content_hash(input path) returns their current hash (or None)
+        """
+        self.path = Path(path)
+        self.checkpoint = checkpoint
+        self.content_hash = content_hash
+        self.records = {}  # input path -> latest record
+        self.added = []  # the records of this run
+        self.sources = {}  # input path -> (sha256, size, mtime_ns) of the content read by this run
+        if resume:
+            for read_path in [*map(Path, read_paths), self.path]:
+                if read_path.is_file():
+                    self._read(read_path)
+        self.lock = threading.Lock()
+        self.file = open(self.path, "at" if resume else "wt")
+
+    def _read(self, path):
+        with open(path, "rt") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by a crash
+                self.records[record["input"]] = record
+
+    def finished(self, input_paths):
+        """Return the subset of <input_paths> that is done with the current checkpoint and unchanged since."""
+        done = set()
+        for input_path in input_paths:
+            record = self.records.get(input_path)
+            if record is None or record["checkpoint"] != self.checkpoint:
+                continue
+            if all((self.path.parent / "images" / file).is_file() for _, file in record["outputs"]) and self._unchanged(input_path, record):
+                done.add(input_path)
+        return done
+
+    def _unchanged(self, input_path, record):
+        if self.content_hash is not None:
+            sha256 = self.content_hash(input_path)
+            return sha256 is not None and sha256 == record["sha256"]
+        try:
+            st = os.stat(input_path)
+        except OSError:
+            return False
+        if (st.st_size, st.st_mtime_ns) == (record.get("size"), record.get("mtime_ns")):
+            return True
+        return record["sha256"] is not None and file_sha256(input_path) == record["sha256"]  # touched or copied: compare the content
+
+    def outputs(self, input_path):
+        """Return the (label, file) pairs recorded for <input_path>."""
+        return self.records[input_path]["outputs"]
+
+    def loaded(self, input_paths, hashes=None):
+        """Remember the content hashes of inputs the dataset has just read (None if it provides none) for <add>."""
+        for input_path, sha256 in zip(input_paths, hashes or [None] * len(input_paths)):
+            st = os.stat(input_path) if self.content_hash is None else None
+            with self.lock:
+                self.sources[input_path] = (sha256, st and st.st_size, st and st.st_mtime_ns)
+
+    def add(self, input_path, outputs):
+        """Record <input_path> as done; call once its <outputs> [(label, file), ...] are on disk (thread-safe)."""
+        with self.lock:
+            sha256, size, mtime_ns = self.sources.pop(input_path, (None, None, None))
+            record = {"input": input_path, "sha256": sha256, "size": size, "mtime_ns": mtime_ns, "checkpoint": self.checkpoint, "outputs": outputs}
+            self.records[input_path] = record
+            self.added.append(record)
+            self.file.write(json.dumps(record) + "\n")
+            self.file.flush()
+
+    def close(self):
+        self.file.close()
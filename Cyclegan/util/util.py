@@ -7,6 +7,7 @@ from PIL import Image
 from pathlib import Path
 import torch.distributed as dist
 import os
+import threading
 
 
 def tensor2im(input_image, imtype=np.uint8):
@@ -17,6 +18,8 @@ def tensor2im(input_image, imtype=np.uint8):
         imtype (type)        --  the desired type of the converted numpy array
     """
     if not isinstance(input_image, np.ndarray):
+        if isinstance(input_image, torch.Tensor) and imtype == np.uint8:  # fused path, see <tensor2im_batch>
+            return tensor2im_batch(input_image.data[:1])[0].numpy().transpose(1, 2, 0)
         if isinstance(input_image, torch.Tensor):  # get the data from a variable
             image_tensor = input_image.data
         else:
@@ -30,6 +33,90 @@ def tensor2im(input_image, imtype=np.uint8):
     return image_numpy.astype(imtype)
 
 
+def tensor2im_batch(images, out=None):
+    """Convert a batch of image tensors in [-1, 1] into planar uint8 images.
+
+    Parameters:
+        images (tensor)    -- BxCxHxW tensor in [-1, 1] (C = 1 or 3), on any device
+        out (uint8 tensor) -- optional preallocated Bx3xHxW CPU buffer; reused if its shape matches
+
+    Clamping and rescaling run in place on one float temporary; (x + 1) * 127.5 rounds exactly like the
+    (x + 1) / 2 * 255 of the original <tensor2im>. Quantization to uint8 (and, for GPU inputs, the transfer to the
+    host) is then a single copy into <out>. The buffer stays planar: interleaving the channels is left to <im2pil>,
+    which lets PIL do it while building the image instead of in an extra numpy pass. Returns <out>.
+    """
+    b, c, h, w = images.shape
+    if out is None or tuple(out.shape) != (b, 3, h, w):
+        out = torch.empty((b, 3, h, w), dtype=torch.uint8, pin_memory=images.is_cuda)
+    scaled = images.detach().float().add(1.0).mul_(127.5).clamp_(0.0, 255.0)
+    if c == 1:  # grayscale to RGB
+        scaled = scaled.expand(b, 3, h, w)
+    if scaled.device.type == "cpu":
+        np.copyto(out.numpy(), scaled.numpy(), casting="unsafe")  # numpy's float -> uint8 cast is ~3x faster than torch's
+    else:
+        out.copy_(scaled.to(torch.uint8))
+    return out
+
+
+def im2pil(image_numpy):
+    """Return a PIL image of an HxWx3 (or HxW) uint8 numpy array.
+
+    For the channel-last views returned by <tensor2im> the three planes are wrapped without copying and merged by
+    PIL directly into the image's own storage.
+    """
+    planes = image_numpy.transpose(2, 0, 1) if image_numpy.ndim == 3 else None
+    if planes is None or planes.shape[0] != 3 or image_numpy.dtype != np.uint8 or not planes.flags.c_contiguous:
+        return Image.fromarray(image_numpy)
+    h, w = planes.shape[1:]
+    return Image.merge("RGB", [Image.frombuffer("L", (w, h), plane, "raw", "L", 0, 1) for plane in planes])
+
+
+def natural_image(channels=3, size=128, seed=0):
+    """Return a deterministic 1xCxHxW test image in [-1, 1] with the statistics of a photograph.
+
+    Its power spectrum falls off as 1/f^2 (like natural images, unlike uniform noise), so smooth regions and edges
+    are mixed as in real inputs; the same <seed> always gives the same image, on any host.
+    """
+    generator = torch.Generator().manual_seed(seed)
+    f = torch.fft.fftfreq(size, dtype=torch.float64)
+    radius = torch.sqrt(f[:, None] ** 2 + f[None, :] ** 2)
+    radius[0, 0] = 1.0
+    spectrum = torch.complex(torch.randn(channels, size, size, generator=generator, dtype=torch.float64), torch.randn(channels, size, size, generator=generator, dtype=torch.float64))
+    image = torch.fft.ifft2(spectrum / radius).real
+    image = (image - image.mean()) / image.std() / 3.0  # about the contrast of a photograph
+    return image.clamp(-1.0, 1.0).float().unsqueeze(0)
+
+
+def psnr(image, reference):
+    """Return the peak signal-to-noise ratio (dB) between two image tensors in [-1, 1], measured on the 0-255 scale."""
+    mse = torch.mean((image.float() - reference.float()) ** 2).item() * (255.0 / 2.0) ** 2
+    return float("inf") if mse == 0 else 10.0 * np.log10(255.0**2 / mse)
+
+
+def ssim(image, reference, window_size=11, sigma=1.5):
+    """Return the mean structural similarity (SSIM) between two NCHW image tensors in [-1, 1].
+
+    Uses the usual Gaussian window of Wang et al. (2004), computed per channel on the 0-255 scale.
+    """
+    x = (image.float() + 1) * 127.5
+    y = (reference.float() + 1) * 127.5
+    coords = torch.arange(window_size, dtype=torch.float32, device=x.device) - window_size // 2
+    g = torch.exp(-(coords**2) / (2 * sigma**2))
+    g = g / g.sum()
+    window = (g[:, None] * g[None, :]).expand(x.shape[1], 1, window_size, window_size).contiguous()
+
+    def filt(t):
+        return torch.nn.functional.conv2d(t, window, groups=x.shape[1])
+
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+    mu_x, mu_y = filt(x), filt(y)
+    var_x = filt(x * x) - mu_x**2
+    var_y = filt(y * y) - mu_y**2
+    cov = filt(x * y) - mu_x * mu_y
+    ssim_map = ((2 * mu_x * mu_y + c1) * (2 * cov + c2)) / ((mu_x**2 + mu_y**2 + c1) * (var_x + var_y + c2))
+    return ssim_map.mean().item()
+
+
 def diagnose_network(net, name="network"):
     """Calculate and print the mean of average absolute(gradients)
 
@@ -50,22 +137,36 @@ def diagnose_network(net, name="network"):
 
 
 # initialize ddp
-def init_ddp():
-    # Initialize DDP if LOCAL_RANK is set
+def init_ddp(threads_per_rank=0):
+    """Join the process group of a torchrun launch (if WORLD_SIZE > 1) and return the device of this process.
+
+    Parameters:
+        threads_per_rank (int) -- torch threads of every rank on CPU; 0 divides the cores of the host between its ranks
+
+    Ranks run on their own GPU with NCCL, or on the CPU with gloo when there is no GPU. CPU ranks of one host share its
+    cores: torchrun starts them with OMP_NUM_THREADS=1, and leaving the default of all cores to every rank would
+    oversubscribe them, so each rank gets its share (LOCAL_WORLD_SIZE is the number of ranks on this host).
+    """
     is_ddp = "WORLD_SIZE" in os.environ and int(os.environ["WORLD_SIZE"]) > 1
 
     if is_ddp:
         if not dist.is_initialized():
-            dist.init_process_group(backend="nccl")
+            dist.init_process_group(backend="nccl" if torch.cuda.is_available() else "gloo")
         local_rank = int(os.environ["LOCAL_RANK"])
-        device = torch.device(f"cuda:{local_rank}")
-        torch.cuda.set_device(local_rank)
+        if torch.cuda.is_available():
+            device = torch.device(f"cuda:{local_rank}")
+            torch.cuda.set_device(local_rank)
+        else:
+            device = torch.device("cpu")
     elif torch.cuda.is_available():
         device = torch.device("cuda:0")
         torch.cuda.set_device(0)
     else:
         device = torch.device("cpu")
-    print(f"Initialized with device {device}")
+    if device.type == "cpu" and (is_ddp or threads_per_rank > 0):
+        cores = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count()
+        torch.set_num_threads(threads_per_rank or max(1, cores // int(os.environ.get("LOCAL_WORLD_SIZE", 1))))
+    print(f"Initialized with device {device}" + (f", {torch.get_num_threads()} threads" if device.type == "cpu" else ""))
     return device
 
 
@@ -75,22 +176,27 @@ def cleanup_ddp():
         dist.destroy_process_group()
 
 
-def save_image(image_numpy, image_path, aspect_ratio=1.0):
+def save_image(image_numpy, image_path, aspect_ratio=1.0, **save_kwargs):
     """Save a numpy image to the disk
 
     Parameters:
         image_numpy (numpy array) -- input numpy array
-        image_path (str)          -- the path of the image
+        image_path (str)          -- the path of the image; its extension selects the format
+        save_kwargs               -- encoder options passed to PIL, e.g. compress_level (PNG) or quality (JPEG, WebP)
     """
 
-    image_pil = Image.fromarray(image_numpy)
+    image_pil = im2pil(image_numpy)
     h, w, _ = image_numpy.shape
 
     if aspect_ratio > 1.0:
         image_pil = image_pil.resize((h, int(w * aspect_ratio)), Image.BICUBIC)
     if aspect_ratio < 1.0:
         image_pil = image_pil.resize((int(h / aspect_ratio), w), Image.BICUBIC)
-    image_pil.save(image_path)
+    # write to a temporary file and rename it into place, so an interrupted run never leaves a truncated image behind
+    image_path = Path(image_path)
+    tmp_path = image_path.with_name(f"{image_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    image_pil.save(tmp_path, format=Image.registered_extensions()[image_path.suffix.lower()], **save_kwargs)
+    os.replace(tmp_path, image_path)
 
 
 def print_numpy(x, val=True, shp=False):
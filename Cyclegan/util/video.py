@@ -0,0 +1,291 @@
+"""This module implements a streaming video / animated-GIF stylization pipeline.
+
+Frames are decoded, stylized and encoded one at a time, so a clip is never held in memory as a whole.
+The pipeline runs as three overlapping stages connected by bounded queues:
+    -- <decode>:  read frames (OpenCV for videos, PIL for GIFs) and decide which frames need a forward pass.
+    -- <infer>:   batch the changed frames through the generator.
+    -- <encode>:  write the stylized frames (incrementally with an OpenCV VideoWriter for videos; GIFs are written by PIL on close).
+
+Frames that barely differ from the last stylized keyframe (mean absolute difference of downscaled
+thumbnails below <diff_threshold>) reuse the previous generator output instead of running the network again.
+"""
+
+import queue
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image, ImageSequence
+
+_END = None  # sentinel passed between stages once the stream is exhausted
+
+
+class StageStats:
+    """Throughput counters of a single pipeline stage."""
+
+    def __init__(self, name):
+        self.name = name
+        self.frames = 0
+        self.busy = 0.0  # seconds spent doing work (excluding time blocked on the queues)
+
+    def add(self, frames, seconds):
+        self.frames += frames
+        self.busy += seconds
+
+    @property
+    def fps(self):
+        return self.frames / self.busy if self.busy > 0 else 0.0
+
+    def __str__(self):
+        return f"{self.name}: {self.frames} frames in {self.busy:.2f}s ({self.fps:.1f} frames/s)"
+
+
+def is_gif(path):
+    return Path(path).suffix.lower() == ".gif"
+
+
+def processing_size(width, height, load_size=None, base=4):
+    """Return the (width, height) the generator runs at.
+
+    The ResNet generator needs both sides to be a multiple of 4 (see <__make_power_2> in data/base_dataset.py).
+    If <load_size> is given, frames are first scaled so that their width equals <load_size>.
+    """
+    if load_size:
+        height = height * load_size / width
+        width = load_size
+    w = max(base, int(round(width / base) * base))
+    h = max(base, int(round(height / base) * base))
+    return w, h
+
+
+def iter_video_frames(path):
+    """Yield (RGB uint8 HxWx3 frame, duration in ms) pairs from a video file readable by OpenCV."""
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise IOError(f"cannot open video {path}")
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            yield cv2.cvtColor(frame, cv2.COLOR_BGR2RGB), 1000.0 / fps
+    finally:
+        cap.release()
+
+
+def iter_gif_frames(path):
+    """Yield (RGB uint8 HxWx3 frame, duration in ms) pairs from an animated GIF, one frame at a time."""
+    with Image.open(path) as im:
+        for frame in ImageSequence.Iterator(im):
+            yield np.asarray(frame.convert("RGB")), frame.info.get("duration", 100)
+
+
+def probe(path):
+    """Return (width, height, fps) of a video or GIF without decoding the whole clip."""
+    if is_gif(path):
+        with Image.open(path) as im:
+            width, height = im.size
+            duration = im.info.get("duration", 100) or 100
+        return width, height, 1000.0 / duration
+    cap = cv2.VideoCapture(str(path))
+    if not cap.isOpened():
+        raise IOError(f"cannot open video {path}")
+    width, height = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)), int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    return width, height, fps
+
+
+class VideoFrameWriter:
+    """Incrementally encode RGB frames into a video file with OpenCV."""
+
+    def __init__(self, path, size, fps, fourcc="mp4v"):
+        self.writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+        if not self.writer.isOpened():
+            raise IOError(f"cannot open video writer for {path}")
+
+    def write(self, frame, duration=None):
+        self.writer.write(cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    def close(self):
+        self.writer.release()
+
+
+class GifFrameWriter:
+    """Encode RGB frames into an animated GIF with PIL's <save_all>.
+
+    PIL writes an animation only once it has every frame, so the frames are kept until <close>, each quantized to a
+    paletted image as it arrives (one byte per pixel, a third of the RGB frame).
+    """
+
+    def __init__(self, path, size=None, fps=None, loop=0):
+        self.path = path
+        self.loop = loop
+        self.frames = []
+        self.durations = []
+
+    def write(self, frame, duration=100):
+        self.frames.append(Image.fromarray(frame).quantize(colors=256, method=Image.Quantize.MEDIANCUT))
+        self.durations.append(int(duration))
+
+    def close(self):
+        if self.frames:
+            self.frames[0].save(self.path, format="GIF", save_all=True, append_images=self.frames[1:], duration=self.durations, loop=self.loop, disposal=1, optimize=False)
+        self.frames, self.durations = [], []
+
+
+def _thumbnail(frame, factor=8):
+    h, w = frame.shape[:2]
+    return cv2.resize(frame, (max(1, w // factor), max(1, h // factor)), interpolation=cv2.INTER_AREA)
+
+
+class VideoStylizer:
+    """Stylize a video or an animated GIF with a generator, streaming frames through decode/infer/encode threads.
+
+    Example:
+        >>> stylizer = VideoStylizer(model.netG, opt.device, batch_size=4)
+        >>> stats = stylizer.run("clip.mp4", "clip_monet.mp4")
+    """
+
+    def __init__(self, netG, device, batch_size=4, diff_threshold=2.0, queue_size=16, load_size=None, uint8_io=False):
+        """Initialize the VideoStylizer class
+
+        Parameters:
+            netG (nn.Module or callable) -- generator mapping a Bx3xHxW tensor in [-1, 1] to an image tensor in [-1, 1]
+            device (torch.device)        -- device the generator runs on
+            batch_size (int)             -- number of changed frames stacked into one forward pass
+            diff_threshold (float)       -- mean absolute pixel difference (0-255) below which a frame reuses the previous output; 0 disables reuse
+            queue_size (int)             -- capacity of the queues between stages; bounds the number of frames held in memory
+            load_size (int)              -- if given, frames are scaled to this width before stylization
+            uint8_io (bool)              -- if True, <netG> maps uint8 BxHxWx3 frames to uint8 frames directly (see models/inference_generator.py)
+        """
+        self.netG = netG
+        self.device = device
+        self.batch_size = max(1, batch_size)
+        self.diff_threshold = diff_threshold
+        self.queue_size = queue_size
+        self.load_size = load_size
+        self.uint8_io = uint8_io
+
+    def run(self, input_path, output_path):
+        """Stylize <input_path> into <output_path> and return the per-stage StageStats (decode, infer, encode)."""
+        width, height, fps = probe(input_path)
+        size = processing_size(width, height, self.load_size)
+        frames = iter_gif_frames(input_path) if is_gif(input_path) else iter_video_frames(input_path)
+        writer_class = GifFrameWriter if is_gif(output_path) else VideoFrameWriter
+        writer = writer_class(output_path, size, fps)
+
+        self.stats = {name: StageStats(name) for name in ("decode", "infer", "encode")}
+        self.reused = 0
+        self.errors = []
+        decoded, stylized = queue.Queue(self.queue_size), queue.Queue(self.queue_size)
+        threads = [
+            threading.Thread(target=self._guard, args=(self._decode, None, decoded, frames, size), daemon=True),
+            threading.Thread(target=self._guard, args=(self._infer, decoded, stylized), daemon=True),
+            threading.Thread(target=self._guard, args=(self._encode, stylized, None, writer), daemon=True),
+        ]
+        start = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        writer.close()
+        if self.errors:
+            raise self.errors[0]
+
+        total = self.stats["encode"].frames
+        print(f"stylized {total} frames ({self.reused} reused) in {time.perf_counter() - start:.2f}s -> {output_path}")
+        for s in self.stats.values():
+            print(f"  {s}")
+        return self.stats
+
+    def _guard(self, stage, inp, out, *args):
+        """Run a stage; on failure record the error, end the downstream stage and drain the upstream one."""
+        try:
+            stage(*[q for q in (inp, out) if q is not None], *args)
+        except Exception as e:
+            self.errors.append(e)
+            if out is not None:
+                out.put(_END)
+            while inp is not None and inp.get() is not _END:
+                pass
+
+    def _decode(self, out, frames, size):
+        """Decode frames and mark each one as a keyframe (needs a forward pass) or a reused frame."""
+        stats = self.stats["decode"]
+        last_thumb = None
+        t = time.perf_counter()
+        for frame, duration in frames:
+            if self.errors:
+                break
+            if (frame.shape[1], frame.shape[0]) != size:
+                frame = cv2.resize(frame, size, interpolation=cv2.INTER_AREA)
+            thumb = _thumbnail(frame).astype(np.int16)
+            reuse = last_thumb is not None and self.diff_threshold > 0 and float(np.abs(thumb - last_thumb).mean()) < self.diff_threshold
+            if not reuse:
+                last_thumb = thumb
+            stats.add(1, time.perf_counter() - t)
+            out.put((None if reuse else frame, duration))
+            t = time.perf_counter()
+        out.put(_END)
+
+    def _infer(self, inp, out):
+        """Batch keyframes through the generator and resolve reused frames to the latest keyframe output.
+
+        A batch runs once it is full, or as soon as no further frame is ready (or <queue_size> frames wait on it), so
+        the reused frames of a static clip follow their keyframe instead of waiting for <batch_size> keyframes. Reused
+        frames whose keyframe is already stylized are passed on right away.
+        """
+        stats = self.stats["infer"]
+        pending = []  # (frame or None, duration) in stream order, waiting for the keyframes among them to be stylized
+        last = None
+        done = False
+        while not done:
+            item = inp.get()
+            done = item is _END
+            if not done and item[0] is None and not pending:  # its keyframe is stylized already
+                self.reused += 1
+                stats.add(1, 0.0)
+                out.put((last, item[1]))
+                continue
+            if not done:
+                pending.append(item)
+            n_keys = sum(frame is not None for frame, _ in pending)
+            if pending and (done or n_keys >= self.batch_size or len(pending) >= self.queue_size or inp.empty()):
+                t = time.perf_counter()
+                outputs = iter(self._forward([frame for frame, _ in pending if frame is not None]))
+                stats.add(len(pending), time.perf_counter() - t)
+                for frame, duration in pending:
+                    if frame is None:
+                        self.reused += 1
+                    else:
+                        last = next(outputs)
+                    out.put((last, duration))
+                pending = []
+        out.put(_END)
+
+    def _forward(self, frames):
+        if not frames:
+            return []
+        with torch.no_grad():
+            if self.uint8_io:
+                return list(self.netG(torch.from_numpy(np.stack(frames)).to(self.device)).cpu().numpy())
+            batch = torch.from_numpy(np.stack(frames)).to(self.device).permute(0, 3, 1, 2).float().div_(127.5).sub_(1.0)
+            fake = self.netG(batch)
+            fake = fake.add_(1.0).mul_(127.5).clamp_(0, 255).to(torch.uint8).permute(0, 2, 3, 1).cpu().numpy()
+        return list(fake)
+
+    def _encode(self, inp, writer):
+        stats = self.stats["encode"]
+        while True:
+            item = inp.get()
+            if item is _END:
+                break
+            frame, duration = item
+            t = time.perf_counter()
+            writer.write(frame, duration)
+            stats.add(1, time.perf_counter() - t)
@@ -1,40 +1,100 @@
 import numpy as np
+import torch
 import sys
 import ntpath
 import time
-from . import util, html
+import threading
+from . import util
 from pathlib import Path
-import wandb
 import os
 import torch.distributed as dist
 
 
-def save_images(webpage, visuals, image_path, aspect_ratio=1.0, width=256):
+def save_images(webpage, visuals, image_path, aspect_ratio=1.0, width=256, writer=None, image_sizes=None, on_saved=None, store=None):
     """Save images to the disk.
 
     Parameters:
-        webpage (the HTML class) -- the HTML webpage class that stores these imaegs (see html.py for more details)
+        webpage (the HTML class) -- the HTML webpage class that stores these imaegs (see html.py for more details); unused with <store>
         visuals (OrderedDict)    -- an ordered dictionary that stores (name, images (either tensor or numpy) ) pairs
-        image_path (str)         -- the string is used to create image paths
+        image_path (str list)    -- the paths of the images of the batch; used to create image paths
         aspect_ratio (float)     -- the aspect ratio of saved images
         width (int)              -- the images will be resized to width x width
+        writer (ImageWriter)     -- if given, the images are encoded and written in its background threads (see image_writer.py)
+        image_sizes (list)       -- (height, width) of every image of a padded batch; results are cropped back to it (see data/bucket_sampler.py)
+        on_saved (function)      -- called as on_saved(input path, [(label, file name), ...]) once all results of an input are on disk
+        store (ArrayStoreWriter) -- if given, the results are appended to this array container instead of image files (see array_store.py)
 
     This function will save images stored in 'visuals' to the HTML file specified by 'webpage'.
+    A batch of tensors is converted in one go and written as one result per input image. With a <writer>, the
+    conversion buffers come from its pool and go back to it once every result of the batch has been written.
     """
-    image_dir = webpage.get_image_dir()
-    name = Path(image_path[0]).stem
-
-    webpage.add_header(name)
-    ims, txts, links = [], [], []
+    image_dir = webpage.get_image_dir() if store is None else None
+    # BxCxHxW tensors are quantized batch-wise into planar uint8 buffers; numpy images are single results
+    buffers = {}
     for label, im_data in visuals.items():
-        im = util.tensor2im(im_data)
-        image_name = f"{name}_{label}.png"
-        save_path = image_dir / image_name
-        util.save_image(im, save_path, aspect_ratio=aspect_ratio)
-        ims.append(image_name)
-        txts.append(label)
-        links.append(image_name)
-    webpage.add_images(ims, txts, links, width=width)
+        if isinstance(im_data, torch.Tensor):
+            b, _, h, w = im_data.shape
+            buffers[label] = util.tensor2im_batch(im_data, writer.buffer((b, 3, h, w)) if writer else None)
+    batches = {label: buffers[label].numpy() if label in buffers else None for label in visuals}
+    # the buffers are recycled after the last queued write that views them (and after this function is done with them)
+    recycle = _Countdown(1 + (0 if store is not None else len(image_path) * len(visuals)), writer.recycle if writer and buffers else None, list(buffers.values()))
+
+    for i, path in enumerate(image_path):
+        if store is not None:  # no image files and no report rows: the container's index lists the results
+            for label, im_data in visuals.items():
+                h, w = image_sizes[i] if image_sizes else (None, None)
+                store.add(util.tensor2im(im_data) if batches[label] is None else batches[label][i, :, :h, :w].transpose(1, 2, 0), path, label)
+            continue
+        name = Path(path).stem
+        webpage.add_header(name)
+        ims, txts, links = [], [], []
+        done = _Countdown(len(visuals), on_saved, path, [(label, f"{name}_{label}{writer.extension if writer else '.png'}") for label in visuals])
+        for label, im_data in visuals.items():
+            if batches[label] is None:
+                im = util.tensor2im(im_data)
+            else:
+                h, w = image_sizes[i] if image_sizes else batches[label].shape[2:]
+                im = batches[label][i, :, :h, :w].transpose(1, 2, 0)
+            image_name = f"{name}_{label}{writer.extension if writer else '.png'}"
+            save_path = image_dir / image_name
+            if writer is None:
+                util.save_image(im, save_path, aspect_ratio=aspect_ratio)
+                done()
+            else:
+                writer.write(im, save_path, aspect_ratio=aspect_ratio, callback=_Chain(done, recycle))
+            ims.append(image_name)
+            txts.append(label)
+            links.append(image_name)
+        webpage.add_images(ims, txts, links, width=width)
+    recycle()
+
+
+class _Countdown:
+    """Call <function(*args)> on the <count>-th call of this object (from any thread); does nothing if function is None."""
+
+    def __init__(self, count, function, *args):
+        self.count = count
+        self.function = function
+        self.args = args
+        self.lock = threading.Lock()
+
+    def __call__(self):
+        with self.lock:
+            self.count -= 1
+            fire = self.count == 0
+        if fire and self.function is not None:
+            self.function(*self.args)
+
+
+class _Chain:
+    """Call every function given to the constructor, in order, without arguments."""
+
+    def __init__(self, *functions):
+        self.functions = functions
+
+    def __call__(self):
+        for function in self.functions:
+            function()
 
 
 class Visualizer:
@@ -63,6 +123,8 @@ class Visualizer:
 
         # Initialize wandb if enabled
         if self.use_wandb:
+            import wandb  # optional; imported here so that loading this module for <save_images> stays cheap
+
             # Only initialize wandb on main process (rank 0)
             if not dist.is_initialized() or dist.get_rank() == 0:
                 self.wandb_project_name = getattr(opt, "wandb_project_name", "CycleGAN-and-pix2pix")
@@ -102,6 +164,8 @@ class Visualizer:
             return
 
         if self.use_wandb:
+            import wandb
+
             ims_dict = {}
             for label, image in visuals.items():
                 image_numpy = util.tensor2im(image)
@@ -118,6 +182,8 @@ class Visualizer:
                 util.save_image(image_numpy, img_path)
 
             # update website
+            from . import html
+
             webpage = html.HTML(self.web_dir, f"Experiment name = {self.name}", refresh=1)
             for n in range(epoch, 0, -1):
                 webpage.add_header(f"epoch [{n}]")
@@ -166,3 +232,24 @@ class Visualizer:
         if local_rank == 0:
             with open(self.log_name, "a") as log_file:
                 log_file.write(f"{message}\n")  # save the message
+
+    def print_throughput(self, epoch, iters, images_per_sec, t_data, t_comp):
+        """print the training throughput since the last report on console; also save it to the disk
+
+        Parameters:
+            epoch (int) -- current epoch
+            iters (int) -- current training iteration during this epoch (reset to 0 at the end of every epoch)
+            images_per_sec (float) -- training images processed per second by this process
+            t_data (float) -- mean time per iteration spent waiting for the data loader
+            t_comp (float) -- mean time per iteration spent on everything else (forward, backward, optimizer steps)
+        """
+        local_rank = int(os.environ.get("LOCAL_RANK", 0))
+        processes = f" x {dist.get_world_size()} processes" if dist.is_initialized() else ""
+        data_share = t_data / max(t_data + t_comp, 1e-9)
+        message = f"[Rank {local_rank}] (epoch: {epoch}, iters: {iters}) throughput: {images_per_sec:.1f} images/s{processes}, data wait: {t_data * 1000:.1f} ms/iter ({data_share:.0%}), compute: {t_comp * 1000:.1f} ms/iter"
+        print(message)
+
+        # Only save to log file on main process (rank 0)
+        if local_rank == 0:
+            with open(self.log_name, "a") as log_file:
+                log_file.write(f"{message}\n")
@@ -1,5 +1,7 @@
 import subprocess
 import os
+import time
+import shutil
 import sys
 import streamlit as st
 from PIL import Image
@@ -18,10 +20,29 @@ script_path = os.path.join(cyclegan_dir, 'test.py')
 dataroot = os.path.join(parent_dir, 'datasets', 'test', 'testA')
 results_dir = os.path.join(parent_dir, 'results')
 checkpoints_dir = os.path.join(parent_dir, 'checkpoints')
+# optional: directory of ahead-of-time compiled generators (see serving/compile_cache.py)
+compile_cache_dir = os.environ.get('COMPILE_CACHE_DIR')
+# optional: bf16 / channels_last inference (falls back to fp32 on hosts without native bfloat16)
+inference_precision = os.environ.get('INFERENCE_PRECISION', 'fp32')
+channels_last = os.environ.get('INFERENCE_CHANNELS_LAST', '0') == '1'
+# optional: stylize through the HTTP inference service (see serving/service.py); falls back to in-process inference
+inference_service_url = os.environ.get('INFERENCE_SERVICE_URL')
+# optional: run stylizations as durable jobs picked up by 'python -m serving.jobs worker' (see serving/jobs.py)
+jobs_dir = os.environ.get('JOBS_DIR')
+job_poll_seconds = float(os.environ.get('JOB_POLL_SECONDS', 2))
 
 sys.path.insert(0, parent_dir)
 sys.path.insert(0, cyclegan_dir)
 
+# load and warm up every style once per process, in the background, then hot-swap new and changed
+# checkpoints (see serving/warmup.py, serving/registry.py); the container starts Streamlit through
+# serving/app.py, which has already started this warm-up with the server and owns the readiness file
+from serving.checkpoints import find_styles
+if not (inference_service_url or jobs_dir):  # otherwise styles are only loaded here if we have to fall back
+    from serving.warmup import start_warm_up, sizes_from_env
+    start_warm_up(checkpoints_dir, sizes_from_env(), signal_ready=False, compile_cache_dir=compile_cache_dir,
+                  precision=inference_precision, channels_last=channels_last)
+
 if 'language' not in st.session_state:
     st.session_state.language = "en"
 if 'original_image' not in st.session_state:
@@ -61,12 +82,27 @@ st.set_page_config(
 )
 
 # ===== Util functions =====
-def get_localized_style_names(lang: str) -> list:
-    style_keys = ["Monet", "Ukiyoe", "Cezanne", "Vangogh"]
+PAINTER_STYLES = ["Monet", "Ukiyoe", "Cezanne", "Vangogh"]
+
+def get_style_to_model() -> dict:
+    """Style key -> checkpoint directory; styles dropped into checkpoints/ show up without a restart"""
+    style_to_model = {
+        "Monet": "style_monet_pretrained",
+        "Ukiyoe": "style_ukiyoe_pretrained",
+        "Cezanne": "style_cezanne_pretrained",
+        "Vangogh": "style_vangogh_pretrained"
+    }
+    for name in find_styles(checkpoints_dir):
+        key = name.removeprefix('style_').removesuffix('_pretrained').capitalize()
+        style_to_model.setdefault(key, name)
+    return style_to_model
+
+def get_localized_style_names(lang: str, style_keys=None) -> list:
+    style_keys = style_keys or list(get_style_to_model())
     return [trans.get_style_name(lang, key) for key in style_keys]
 
 def get_english_style_from_localized(localized_name: str, lang: str) -> str:
-    style_keys = ["Monet", "Ukiyoe", "Cezanne", "Vangogh"]
+    style_keys = list(get_style_to_model())
     for key in style_keys:
         if trans.get_style_name(lang, key) == localized_name:
             return key
@@ -229,11 +265,11 @@ with st.sidebar:
 # ===== About styles =====
 with st.expander(trans.get(st.session_state.language, "styles_section.title")):
     
-    localized_style_names = get_localized_style_names(st.session_state.language)
+    localized_style_names = get_localized_style_names(st.session_state.language, PAINTER_STYLES)
     
     style_tabs = st.tabs(localized_style_names)
 
-    for idx, style_key in enumerate(["Monet", "Ukiyoe", "Cezanne", "Vangogh"]):
+    for idx, style_key in enumerate(PAINTER_STYLES):
         with style_tabs[idx]:
             localized_name = trans.get_style_name(st.session_state.language, style_key)
             painter_text = get_painter_text(style_key, st.session_state.language)
@@ -250,14 +286,7 @@ with st.expander(trans.get(st.session_state.language, "styles_section.title")):
                 st.write(painter_text)
 # ===== Image process =====
 if st.session_state.get('process_requested') and st.session_state.get('file_ready'):
-    style_to_model = {
-        "Monet": "style_monet_pretrained",
-        "Ukiyoe": "style_ukiyoe_pretrained",
-        "Cezanne": "style_cezanne_pretrained",
-        "Vangogh": "style_vangogh_pretrained"
-    }
-    
-    model_name = style_to_model.get(st.session_state.option, "style_monet_pretrained")
+    model_name = get_style_to_model().get(st.session_state.option, "style_monet_pretrained")
     
     model_checkpoint = os.path.join(checkpoints_dir, model_name, 'latest_net_G.pth')
     
@@ -286,6 +315,7 @@ if st.session_state.get('process_requested') and st.session_state.get('file_read
                         st.error(trans.get(st.session_state.language, "errors.file_found_error")) #
                         st.session_state.process_requested = False
                     
+                    success, message = False, None
                     try:
                         sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
                         from run_cyclegan_direct import run_test_directly
@@ -293,22 +323,49 @@ if st.session_state.get('process_requested') and st.session_state.get('file_read
                         status_text.text(trans.get(st.session_state.language, "progress.first"))
                         progress_bar.progress(30)
                         
-                        success, message = run_test_directly(
-                            dataroot=dataroot,
-                            name=model_name,
-                            checkpoints_dir=checkpoints_dir,
-                            results_dir=results_dir,
-                            cyclegan_dir=cyclegan_dir, 
-                            model='test',
-                            no_dropout=True,
-                            dataset_mode='single',
-                            num_test=1,
-                            load_size=256,
-                            crop_size=256,
-                            preprocess='none',
-                            max_dataset_size=1000,
-                            no_flip=True
-                        )
+                        if jobs_dir:
+                            # the same image and style always map to the same job, so a refresh or a restart
+                            # reconnects to the running or finished job instead of computing it again
+                            from serving.jobs import JobQueue
+                            job_queue = JobQueue(jobs_dir)
+                            job_id = job_queue.submit(input_file, model_name)  # a failed job is only run again from its retry button
+                            # the job runs in the workers, not in this rerun: the reconnect branch below polls it
+                            st.query_params['job'] = job_id
+                            st.session_state.job_id = job_id
+                            st.session_state.base_name = os.path.splitext(current_filename)[0]
+                            st.session_state.styled_image = None
+                            st.session_state.process_requested = False
+                            st.rerun()
+                        
+                        if not success and inference_service_url:
+                            from serving.client import get_client
+                            try:
+                                with open(input_file, 'rb') as f:
+                                    output = get_client(inference_service_url).stylize(f.read(), model_name)
+                                success, message = True, Image.open(io.BytesIO(output))
+                            except OSError as e:
+                                print(f"inference service unavailable ({e}), falling back to in-process inference")
+                        
+                        if not success:
+                            success, message = run_test_directly(
+                                dataroot=dataroot,
+                                name=model_name,
+                                checkpoints_dir=checkpoints_dir,
+                                results_dir=results_dir,
+                                cyclegan_dir=cyclegan_dir, 
+                                model='test',
+                                no_dropout=True,
+                                dataset_mode='single',
+                                num_test=1,
+                                load_size=256,
+                                crop_size=256,
+                                preprocess='none',
+                                max_dataset_size=1000,
+                                no_flip=True,
+                                compile_cache_dir=compile_cache_dir,
+                                precision=inference_precision,
+                                channels_last=channels_last
+                            )
                         
                         progress_bar.progress(70)
                         
@@ -374,13 +431,9 @@ if st.session_state.get('process_requested') and st.session_state.get('file_read
                     base_name = os.path.splitext(current_filename)[0]
                     st.session_state.base_name = base_name
 
-                    final_dir = os.path.join(results_dir, model_name, 'test_latest', 'images')
-                    fake_path = os.path.join(final_dir, f"{base_name}_fake.png")
-                    
-                    st.info(f"Ищем файл: {fake_path}")
-                    
-                    if os.path.exists(fake_path):
-                        styled_image = Image.open(fake_path)
+                    # the stylized image is handed over in memory by every inference path; nothing is read back from results_dir
+                    if success and isinstance(message, Image.Image):
+                        styled_image = message
                         status_text.text(trans.get(st.session_state.language, "progress.fourth"))
                         progress_bar.progress(90)
                         
@@ -432,6 +485,45 @@ elif st.session_state.original_image is not None and st.session_state.styled_ima
         st.session_state.language
     )
 
+# ===== Reconnect to a job =====
+elif jobs_dir and st.query_params.get('job'):
+    from serving.jobs import JobQueue
+    job_queue = JobQueue(jobs_dir)
+    job = job_queue.get(st.query_params['job'])
+    if job is None:
+        st.warning(f"Job {st.query_params['job']} was not found.")
+    elif job['status'] == 'done':
+        styled_image = Image.open(job['output_path'])
+        if st.session_state.get('job_id') == job['id'] and st.session_state.original_image is not None:
+            # submitted by this session: keep it like an in-process result, so later reruns show it directly
+            if st.session_state.scale_info:
+                styled_image = scale_back_to_original(styled_image, st.session_state.scale_info)
+            st.session_state.styled_image = styled_image
+            display_images_and_downloads(
+                st.session_state.original_image,
+                styled_image,
+                st.session_state.base_name,
+                st.session_state.option,
+                st.session_state.language
+            )
+        else:
+            display_images_and_downloads(
+                Image.open(job['input_path']),
+                styled_image,
+                job['id'][:8],
+                job['style'],
+                st.session_state.language
+            )
+    elif job['status'] == 'failed':
+        st.error(f"Job {job['id']} failed: {job['error']}")
+        if st.button('Retry', key='retry_job'):
+            job_queue.retry(job['id'])  # queued again with a fresh attempt budget; polled below on the next rerun
+            st.rerun()
+    else:
+        st.info(f"Job {job['id']} is {job['status']} (attempt {job['attempts']}/{job['max_attempts']}).")
+        time.sleep(job_poll_seconds)
+        st.rerun()
+
 # ===== Examples =====
 else:
     col1, col2 = st.columns(2)
@@ -4,6 +4,7 @@ from pathlib import Path
 import torch
 
 def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir, **kwargs):
+    lease = None
     try:
         print(f"Current directory: {os.getcwd()}")
         print(f"CycleGAN directory: {cyclegan_dir}")
@@ -18,7 +19,8 @@ def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir
             from data import create_dataset
             from models import create_model
             from util.visualizer import save_images
-            from util import html
+            from util.image_writer import ImageWriter
+            from util import html, util
             
             print("CycleGAN modules imported successfully")
         except ImportError as e:
@@ -51,6 +53,14 @@ def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir
                 self.preprocess = kwargs.get('preprocess', 'none')
                 self.max_dataset_size = kwargs.get('max_dataset_size', 1000)
                 self.no_flip = kwargs.get('no_flip', True)
+                self.precision = kwargs.get('precision', 'fp32')
+                self.channels_last = kwargs.get('channels_last', False)
+                self.save_workers = kwargs.get('save_workers', 2)
+                self.max_pending_saves = kwargs.get('max_pending_saves', 0)
+                self.save_format = kwargs.get('save_format', 'png')
+                self.save_compress_level = kwargs.get('save_compress_level', 6)
+                self.save_quality = kwargs.get('save_quality', 95)
+                self.rows_per_page = kwargs.get('rows_per_page', 500)
                 self.gpu_ids = '-1'
                 self.ngf = 64
                 self.ndf = 64
@@ -102,8 +112,19 @@ def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir
         
         try:
             model = create_model(opt)
-            model.setup(opt)
-            print(f"Model created and configured")
+            if opt.model == 'test':
+                # the generator comes from the process-wide registry that the start-up warm-up fills and that
+                # hot-swaps changed checkpoints (serving/registry.py); the lease keeps this version alive until we are done
+                from serving.registry import get_registry
+                registry = get_registry(checkpoints_dir, opt.epoch, device=opt.device,
+                                        compile_cache_dir=kwargs.get('compile_cache_dir'),
+                                        backend_options=kwargs.get('backend_options'),
+                                        precision=opt.precision, channels_last=opt.channels_last)
+                lease = registry.acquire(name)
+                model.netG = lease.stylizer.netG
+                print(f"Using inference backend: {model.netG.name}")
+            else:
+                model.setup(opt)
         except Exception as e:
             print(f"Error creating model: {e}")
             raise
@@ -118,34 +139,43 @@ def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir
         
         print(f"Creating results directory: {web_dir}")
         
-        webpage = html.HTML(web_dir, f"Experiment = {opt.name}, Phase = {opt.phase}, Epoch = {opt.epoch}")
+        webpage = html.StreamingHTML(web_dir, f"Experiment = {opt.name}, Phase = {opt.phase}, Epoch = {opt.epoch}",
+                                     rows_per_page=opt.rows_per_page)
         
         if opt.eval:
             model.eval()
             
         print(f"Starting image processing...")
         
-        for i, data in enumerate(dataset):
-            if i >= opt.num_test:
-                break
+        # the results are encoded and written in background threads while the next image is processed;
+        # leaving the with-block waits until every file is on disk
+        result = None
+        with ImageWriter(opt.save_workers, opt.max_pending_saves or None, opt.save_format,
+                         opt.save_compress_level, opt.save_quality) as writer:
+            for i, data in enumerate(dataset):
+                if i >= opt.num_test:
+                    break
+                    
+                model.set_input(data)
+                model.test()
+                visuals = model.get_current_visuals()
+                img_path = model.get_image_paths()
                 
-            model.set_input(data)
-            model.test()
-            visuals = model.get_current_visuals()
-            img_path = model.get_image_paths()
-            
-            if i % 5 == 0:
-                print(f"Processing image ({i:04d})-th... {img_path}")
+                if i % 5 == 0:
+                    print(f"Processing image ({i:04d})-th... {img_path}")
                 
-            save_images(webpage, visuals, img_path, aspect_ratio=opt.aspect_ratio, width=opt.display_winsize)
+                if result is None:  # the first result is returned in memory, so the caller does not decode the file again
+                    result = util.im2pil(util.tensor2im(visuals['fake']))
+                    
+                save_images(webpage, visuals, img_path, aspect_ratio=opt.aspect_ratio, width=opt.display_winsize, writer=writer,
+                            image_sizes=data.get('A_sizes'))
             
         webpage.save()
         
         print(f"CycleGAN completed successfully!")
         print(f"Results saved to: {web_dir}")
         
-        images_dir = web_dir / "images"
-        return True, str(images_dir)
+        return True, result
         
     except ImportError as e:
         error_msg = f"CycleGAN import error: {e}"
@@ -159,3 +189,6 @@ def run_test_directly(dataroot, name, checkpoints_dir, results_dir, cyclegan_dir
         import traceback
         print(traceback.format_exc())
         return False, error_msg, error_msg
+    finally:
+        if lease is not None:
+            lease.release()
@@ -0,0 +1,12 @@
+"""This package contains the serving layer used by the Streamlit app to run the style generators.
+
+The generator code lives in Cyclegan/ and is imported as the top-level packages 'models', 'data', 'util',
+so the Cyclegan directory is put on sys.path here, the same way main.py and run_cyclegan_direct.py do.
+"""
+
+import sys
+from pathlib import Path
+
+CYCLEGAN_DIR = Path(__file__).resolve().parent.parent / "Cyclegan"
+if str(CYCLEGAN_DIR) not in sys.path:
+    sys.path.insert(0, str(CYCLEGAN_DIR))
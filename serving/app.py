@@ -0,0 +1,43 @@
+"""Run the Streamlit app in a process that warms up the styles as soon as the server starts.
+
+Streamlit executes main.py only when a session connects, so a warm-up started from main.py begins with the first
+visitor, and a warm-up run in a separate process before Streamlit starts leaves the serving process itself cold.
+This launcher starts the warm-up (serving/warmup.py) in a background thread and then runs Streamlit's command line
+in the same process. The scripts Streamlit executes share the process-wide StyleRegistry, so the <start_warm_up>
+call of main.py finds the warm-up already running, and the readiness file is written by the process that serves.
+
+The options are read from the environment, like main.py does: COMPILE_CACHE_DIR, INFERENCE_PRECISION,
+INFERENCE_CHANNELS_LAST and WARMUP_SIZES. Arguments are passed on to 'streamlit run main.py'.
+
+Example:
+    python -m serving.app --server.port=8501 --server.address=0.0.0.0
+"""
+
+import os
+import sys
+from pathlib import Path
+
+from .warmup import mark_ready, sizes_from_env, start_warm_up
+
+
+def app_dir(environ=os.environ):
+    """Return the directory main.py runs from, resolved the same way main.py resolves its <parent_dir>."""
+    return Path("/app") if "DOCKER" in environ else Path.cwd()
+
+
+def main(streamlit_args):
+    """Start the warm-up of every style (or mark the process ready if inference is delegated), then run Streamlit."""
+    root = app_dir()
+    if os.environ.get("INFERENCE_SERVICE_URL") or os.environ.get("JOBS_DIR"):  # inference is delegated to serving/service.py or serving/jobs.py
+        print("inference is delegated to the inference service or the job workers, skipping the local warm-up")
+        mark_ready()
+    else:
+        start_warm_up(root / "checkpoints", sizes_from_env(), compile_cache_dir=os.environ.get("COMPILE_CACHE_DIR"),
+                      precision=os.environ.get("INFERENCE_PRECISION", "fp32"), channels_last=os.environ.get("INFERENCE_CHANNELS_LAST", "0") == "1")
+    from streamlit.web import cli
+
+    cli.main(["run", str(root / "main.py"), *streamlit_args], prog_name="streamlit")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
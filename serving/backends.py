@@ -0,0 +1,145 @@
+"""Pluggable inference backends for the style generators.
+
+A backend is a callable mapping a Bx3xHxW float tensor in [-1, 1] to the stylized tensor, so it can replace
+<TestModel.netG> directly. Available backends:
+    -- torch:        the eager generator, optionally served through the compiled-artifact cache (serving/compile_cache.py)
+    -- onnxruntime:  the exported <epoch>_net_G.onnx (serving/export_onnx.py) run by ONNX Runtime's CPU execution provider
+    -- int8:         the quantized <epoch>_net_G_int8.pt (serving/quantize.py); styles without one keep using torch
+
+The backend is chosen per deployment with environment variables (see <options_from_env>). If ONNX Runtime is not
+installed, the ONNX file is missing or the session fails, the torch backend is used instead.
+"""
+
+import os
+from pathlib import Path
+
+import torch
+
+GRAPH_OPTIMIZATION_LEVELS = {"disable": "ORT_DISABLE_ALL", "basic": "ORT_ENABLE_BASIC", "extended": "ORT_ENABLE_EXTENDED", "all": "ORT_ENABLE_ALL"}
+
+
+class TorchBackend:
+    """Run the torch generator (eager or through a CompiledGenerator)."""
+
+    name = "torch"
+
+    def __init__(self, net):
+        self.net = net
+
+    def __call__(self, input):
+        return self.net(input)
+
+
+class OnnxRuntimeBackend:
+    """Run an exported generator with ONNX Runtime on CPU; switch to <fallback> for good if a run fails."""
+
+    name = "onnxruntime"
+
+    def __init__(self, onnx_path, fallback, intra_op_threads=0, inter_op_threads=0, graph_optimization_level="all"):
+        """Initialize the OnnxRuntimeBackend class
+
+        Parameters:
+            onnx_path (str)                -- the exported generator
+            fallback (callable)            -- backend used when ONNX Runtime fails at run time
+            intra_op_threads (int)         -- threads used inside an operator; 0 lets ONNX Runtime decide
+            inter_op_threads (int)         -- threads used across operators; 0 lets ONNX Runtime decide
+            graph_optimization_level (str) -- disable | basic | extended | all
+        """
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, GRAPH_OPTIMIZATION_LEVELS[graph_optimization_level])
+        self.session = ort.InferenceSession(str(onnx_path), options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.fallback = fallback
+
+    def __call__(self, input):
+        if self.session is not None:
+            try:
+                output = self.session.run(None, {self.input_name: input.detach().cpu().float().numpy()})[0]
+                return torch.from_numpy(output).to(input.device)
+            except Exception as e:
+                print(f"onnxruntime failed ({e}), falling back to torch")
+                self.session = None
+        return self.fallback(input)
+
+
+class Int8Backend:
+    """Run a quantized TorchScript generator on CPU; switch to <fallback> for good if a run fails."""
+
+    name = "int8"
+
+    def __init__(self, int8_path, fallback):
+        from .quantize import load_int8
+
+        self.module = load_int8(int8_path)
+        self.fallback = fallback
+
+    def __call__(self, input):
+        if self.module is not None:
+            try:
+                return self.module(input.detach().cpu().float()).to(input.device)
+            except Exception as e:
+                print(f"int8 generator failed ({e}), falling back to torch")
+                self.module = None
+        return self.fallback(input)
+
+
+def options_from_env(environ=os.environ):
+    """Read the backend configuration of this deployment from the environment.
+
+    INFERENCE_BACKEND         -- torch | onnxruntime | int8 (default: torch)
+    ORT_INTRA_OP_THREADS      -- intra-op threads for ONNX Runtime (default: 0, i.e. ONNX Runtime decides)
+    ORT_INTER_OP_THREADS      -- inter-op threads for ONNX Runtime (default: 0)
+    ORT_GRAPH_OPTIMIZATION    -- disable | basic | extended | all (default: all)
+    """
+    return {
+        "backend": environ.get("INFERENCE_BACKEND", "torch"),
+        "intra_op_threads": int(environ.get("ORT_INTRA_OP_THREADS", 0)),
+        "inter_op_threads": int(environ.get("ORT_INTER_OP_THREADS", 0)),
+        "graph_optimization_level": environ.get("ORT_GRAPH_OPTIMIZATION", "all"),
+    }
+
+
+def create_backend(net, style_dir, backend="torch", compile_cache_dir=None, epoch="latest", **ort_options):
+    """Return the inference backend for one style, falling back to torch when the requested one is unavailable.
+
+    Parameters:
+        net (nn.Module)          -- the loaded torch generator
+        style_dir (str or Path)  -- the checkpoint directory of the style
+        backend (str)            -- torch | onnxruntime | int8
+        compile_cache_dir (str)  -- if given, the torch backend serves compiled artifacts from this cache
+        epoch (str)              -- which checkpoint of the style is served
+        ort_options              -- keyword arguments of <OnnxRuntimeBackend>
+    """
+    style_dir = Path(style_dir)
+    if compile_cache_dir:
+        from .compile_cache import wrap_generator
+
+        net = wrap_generator(net, style_dir / f"{epoch}_net_G.pth", compile_cache_dir)
+    torch_backend = TorchBackend(net)
+    if backend == "torch":
+        return torch_backend
+    if backend == "onnxruntime":
+        onnx_path = style_dir / f"{epoch}_net_G.onnx"
+        if not onnx_path.is_file():
+            print(f"{onnx_path} not found (run 'python -m serving.export_onnx'), falling back to torch")
+            return torch_backend
+        try:
+            return OnnxRuntimeBackend(onnx_path, torch_backend, **ort_options)
+        except Exception as e:  # onnxruntime missing or the session cannot be created
+            print(f"cannot use onnxruntime ({e}), falling back to torch")
+            return torch_backend
+    if backend == "int8":
+        int8_path = style_dir / f"{epoch}_net_G_int8.pt"
+        if not int8_path.is_file():
+            print(f"{int8_path} not found (run 'python -m serving.quantize'), falling back to torch")
+            return torch_backend
+        try:
+            return Int8Backend(int8_path, torch_backend)
+        except Exception as e:
+            print(f"cannot load the int8 generator ({e}), falling back to torch")
+            return torch_backend
+    raise NotImplementedError("inference backend [%s] is not recognized" % backend)
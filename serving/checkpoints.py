@@ -0,0 +1,86 @@
+"""Helpers for discovering and loading the style checkpoints under checkpoints/.
+
+Each style is a directory <checkpoints_dir>/<name>/ holding <epoch>_net_G.pth and the test_opt.txt written by
+<BaseOptions.print_options> when the model was tested; the generator architecture is read back from that file.
+"""
+
+import hashlib
+from pathlib import Path
+
+import torch
+
+from models import networks
+
+GENERATOR_DEFAULTS = {"input_nc": 3, "output_nc": 3, "ngf": 64, "netG": "resnet_9blocks", "norm": "instance", "no_dropout": True}
+
+_hash_cache = {}
+
+
+def find_styles(checkpoints_dir, epoch="latest"):
+    """Return {name: style directory} for every directory of <checkpoints_dir> that holds a <epoch>_net_G.pth generator."""
+    styles = {}
+    for path in sorted(Path(checkpoints_dir).glob(f"*/{epoch}_net_G.pth")):
+        styles[path.parent.name] = path.parent
+    return styles
+
+
+def read_test_opt(opt_file):
+    """Parse an options file written by <BaseOptions.print_options> into a dict of strings."""
+    options = {}
+    opt_file = Path(opt_file)
+    if not opt_file.is_file():
+        return options
+    for line in opt_file.read_text(encoding="utf-8", errors="replace").splitlines():
+        if ":" not in line or line.startswith("-"):
+            continue
+        key, value = line.split(":", 1)
+        options[key.strip()] = value.split("\t")[0].strip()
+    return options
+
+
+def generator_options(style_dir):
+    """Return the generator options of a style, using test_opt.txt where available and the CycleGAN defaults otherwise."""
+    parsed = read_test_opt(Path(style_dir) / "test_opt.txt")
+    options = dict(GENERATOR_DEFAULTS)
+    for key, default in GENERATOR_DEFAULTS.items():
+        if key in parsed:
+            value = parsed[key]
+            options[key] = value == "True" if isinstance(default, bool) else type(default)(value)
+    return options
+
+
+def checkpoint_hash(path):
+    """Return a short sha256 of a checkpoint file; cached by (path, size, mtime) so unchanged files are hashed once."""
+    path = Path(path)
+    st = path.stat()
+    key = (str(path.resolve()), st.st_size, st.st_mtime_ns)
+    if key not in _hash_cache:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        _hash_cache[key] = h.hexdigest()[:16]
+    return _hash_cache[key]
+
+
+def build_generator(style_dir):
+    """Build the generator architecture of a style on the meta device, without allocating or initializing weights."""
+    options = generator_options(style_dir)
+    with torch.device("meta"):
+        return networks.define_G(options["input_nc"], options["output_nc"], options["ngf"], options["netG"], options["norm"], not options["no_dropout"])
+
+
+def load_generator(style_dir, device="cpu", epoch="latest"):
+    """Build the generator described by a style directory and load its weights.
+
+    Parameters:
+        style_dir (str or Path) -- a checkpoint directory, e.g. checkpoints/style_monet_pretrained
+        device (str or device)  -- where to put the network
+        epoch (str)             -- which <epoch>_net_G.pth to load; its converted .safetensors file is used when present
+
+    Returns the generator in eval mode. Its weights are read into memory rather than memory-mapped: served generators
+    outlive their checkpoint files, which may be overwritten in place while the old version still serves requests.
+    """
+    net = build_generator(style_dir)
+    networks.load_checkpoint(net, Path(style_dir) / f"{epoch}_net_G.pth", device, mmap=False)
+    return net.to(device).eval()
@@ -0,0 +1,118 @@
+"""Client of the HTTP inference service (serving/service.py) with a pool of keep-alive connections.
+
+Connections are reused across requests and threads; a pooled connection that the service closed in the meantime is
+replaced transparently. Errors are raised as OSError subclasses (connection refused, timeouts, malformed or truncated
+responses, non-200 responses), so callers can fall back to in-process inference with a single except clause.
+
+Example:
+    >>> client = get_client("http://localhost:8000")
+    >>> client.stylize_file("photo.jpg", "style_monet_pretrained", "photo_monet.png")
+"""
+
+import http.client
+import json
+import queue
+import threading
+from pathlib import Path
+from urllib.parse import quote, urlsplit
+
+
+class ServiceError(IOError):
+    """The service answered with an error status."""
+
+    def __init__(self, status, message):
+        super(ServiceError, self).__init__(f"inference service returned {status}: {message}")
+        self.status = status
+
+
+class ServiceClient:
+    """Thread-safe client of one inference service."""
+
+    def __init__(self, url, pool_size=4, timeout=120.0):
+        """Initialize the ServiceClient class
+
+        Parameters:
+            url (str)         -- base URL of the service, e.g. http://localhost:8000
+            pool_size (int)   -- number of idle keep-alive connections kept open
+            timeout (float)   -- socket timeout of a request in seconds
+        """
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.timeout = timeout
+        self.pool = queue.LifoQueue(pool_size)
+
+    def _connection(self):
+        try:
+            return self.pool.get_nowait()
+        except queue.Empty:
+            return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def _return(self, conn):
+        try:
+            self.pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def request(self, method, path, body=None, headers=None):
+        """Send a request over a pooled connection and return (status, response body)."""
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers or {})
+                response = conn.getresponse()
+                data = response.read()
+            except (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError):
+                conn.close()  # a keep-alive connection the service has closed; retry once on a fresh one
+                if attempt:
+                    raise
+                continue
+            except http.client.HTTPException as e:  # IncompleteRead, LineTooLong, BadStatusLine, ... are not OSErrors
+                conn.close()
+                raise ConnectionError(f"invalid response from the inference service: {e!r}") from e
+            except BaseException:
+                conn.close()
+                raise
+            if response.will_close:
+                conn.close()
+            else:
+                self._return(conn)
+            return response.status, data
+
+    def _check(self, status, data):
+        if status != 200:
+            try:
+                message = json.loads(data)["error"]
+            except (ValueError, KeyError, TypeError):
+                message = data[:200]
+            raise ServiceError(status, message)
+        return data
+
+    def stylize(self, image_bytes, style):
+        """Return the PNG bytes of <image_bytes> stylized with <style>."""
+        status, data = self.request("POST", f"/stylize/{quote(style)}", image_bytes, {"Content-Type": "application/octet-stream"})
+        return self._check(status, data)
+
+    def stylize_file(self, input_path, style, output_path):
+        """Stylize the image at <input_path> and write the PNG result to <output_path>."""
+        output = self.stylize(Path(input_path).read_bytes(), style)
+        Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+        Path(output_path).write_bytes(output)
+        return output_path
+
+    def styles(self):
+        return json.loads(self._check(*self.request("GET", "/styles")))
+
+    def health(self):
+        return json.loads(self._check(*self.request("GET", "/health")))
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(url, **kwargs):
+    """Return the process-wide ServiceClient of <url>, so its connection pool is shared by every request."""
+    with _clients_lock:
+        if url not in _clients:
+            _clients[url] = ServiceClient(url, **kwargs)
+        return _clients[url]
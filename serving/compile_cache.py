@@ -0,0 +1,268 @@
+"""Ahead-of-time compiled generator artifacts, cached on disk per checkpoint, precision and input-shape bucket.
+
+A generator is traced with TorchScript at a representative shape of its bucket and saved under
+    <cache_dir>/<checkpoint hash>/torch-<torch version>/<precision>/<N>x<C>x<H>x<W>.pt
+where <precision> names the dtype and memory format the generator runs in (e.g. float32, bfloat16-channels_last),
+so a restarted container loads the artifact instead of compiling again. When an artifact is loaded it is
+frozen and passed through <torch.jit.optimize_for_inference> (frozen modules cannot be serialized, and both
+steps are cheap compared to tracing and warming up).
+
+The traced graph of a fully convolutional generator is valid for any input size, so a bucket only decides
+which artifact (and which warmed-up kernel selection) serves an input; outputs never depend on the bucket.
+
+On a cache miss the caller keeps running the eager generator while a single background thread compiles.
+Recompilation storms are avoided by:
+    -- rounding H and W up to multiples of <bucket_size>, so nearby sizes share an artifact;
+    -- compiling a bucket only after it has been requested <min_hits> times;
+    -- capping the number of buckets per checkpoint (<max_buckets>); other sizes stay eager;
+    -- compiling one artifact at a time, never the same key twice.
+Loading an artifact from disk (and freezing it) runs on the first request that needs it; concurrent requests for
+the same key wait for that load instead of repeating it.
+
+Example (compile every style ahead of time):
+    python -m serving.compile_cache --checkpoints_dir checkpoints --cache_dir compiled --sizes 256 512
+"""
+
+import argparse
+import os
+import queue
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+from pathlib import Path
+
+import torch
+
+from . import checkpoints
+from models import networks
+
+
+class CompileCache:
+    """Disk-backed cache of compiled generators shared by every <CompiledGenerator> of a process."""
+
+    def __init__(self, cache_dir, bucket_size=64, max_buckets=8, min_hits=2):
+        """Initialize the CompileCache class
+
+        Parameters:
+            cache_dir (str)   -- directory the artifacts are persisted to
+            bucket_size (int) -- H and W are rounded up to a multiple of this value to form the bucket
+            max_buckets (int) -- maximum number of compiled buckets per checkpoint
+            min_hits (int)    -- a bucket is compiled only after it has been requested this many times
+        """
+        self.cache_dir = Path(cache_dir)
+        self.bucket_size = bucket_size
+        self.max_buckets = max_buckets
+        self.min_hits = min_hits
+        self.torch_version = torch.__version__.replace("+", "_")
+        self.loaded = {}  # (checkpoint hash, precision, bucket) -> optimized TorchScript module
+        self.building = {}  # key -> Future of the module being loaded or compiled by another thread
+        self.hits = Counter()
+        self.pending = set()
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()
+        self.worker = None
+
+    def bucket(self, shape):
+        """Return the bucket (N, C, H, W) an input shape belongs to."""
+        n, c, h, w = shape
+        b = self.bucket_size
+        return (n, c, -(-h // b) * b, -(-w // b) * b)
+
+    def key(self, ckpt_hash, precision, shape):
+        """Return the key (checkpoint hash, precision, bucket) an input of <shape> is served by."""
+        return (ckpt_hash, precision, self.bucket(shape))
+
+    def artifact_path(self, key):
+        ckpt_hash, precision, bucket = key
+        return self.cache_dir / ckpt_hash / f"torch-{self.torch_version}" / precision / ("x".join(str(d) for d in bucket) + ".pt")
+
+    def buckets_on_disk(self, ckpt_hash):
+        return list((self.cache_dir / ckpt_hash / f"torch-{self.torch_version}").glob("*/*.pt"))
+
+    def get(self, key):
+        """Return the compiled module of <key> if it is in memory or on disk, otherwise None."""
+        module = self.loaded.get(key)
+        if module is not None:
+            return module
+        path = self.artifact_path(key)
+        if not path.is_file():
+            return None
+        return self._once(key, lambda: self._load(path))
+
+    def request(self, net, key):
+        """Record a cache miss; schedule a background compile once the bucket is hot and the budget allows it."""
+        with self.lock:
+            self.hits[key] += 1
+            if key in self.pending or self.hits[key] < self.min_hits:
+                return
+            n_buckets = len(self.buckets_on_disk(key[0])) + sum(1 for pending in self.pending if pending[0] == key[0])
+            if n_buckets >= self.max_buckets:
+                return
+            self.pending.add(key)
+            if self.worker is None or not self.worker.is_alive():
+                self.worker = threading.Thread(target=self._work, name="compile-cache", daemon=True)
+                self.worker.start()
+        self.jobs.put((net, key))
+
+    def compile(self, net, key):
+        """Trace <net> at the bucket shape, persist the artifact atomically and return the optimized module.
+
+        If another thread is already loading or compiling <key>, its module is returned instead.
+        """
+        return self._once(key, lambda: self._compile(net, key))
+
+    def _compile(self, net, key):
+        path = self.artifact_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        example = torch.zeros(key[2], device=next(net.parameters()).device)
+        with torch.no_grad():
+            traced = torch.jit.trace(net.eval(), example, check_trace=False)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        torch.jit.save(traced, str(tmp_path))
+        os.replace(tmp_path, path)
+        module = self._load(path, example)
+        print(f"compiled generator {key[0]} ({key[1]}) for {key[2]} in {time.perf_counter() - start:.1f}s -> {path}")
+        return module
+
+    def _once(self, key, build):
+        """Return the module of <key>, calling <build> on this thread unless another thread is building it already (then wait for that one)."""
+        with self.lock:
+            module = self.loaded.get(key)
+            if module is not None:
+                return module
+            future = self.building.get(key)
+            owner = future is None
+            if owner:
+                future = self.building[key] = Future()
+        if not owner:
+            return future.result()
+        try:
+            module = build()
+        except BaseException as e:
+            with self.lock:
+                del self.building[key]
+            future.set_exception(e)
+            raise
+        with self.lock:
+            self.loaded[key] = module
+            del self.building[key]
+        future.set_result(module)
+        return module
+
+    def drop(self, ckpt_hash):
+        """Release what is held in memory for <ckpt_hash>: its loaded modules, hit counts and queued compiles.
+
+        Called when the generator of a checkpoint is retired, so its compiled modules and the network a queued compile
+        holds are freed with it. The artifacts on disk are kept.
+        """
+        with self.lock:
+            for key in [key for key in self.loaded if key[0] == ckpt_hash]:
+                del self.loaded[key]
+            for key in [key for key in self.hits if key[0] == ckpt_hash]:
+                del self.hits[key]
+            self.pending = {key for key in self.pending if key[0] != ckpt_hash}
+        with self.jobs.mutex:
+            self.jobs.queue = deque(job for job in self.jobs.queue if job[1][0] != ckpt_hash)
+
+    def _load(self, path, example=None):
+        module = torch.jit.load(str(path), map_location="cpu" if example is None else example.device)
+        module = torch.jit.optimize_for_inference(torch.jit.freeze(module.eval()))
+        if example is not None:
+            with torch.no_grad():  # let the profiling executor specialize on the bucket shape
+                module(example)
+                module(example)
+        return module
+
+    def _work(self):
+        while True:
+            self._work_one(*self.jobs.get())
+
+    def _work_one(self, net, key):
+        """Compile one queued job; the network is released with this frame, not kept while waiting for the next job."""
+        try:
+            self.compile(net, key)
+        except Exception as e:
+            print(f"compiling generator {key[0]} ({key[1]}) for {key[2]} failed, staying eager: {e}")
+        finally:
+            with self.lock:
+                if key not in self.pending:  # dropped while it was compiling
+                    self.loaded.pop(key, None)
+                self.pending.discard(key)
+
+
+class CompiledGenerator:
+    """Callable that runs a compiled artifact when one exists for the input bucket, and the eager generator otherwise."""
+
+    def __init__(self, net, ckpt_hash, cache, precision="float32"):
+        """Initialize the CompiledGenerator class
+
+        Parameters:
+            net (nn.Module)      -- the eager generator; used on cache misses and as the source for compilation
+            ckpt_hash (str)      -- hash of the checkpoint the weights come from (see <checkpoints.checkpoint_hash>)
+            cache (CompileCache) -- the cache the artifacts are looked up in
+            precision (str)      -- dtype and memory format <net> runs in; bf16 and channels_last graphs are separate artifacts
+        """
+        self.net = net
+        self.ckpt_hash = ckpt_hash
+        self.cache = cache
+        self.precision = precision
+
+    def __call__(self, input):
+        key = self.cache.key(self.ckpt_hash, self.precision, tuple(input.shape))
+        module = self.cache.get(key)
+        if module is not None:
+            return module(input)
+        self.cache.request(self.net, key)
+        return self.net(input)
+
+    def prepare(self, shape):
+        """Load or compile the artifact that serves inputs of <shape> now, instead of after <min_hits> requests."""
+        key = self.cache.key(self.ckpt_hash, self.precision, shape)
+        if self.cache.get(key) is None:
+            self.cache.compile(self.net, key)
+
+    def __getattr__(self, name):  # behave like the wrapped network for everything else (eval, parameters, ...)
+        return getattr(self.net, name)
+
+
+_caches = {}
+
+
+def get_cache(cache_dir, **kwargs):
+    """Return the process-wide CompileCache of <cache_dir>, so hit counts and the compile thread survive between requests."""
+    key = str(Path(cache_dir).resolve())
+    if key not in _caches:
+        _caches[key] = CompileCache(cache_dir, **kwargs)
+    return _caches[key]
+
+
+def wrap_generator(net, checkpoint_path, cache_dir, **kwargs):
+    """Return <net> wrapped in a CompiledGenerator backed by the cache at <cache_dir>."""
+    precision = "float32"
+    if isinstance(net, networks.PrecisionWrapper):
+        precision = str(net.dtype).replace("torch.", "") + ("-channels_last" if net.channels_last else "")
+    return CompiledGenerator(net, checkpoints.checkpoint_hash(checkpoint_path), get_cache(cache_dir, **kwargs), precision)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile every style generator ahead of time.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--cache_dir", type=str, default="./compiled", help="where compiled artifacts are stored")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256], help="square input sizes to compile for")
+    parser.add_argument("--batch_size", type=int, default=1, help="batch size to compile for")
+    parser.add_argument("--bucket_size", type=int, default=64, help="H and W are rounded up to a multiple of this value")
+    args = parser.parse_args()
+
+    cache = get_cache(args.cache_dir, bucket_size=args.bucket_size)
+    for name, style_dir in checkpoints.find_styles(args.checkpoints_dir).items():
+        net = checkpoints.load_generator(style_dir)
+        ckpt_hash = checkpoints.checkpoint_hash(style_dir / "latest_net_G.pth")
+        input_nc = checkpoints.generator_options(style_dir)["input_nc"]
+        for size in args.sizes:
+            key = cache.key(ckpt_hash, "float32", (args.batch_size, input_nc, size, size))
+            if cache.artifact_path(key).is_file():
+                print(f"[{name}] {key[2]} already compiled")
+            else:
+                cache.compile(net, key)
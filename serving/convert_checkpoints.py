@@ -0,0 +1,34 @@
+"""Convert the style checkpoints to safetensors for fast loading.
+
+For every style, <epoch>_net_G.pth is loaded once, patched for the pre-0.4 InstanceNorm keys and written next to it as
+<epoch>_net_G.safetensors. <networks.load_checkpoint> memory-maps the converted file and skips the patching, so a
+cold load no longer unpickles the checkpoint or walks every key. The .pth files are kept; a .pth file that is newer
+than its converted file (e.g. after retraining) takes precedence until it is converted again.
+
+Example:
+    python -m serving.convert_checkpoints --checkpoints_dir checkpoints
+"""
+
+import argparse
+import time
+
+from . import checkpoints
+from models import networks
+
+
+def convert_style(style_dir, epoch="latest"):
+    """Convert the generator checkpoint of one style directory and return the path of the safetensors file."""
+    return networks.convert_checkpoint(checkpoints.build_generator(style_dir), style_dir / f"{epoch}_net_G.pth")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the style checkpoints to safetensors.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--epoch", type=str, default="latest", help="which epoch to convert")
+    args = parser.parse_args()
+
+    for name, style_dir in checkpoints.find_styles(args.checkpoints_dir, args.epoch).items():
+        path = convert_style(style_dir, args.epoch)
+        start = time.perf_counter()
+        checkpoints.load_generator(style_dir, epoch=args.epoch)
+        print(f"[{name}] -> {path} (loads in {(time.perf_counter() - start) * 1000:.1f} ms)")
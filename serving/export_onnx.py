@@ -0,0 +1,68 @@
+"""Export the style generators to ONNX with dynamic batch, height and width.
+
+For every <checkpoints_dir>/<style>/latest_net_G.pth this writes <style>/latest_net_G.onnx next to it, where the
+'onnxruntime' backend (see serving/backends.py) picks it up. Each export is checked against the torch output.
+
+Example:
+    python -m serving.export_onnx --checkpoints_dir checkpoints
+    python -m serving.export_onnx --checkpoints_dir checkpoints --styles style_monet_pretrained --opset 17
+"""
+
+import argparse
+from pathlib import Path
+
+import torch
+
+from . import checkpoints
+
+DYNAMIC_AXES = {"input": {0: "batch", 2: "height", 3: "width"}, "output": {0: "batch", 2: "height", 3: "width"}}
+
+
+def onnx_path(style_dir, epoch="latest"):
+    return Path(style_dir) / f"{epoch}_net_G.onnx"
+
+
+def export_generator(style_dir, output_path=None, opset=17, size=256, epoch="latest"):
+    """Export the generator of <style_dir> to ONNX and return the largest absolute difference to the torch output.
+
+    Parameters:
+        style_dir (str or Path) -- a checkpoint directory, e.g. checkpoints/style_monet_pretrained
+        output_path (str)       -- where to write the model; defaults to <style_dir>/<epoch>_net_G.onnx
+        opset (int)             -- ONNX opset version
+        size (int)              -- side of the example input used for tracing
+        epoch (str)             -- which <epoch>_net_G.pth to export
+    """
+    output_path = Path(output_path) if output_path else onnx_path(style_dir, epoch)
+    net = checkpoints.load_generator(style_dir, epoch=epoch)
+    input_nc = checkpoints.generator_options(style_dir)["input_nc"]
+    example = torch.randn(1, input_nc, size, size)
+    with torch.no_grad():
+        torch.onnx.export(net, example, str(output_path), input_names=["input"], output_names=["output"], dynamic_axes=DYNAMIC_AXES, opset_version=opset, dynamo=False)
+    try:
+        import onnxruntime as ort
+    except ImportError:
+        return None
+    # validate at a different shape than the one used for tracing, to make sure the axes really are dynamic
+    check = torch.randn(2, input_nc, size // 2, size + size // 4)
+    session = ort.InferenceSession(str(output_path), providers=["CPUExecutionProvider"])
+    with torch.no_grad():
+        expected = net(check).numpy()
+    return float(abs(session.run(None, {"input": check.numpy()})[0] - expected).max())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the style generators to ONNX.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--styles", type=str, nargs="*", default=None, help="names of the styles to export; all styles by default")
+    parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+    parser.add_argument("--size", type=int, default=256, help="side of the example input used for tracing")
+    args = parser.parse_args()
+
+    for name, style_dir in checkpoints.find_styles(args.checkpoints_dir).items():
+        if args.styles and name not in args.styles:
+            continue
+        max_diff = export_generator(style_dir, opset=args.opset, size=args.size)
+        message = f"[{name}] exported to {onnx_path(style_dir)}"
+        if max_diff is not None:
+            message += f" (max abs diff vs torch: {max_diff:.2e})"
+        print(message)
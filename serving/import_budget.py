@@ -0,0 +1,70 @@
+"""Measure and enforce the import cost of the inference entry points.
+
+Each module is imported in a fresh interpreter, after torch, and the time spent on top of <import torch> is
+compared to its budget; the median of <--repeat> runs is used. A module also fails the check if it pulls in one of
+the <FORBIDDEN> packages, which are optional at inference time and must only be imported where they are used.
+The exit status is non-zero if any module is over budget, so the check can gate a CI job on a quiet runner:
+
+    python -m serving.import_budget
+
+Timings depend on the machine and its load, so the Docker build only reports them ('--report-only'); the
+import of <FORBIDDEN> packages, which does not depend on timing, is also checked by tests/test_import_budget.py.
+"""
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# module -> seconds allowed on top of <import torch>
+BUDGETS = {"serving.inference": 0.25, "translation_manager": 0.05}
+
+FORBIDDEN = ("streamlit", "wandb", "dominate", "visdom", "torchvision", "onnxruntime", "cv2", "scipy")
+
+_PROBE = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+t = time.perf_counter()
+import torch
+t_torch = time.perf_counter() - t
+t = time.perf_counter()
+import {module}
+t_module = time.perf_counter() - t
+print(json.dumps({{"torch": t_torch, "module": t_module, "forbidden": [m for m in {forbidden!r} if m in sys.modules]}}))
+"""
+
+
+def measure(module, repeat=3):
+    """Return (median seconds of <module> on top of torch, median seconds of torch, forbidden packages imported)."""
+    runs = []
+    for _ in range(repeat):
+        code = _PROBE.format(root=str(ROOT), module=module, forbidden=FORBIDDEN)
+        output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True, cwd=ROOT).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return statistics.median(r["module"] for r in runs), statistics.median(r["torch"] for r in runs), runs[-1]["forbidden"]
+
+
+def check(budgets=BUDGETS, repeat=3):
+    """Print a report for every module of <budgets> and return True if all of them are within budget."""
+    ok = True
+    for module, budget in budgets.items():
+        seconds, torch_seconds, forbidden = measure(module, repeat)
+        passed = seconds <= budget and not forbidden
+        ok = ok and passed
+        status = "ok" if passed else "OVER BUDGET"
+        print(f"{module}: {seconds * 1000:.0f} ms on top of torch ({torch_seconds * 1000:.0f} ms), budget {budget * 1000:.0f} ms -> {status}")
+        if forbidden:
+            print(f"    imports optional packages: {', '.join(forbidden)}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the inference entry points.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3, help="fresh interpreters per module; the median is compared to the budget")
+    parser.add_argument("--report-only", action="store_true", help="print the report but exit with status 0 even if a module is over budget")
+    args = parser.parse_args()
+    sys.exit(0 if check(repeat=args.repeat) or args.report_only else 1)
@@ -0,0 +1,118 @@
+"""Inference-only entry point: stylize images with a style checkpoint without the training/test framework.
+
+<run_cyclegan_direct.run_test_directly> goes through TestOptions, create_dataset and util.visualizer, which pull in
+torchvision, torch.utils.data, dominate and (through the visualizer) wandb before a single image is processed.
+This module imports only torch, numpy, PIL and the generator definition (models/networks.py); ONNX Runtime, the
+compile cache and the quantized backends are imported only when a deployment selects them. It reproduces the
+'single' dataset with preprocess='none' (sides rounded to a multiple of 4, bicubic) and the saving done by
+<save_images>, so outputs match the ones written by test.py.
+
+Worker processes and batch jobs should import this module instead of run_cyclegan_direct; its import cost is
+checked by serving/import_budget.py.
+
+Example:
+    python -m serving.inference --style_dir checkpoints/style_monet_pretrained --output_dir results/monet photo1.jpg photo2.jpg
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import numpy as np
+import torch
+from PIL import Image
+
+from . import checkpoints
+from .backends import create_backend, options_from_env
+from models import networks
+from util import util
+
+
+def load_image(path, base=4):
+    """Load an RGB image as a 1x3xHxW tensor in [-1, 1], resizing H and W to the nearest multiple of <base> (bicubic)."""
+    image = Image.open(path).convert("RGB")
+    w, h = image.size
+    new_w, new_h = int(round(w / base) * base), int(round(h / base) * base)
+    if (new_w, new_h) != (w, h):
+        image = image.resize((new_w, new_h), Image.BICUBIC)
+    return torch.from_numpy(np.array(image)).permute(2, 0, 1).unsqueeze(0).float().div_(127.5).sub_(1.0)
+
+
+def default_device():
+    return torch.device("cuda:0" if torch.cuda.is_available() else "cpu")
+
+
+class Stylizer:
+    """A loaded style generator with its inference backend.
+
+    Example:
+        >>> stylizer = Stylizer("checkpoints/style_monet_pretrained")
+        >>> stylizer.stylize_file("photo.jpg", "photo_monet.png")
+    """
+
+    def __init__(self, style_dir, device=None, epoch="latest", compile_cache_dir=None, backend_options=None, precision="fp32", channels_last=False):
+        """Initialize the Stylizer class
+
+        Parameters:
+            style_dir (str or Path)  -- the checkpoint directory of the style
+            device (str or device)   -- where the generator runs; the first GPU if available, otherwise the CPU
+            epoch (str)              -- which checkpoint of the style is loaded
+            compile_cache_dir (str)  -- if given, compiled artifacts are served from this cache (see serving/compile_cache.py)
+            backend_options (dict)   -- keyword arguments of <create_backend>; read from the environment by default
+            precision (str)          -- fp32 | bf16 | auto (see <networks.set_inference_precision>)
+            channels_last (bool)     -- run the generator in channels_last memory format
+        """
+        self.style_dir = Path(style_dir)
+        self.device = torch.device(device) if device is not None else default_device()
+        self.compile_cache_dir = compile_cache_dir
+        net = checkpoints.load_generator(self.style_dir, self.device, epoch)
+        net = networks.set_inference_precision(net, precision, channels_last, self.device)
+        self.netG = create_backend(net, self.style_dir, compile_cache_dir=compile_cache_dir, epoch=epoch, **(backend_options or options_from_env()))
+
+    def __call__(self, input):
+        """Stylize a 1x3xHxW tensor in [-1, 1] and return the output tensor."""
+        with torch.no_grad():
+            return self.netG(input.to(self.device))
+
+    def warm_up(self, sizes=(256,), repeat=2):
+        """Run <repeat> dummy forward passes at every square size, compiling the artifacts first if a compile cache is used.
+
+        This moves checkpoint paging, oneDNN kernel selection and allocator growth out of the first real request;
+        compiled graphs specialize on the second pass.
+        """
+        compiled = None
+        if self.compile_cache_dir:  # like <create_backend>, import the compile cache only if it is used
+            from .compile_cache import CompiledGenerator
+
+            compiled = getattr(self.netG, "net", None)
+            compiled = compiled if isinstance(compiled, CompiledGenerator) else None
+        input_nc = checkpoints.generator_options(self.style_dir)["input_nc"]
+        for size in sizes:
+            example = torch.zeros(1, input_nc, size, size)
+            if compiled is not None:  # compile now instead of after <min_hits> requests
+                compiled.prepare(tuple(example.shape))
+            for _ in range(repeat):
+                self(example)
+
+    def stylize_file(self, input_path, output_path):
+        """Stylize the image at <input_path> and save the result to <output_path>."""
+        util.save_image(util.tensor2im(self(load_image(input_path))), output_path)
+        return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stylize images with a style checkpoint.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("images", type=str, nargs="+", help="input images")
+    parser.add_argument("--style_dir", type=str, required=True, help="checkpoint directory of the style, e.g. checkpoints/style_monet_pretrained")
+    parser.add_argument("--output_dir", type=str, required=True, help="where the stylized images are written")
+    parser.add_argument("--epoch", type=str, default="latest", help="which checkpoint of the style to load")
+    parser.add_argument("--device", type=str, default=None, help="device the generator runs on; the first GPU if available, otherwise the CPU")
+    args = parser.parse_args()
+
+    output_dir = Path(args.output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stylizer = Stylizer(args.style_dir, args.device, args.epoch)
+    for path in args.images:
+        start = time.perf_counter()
+        output_path = stylizer.stylize_file(path, output_dir / f"{Path(path).stem}_fake.png")
+        print(f"{path} -> {output_path} ({time.perf_counter() - start:.2f}s)")
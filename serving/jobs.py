@@ -0,0 +1,272 @@
+"""Durable SQLite-backed queue of asynchronous stylization jobs.
+
+A job stylizes one image with one style. The queue lives in a directory shared by the front end and the workers:
+    <jobs_dir>/jobs.sqlite3   -- the job table (WAL mode, so readers never block the workers)
+    <jobs_dir>/inputs/        -- a copy of every submitted image, so a job survives the front end's clean-ups
+    <jobs_dir>/results/       -- <job id>.png once a job is done
+
+Job life cycle: queued -> running -> done | failed.
+    -- Submission is idempotent. A job's ID is derived from the style and the image content, so re-submitting the same
+       image (e.g. after a page refresh or a restart) returns the existing job instead of computing it again.
+    -- Workers claim a job with a lease (<lease_seconds>) and extend it with heartbeats while they work.
+    -- A job whose worker died is claimed again once its lease expires.
+    -- A failed attempt is retried until <max_attempts>.
+    -- Results are written to a temporary file and renamed into place, and only the lease owner can complete the job,
+       so a retried or duplicated attempt cannot leave a partial or stale result behind.
+
+Example:
+    python -m serving.jobs worker --jobs_dir jobs --checkpoints_dir checkpoints --processes 2
+    python -m serving.jobs submit --jobs_dir jobs --style style_monet_pretrained photo1.jpg photo2.jpg
+    python -m serving.jobs status --jobs_dir jobs <job id>
+"""
+
+import argparse
+import hashlib
+import multiprocessing
+import os
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    style TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    output_path TEXT,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    lease_owner TEXT,
+    lease_expires REAL,
+    error TEXT,
+    created REAL NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created);
+"""
+
+
+class JobQueue:
+    """The job table and files of a jobs directory; safe to use from several threads and processes."""
+
+    def __init__(self, jobs_dir):
+        self.jobs_dir = Path(jobs_dir)
+        self.inputs_dir = self.jobs_dir / "inputs"
+        self.results_dir = self.jobs_dir / "results"
+        self.inputs_dir.mkdir(parents=True, exist_ok=True)
+        self.results_dir.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.jobs_dir / "jobs.sqlite3"
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(SCHEMA)
+
+    def _connect(self):
+        db = sqlite3.connect(self.db_path, timeout=30.0, isolation_level=None)  # autocommit; transactions are explicit
+        db.row_factory = sqlite3.Row
+        return _Connection(db)
+
+    def submit(self, input_path, style, max_attempts=3):
+        """Queue <input_path> for <style> and return the job ID; an identical earlier submission returns its job."""
+        input_path = Path(input_path)
+        h = hashlib.sha256(style.encode() + b"\0")
+        with open(input_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        job_id = h.hexdigest()[:24]
+        if self.get(job_id) is not None:
+            return job_id
+        stored = self.inputs_dir / f"{job_id}{input_path.suffix.lower()}"
+        tmp = stored.with_suffix(f".{os.getpid()}.tmp")
+        shutil.copyfile(input_path, tmp)
+        os.replace(tmp, stored)
+        now = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR IGNORE INTO jobs (id, style, input_path, status, max_attempts, created, updated) VALUES (?, ?, ?, 'queued', ?, ?, ?)",
+                (job_id, style, str(stored), max_attempts, now, now),
+            )
+        return job_id
+
+    def get(self, job_id):
+        """Return the job as a dict, or None for an unknown ID."""
+        with self._connect() as db:
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+    def retry(self, job_id):
+        """Queue a failed job again with a fresh attempt budget."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = 'queued', attempts = 0, error = NULL, updated = ? WHERE id = ? AND status = 'failed'", (time.time(), job_id))
+
+    def claim(self, worker_id, lease_seconds=60.0):
+        """Lease the oldest runnable job to <worker_id> and return it, or None if there is nothing to do.
+
+        Runnable jobs are queued jobs and running jobs whose lease has expired (their worker died). Expired jobs that
+        have used up their attempts are marked failed instead.
+        """
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")  # one claimer at a time
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = COALESCE(error, 'lease expired'), lease_owner = NULL, updated = ? "
+                "WHERE status = 'running' AND lease_expires < ? AND attempts >= max_attempts",
+                (now, now),
+            )
+            row = db.execute(
+                "SELECT id FROM jobs WHERE status = 'queued' OR (status = 'running' AND lease_expires < ?) ORDER BY created LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', attempts = attempts + 1, lease_owner = ?, lease_expires = ?, updated = ? WHERE id = ?",
+                (worker_id, now + lease_seconds, now, row["id"]),
+            )
+            job = dict(db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone())
+            db.execute("COMMIT")
+        return job
+
+    def heartbeat(self, job_id, worker_id, lease_seconds=60.0):
+        """Extend the lease of a running job; return False if <worker_id> no longer owns it."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET lease_expires = ?, updated = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (time.time() + lease_seconds, time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def complete(self, job_id, worker_id, output_path):
+        """Mark a job done; ignored (returns False) if the lease was lost to another worker."""
+        with self._connect() as db:
+            cursor = db.execute(
+                "UPDATE jobs SET status = 'done', output_path = ?, lease_owner = NULL, error = NULL, updated = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (str(output_path), time.time(), job_id, worker_id),
+            )
+        return cursor.rowcount == 1
+
+    def fail(self, job_id, worker_id, error):
+        """Record a failed attempt: queue the job again, or mark it failed once it has used up its attempts."""
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= max_attempts THEN 'failed' ELSE 'queued' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated = ? WHERE id = ? AND status = 'running' AND lease_owner = ?",
+                (str(error), time.time(), job_id, worker_id),
+            )
+
+    def counts(self):
+        with self._connect() as db:
+            return {row["status"]: row["n"] for row in db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status")}
+
+    def wait(self, job_id, timeout=None, poll_interval=0.5):
+        """Poll until the job is done or failed (or <timeout> seconds have passed) and return it."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            job = self.get(job_id)
+            if job is None or job["status"] in ("done", "failed") or (deadline is not None and time.monotonic() > deadline):
+                return job
+            time.sleep(poll_interval)
+
+
+class _Connection:
+    """sqlite3 connection that is closed when the with-block exits (sqlite3's own context manager does not close)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self.db
+
+    def __exit__(self, exc_type, *args):
+        if exc_type is not None and self.db.in_transaction:
+            self.db.execute("ROLLBACK")
+        self.db.close()
+
+
+def run_worker(jobs_dir, checkpoints_dir, lease_seconds=60.0, poll_interval=1.0, max_jobs=None, threads=None, **registry_options):
+    """Claim and run jobs until interrupted (or until <max_jobs> jobs have been processed).
+
+    <threads> limits torch's intra-op threads, so that the worker processes of one machine share its cores.
+    """
+    import torch
+    from .inference import load_image
+    from .registry import get_registry
+    from util import util
+
+    if threads:
+        torch.set_num_threads(threads)
+    queue = JobQueue(jobs_dir)
+    registry = get_registry(checkpoints_dir, **registry_options)
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    processed = 0
+    print(f"[{worker_id}] waiting for jobs in {queue.db_path}")
+    while max_jobs is None or processed < max_jobs:
+        job = queue.claim(worker_id, lease_seconds)
+        if job is None:
+            time.sleep(poll_interval)
+            continue
+        stop = threading.Event()
+        heartbeat = threading.Thread(target=_heartbeat, args=(queue, job["id"], worker_id, lease_seconds, stop), daemon=True)
+        heartbeat.start()
+        start = time.perf_counter()
+        try:
+            output_path = queue.results_dir / f"{job['id']}.png"
+            with registry.acquire(job["style"]) as stylizer:
+                fake = stylizer(load_image(job["input_path"]))
+            tmp = output_path.with_suffix(f".{os.getpid()}.tmp")
+            util.im2pil(util.tensor2im(fake)).save(tmp, format="PNG")
+            os.replace(tmp, output_path)
+            if queue.complete(job["id"], worker_id, output_path):
+                print(f"[{worker_id}] job {job['id']} ({job['style']}) done in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            print(f"[{worker_id}] job {job['id']} attempt {job['attempts']}/{job['max_attempts']} failed: {e}")
+            queue.fail(job["id"], worker_id, e)
+        finally:
+            stop.set()
+        processed += 1
+
+
+def _heartbeat(queue, job_id, worker_id, lease_seconds, stop):
+    while not stop.wait(lease_seconds / 3):
+        if not queue.heartbeat(job_id, worker_id, lease_seconds):
+            return
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Asynchronous stylization jobs.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("command", choices=["worker", "submit", "status"], help="run workers, submit images, or show jobs")
+    parser.add_argument("args", nargs="*", help="images to submit, or job IDs to show")
+    parser.add_argument("--jobs_dir", type=str, default=os.environ.get("JOBS_DIR", "./jobs"), help="directory holding the job database, inputs and results")
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--style", type=str, help="style to submit the images with")
+    parser.add_argument("--processes", type=int, default=1, help="number of worker processes")
+    parser.add_argument("--lease_seconds", type=float, default=60.0, help="a job is handed to another worker if its worker is silent for this long")
+    parser.add_argument("--max_attempts", type=int, default=3, help="attempts per job before it is marked failed")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        options = {"compile_cache_dir": os.environ.get("COMPILE_CACHE_DIR"), "precision": os.environ.get("INFERENCE_PRECISION", "fp32")}
+        options["threads"] = max(1, (os.cpu_count() or 1) // args.processes)  # every process gets its share of the cores
+        if args.processes == 1:
+            run_worker(args.jobs_dir, args.checkpoints_dir, args.lease_seconds, **options)
+        else:
+            processes = [multiprocessing.Process(target=run_worker, args=(args.jobs_dir, args.checkpoints_dir, args.lease_seconds), kwargs=options) for _ in range(args.processes)]
+            for p in processes:
+                p.start()
+            for p in processes:
+                p.join()
+    elif args.command == "submit":
+        if not args.style:
+            parser.error("submit requires --style")
+        queue = JobQueue(args.jobs_dir)
+        for path in args.args:
+            print(f"{path} -> job {queue.submit(path, args.style, args.max_attempts)}")
+    else:
+        queue = JobQueue(args.jobs_dir)
+        for job_id in args.args:
+            print(queue.get(job_id))
+        print(queue.counts())
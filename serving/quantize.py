@@ -0,0 +1,127 @@
+"""INT8 post-training static quantization of the style generators.
+
+The fp32 generator is prepared for quantization with FX graph mode (x86 backend), calibrated on a small set of
+images, converted, traced with TorchScript and saved as <style>/latest_net_G_int8.pt, where the 'int8' backend
+(see serving/backends.py) loads it. Handling of the ResNet generator structure:
+    -- ReflectionPad2d:  folded into the following conv (padding_mode='reflect', see <networks.fold_reflection_padding>)
+                         so padded activations stay in int8 instead of round-tripping through fp32;
+    -- InstanceNorm2d:   mapped to the quantized InstanceNorm2d kernel;
+    -- ConvTranspose2d:  quantized with per-tensor weights, the only scheme the x86 kernels support for it;
+    -- residual add:     the skip connection becomes a quantized add with its own observer.
+
+For every style a report compares the int8 model to fp32 on held-out images: latency and speedup, file size,
+PSNR and SSIM of the outputs.
+
+Example:
+    python -m serving.quantize --checkpoints_dir checkpoints --calib_dir datasets/calib --num_calib 32 --num_eval 8
+"""
+
+import argparse
+import copy
+import statistics
+import time
+from argparse import Namespace
+from pathlib import Path
+
+import torch
+from PIL import Image
+
+from . import checkpoints
+from data.base_dataset import get_transform
+from data.image_folder import make_dataset
+from models import networks
+from util import util
+
+
+def int8_path(style_dir, epoch="latest"):
+    return Path(style_dir) / f"{epoch}_net_G_int8.pt"
+
+
+def load_images(image_dir, size, max_images):
+    """Load up to <max_images> images of <image_dir> as 1x3x<size>x<size> tensors in [-1, 1]."""
+    transform = get_transform(Namespace(preprocess="resize", load_size=size, crop_size=size, no_flip=True))
+    return [transform(Image.open(path).convert("RGB")).unsqueeze(0) for path in make_dataset(image_dir, max_images)]
+
+
+def quantize_generator(net, calibration_images):
+    """Return an INT8 GraphModule of <net> calibrated on <calibration_images> (a list of input tensors)."""
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+
+    torch.backends.quantized.engine = "x86"
+    net = networks.fold_reflection_padding(copy.deepcopy(net).cpu().eval())
+    prepared = prepare_fx(net, get_default_qconfig_mapping("x86"), (calibration_images[0],))
+    with torch.no_grad():
+        for image in calibration_images:
+            prepared(image)
+    return convert_fx(prepared)
+
+
+def save_int8(quantized, example, path):
+    """Trace the quantized generator and save it as a TorchScript file."""
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, example, check_trace=False)
+    torch.jit.save(traced, str(path))
+
+
+def load_int8(path):
+    """Load a quantized generator saved by <save_int8>."""
+    if "x86" in torch.backends.quantized.supported_engines:
+        torch.backends.quantized.engine = "x86"
+    return torch.jit.load(str(path), map_location="cpu").eval()
+
+
+def latency(net, image, repeat=5):
+    """Return the median forward time of <net> on <image> in seconds."""
+    times = []
+    with torch.no_grad():
+        net(image)  # warm-up
+        for _ in range(repeat):
+            start = time.perf_counter()
+            net(image)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def compare(fp32, int8, images):
+    """Return a dict with latencies, speedup, PSNR and SSIM of <int8> against <fp32> on <images>."""
+    psnrs, ssims = [], []
+    with torch.no_grad():
+        for image in images:
+            reference, output = fp32(image), int8(image)
+            psnrs.append(util.psnr(output, reference))
+            ssims.append(util.ssim(output, reference))
+    t_fp32, t_int8 = latency(fp32, images[0]), latency(int8, images[0])
+    return {"fp32_s": t_fp32, "int8_s": t_int8, "speedup": t_fp32 / t_int8, "psnr": statistics.mean(psnrs), "ssim": statistics.mean(ssims)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Quantize the style generators to INT8.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--calib_dir", type=str, required=True, help="folder of representative images used for calibration and evaluation")
+    parser.add_argument("--styles", type=str, nargs="*", default=None, help="names of the styles to quantize; all styles by default")
+    parser.add_argument("--num_calib", type=int, default=32, help="number of calibration images")
+    parser.add_argument("--num_eval", type=int, default=8, help="number of held-out images used for the quality report")
+    parser.add_argument("--size", type=int, default=256, help="images are resized to size x size")
+    args = parser.parse_args()
+
+    images = load_images(args.calib_dir, args.size, args.num_calib + args.num_eval)
+    calibration = images[: args.num_calib]
+    evaluation = images[args.num_calib :] or calibration  # small folders: evaluate on the calibration images
+    print(f"calibrating on {len(calibration)} images, evaluating on {len(evaluation)} images")
+
+    for name, style_dir in checkpoints.find_styles(args.checkpoints_dir).items():
+        if args.styles and name not in args.styles:
+            continue
+        fp32 = checkpoints.load_generator(style_dir)
+        path = int8_path(style_dir)
+        save_int8(quantize_generator(fp32, calibration), calibration[0], path)
+        report = compare(fp32, load_int8(path), evaluation)
+        fp32_mb = (Path(style_dir) / "latest_net_G.pth").stat().st_size / 1e6
+        int8_mb = path.stat().st_size / 1e6
+        print(
+            f"[{name}] -> {path}\n"
+            f"    latency: fp32 {report['fp32_s'] * 1000:.1f} ms, int8 {report['int8_s'] * 1000:.1f} ms, speedup {report['speedup']:.2f}x\n"
+            f"    size:    fp32 {fp32_mb:.1f} MB, int8 {int8_mb:.1f} MB ({fp32_mb / int8_mb:.1f}x smaller)\n"
+            f"    quality: PSNR {report['psnr']:.2f} dB, SSIM {report['ssim']:.4f}"
+        )
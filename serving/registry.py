@@ -0,0 +1,229 @@
+"""Registry of the loaded styles with zero-downtime hot swap of checkpoints.
+
+The registry watches <checkpoints_dir>/*/<epoch>_net_G.pth and the accompanying test_opt.txt. When a style appears or
+its files change, the new generator is loaded and warmed up in the background while the current one keeps serving.
+Once it is ready, the registry swaps it in atomically: later requests get the new weights.
+
+Requests hold a <Lease> on the generator they run. A replaced (or deleted) style is retired rather than dropped:
+in-flight requests finish on the old weights, and the old generator is released once its last lease is returned.
+This holds however the checkpoint is replaced (by rename, or overwritten in place with cp or torch.save): generators
+are loaded into memory, not memory-mapped from their files (see <checkpoints.load_generator>).
+
+A checkpoint that is still being copied into place must not be loaded. So a change is only picked up once the files'
+size and mtime have been stable for two consecutive scans. If a new checkpoint fails to load, the old generator keeps
+serving and the failure is logged; the style is retried when its files change again.
+
+Example:
+    >>> registry = get_registry("checkpoints", sizes=(256,))
+    >>> registry.scan()                # load and warm up every style (what serving/warmup.py does at start-up)
+    >>> registry.start_watching()      # then pick up new and changed checkpoints in the background
+    >>> with registry.acquire("style_monet_pretrained") as stylizer:
+    ...     fake = stylizer(real)
+"""
+
+import threading
+import time
+from pathlib import Path
+
+import torch
+
+from . import checkpoints
+from .compile_cache import CompiledGenerator
+from .inference import Stylizer, default_device
+
+
+class Lease:
+    """A request's hold on one version of a style; returned with <release> or by leaving the with-block."""
+
+    def __init__(self, registry, entry):
+        self.registry = registry
+        self.entry = entry
+        self.stylizer = entry.stylizer
+        self.released = False
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            self.stylizer = None  # a lease object that outlives its request must not keep a retired generator alive
+            self.registry._release(self.entry)
+
+    def __enter__(self):
+        return self.stylizer
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+class _Entry:
+    """One loaded version of a style."""
+
+    def __init__(self, name, stylizer, fingerprint):
+        self.name = name
+        self.stylizer = stylizer
+        self.fingerprint = fingerprint
+        self.refs = 0
+        self.retired = False
+
+
+class StyleRegistry:
+    """The loaded styles of a checkpoints directory, swapped in place when their checkpoints change."""
+
+    def __init__(self, checkpoints_dir, epoch="latest", sizes=(256,), **stylizer_options):
+        """Initialize the StyleRegistry class
+
+        Parameters:
+            checkpoints_dir (str) -- directory holding one sub-directory per style
+            epoch (str)           -- which <epoch>_net_G.pth of every style is served
+            sizes (tuple)         -- square sizes a newly loaded generator is warmed up at before it is swapped in
+            stylizer_options      -- keyword arguments of <inference.Stylizer> (device, backend, precision, ...)
+        """
+        self.checkpoints_dir = Path(checkpoints_dir)
+        self.epoch = epoch
+        self.sizes = tuple(sizes)
+        self.stylizer_options = stylizer_options
+        self.entries = {}  # style name -> current _Entry
+        self.seen = {}  # style name -> fingerprint seen by the previous scan, to wait until a copy has settled
+        self.failed = {}  # style name -> fingerprint that failed to load
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()  # one style is loaded at a time
+        self.watcher = None
+
+    def fingerprint(self, style_dir):
+        """Return the (size, mtime) of the checkpoint and of test_opt.txt; it changes whenever either file is replaced."""
+        stats = []
+        for path in (style_dir / f"{self.epoch}_net_G.pth", style_dir / "test_opt.txt"):
+            st = path.stat() if path.is_file() else None
+            stats.append((st.st_size, st.st_mtime_ns) if st else None)
+        return tuple(stats)
+
+    def names(self):
+        with self.lock:
+            return sorted(self.entries)
+
+    def acquire(self, name):
+        """Return a Lease on the current generator of <name>, loading the style first if it is not loaded yet."""
+        with self.lock:
+            entry = self.entries.get(name)
+            if entry is not None:
+                entry.refs += 1
+                return Lease(self, entry)
+        style_dir = self.checkpoints_dir / name
+        self.load(name, style_dir, self.fingerprint(style_dir))
+        return self.acquire(name)
+
+    def _release(self, entry):
+        with self.lock:
+            entry.refs -= 1
+            drained = entry.retired and entry.refs == 0
+        if drained:
+            self._free(entry)
+
+    def _free(self, entry):
+        print(f"released the retired generator of [{entry.name}]")
+        compiled = _compiled(entry.stylizer)
+        if compiled is not None:  # the compile cache holds the retired checkpoint's modules as well
+            with self.lock:
+                in_use = {getattr(_compiled(e.stylizer), "ckpt_hash", None) for e in self.entries.values()}
+            if compiled.ckpt_hash not in in_use:  # a touched but unchanged checkpoint keeps its hash
+                compiled.cache.drop(compiled.ckpt_hash)
+        entry.stylizer = None
+
+    def load(self, name, style_dir, fingerprint):
+        """Load and warm up <style_dir>, then swap it in as the current version of <name>."""
+        with self.load_lock:
+            with self.lock:
+                current = self.entries.get(name)
+                if current is not None and current.fingerprint == fingerprint:
+                    return  # loaded meanwhile by another thread
+            start = time.perf_counter()
+            stylizer = Stylizer(style_dir, epoch=self.epoch, **self.stylizer_options)
+            stylizer.warm_up(self.sizes)
+            entry = _Entry(name, stylizer, fingerprint)
+            with self.lock:
+                old = self.entries.get(name)
+                self.entries[name] = entry
+                if old is not None:
+                    old.retired = True
+                    drained = old.refs == 0
+            action = "swapped in" if old is not None else "loaded"
+            print(f"{action} [{name}] in {time.perf_counter() - start:.2f}s")
+            if old is not None and drained:
+                self._free(old)
+
+    def retire(self, name):
+        """Stop serving a style whose checkpoint was deleted; in-flight requests finish on it."""
+        with self.lock:
+            entry = self.entries.pop(name, None)
+            if entry is None:
+                return
+            entry.retired = True
+            drained = entry.refs == 0
+        print(f"[{name}] was removed from {self.checkpoints_dir}")
+        if drained:
+            self._free(entry)
+
+    def scan(self, settle=False):
+        """Load new and changed styles, retire deleted ones; return the names that were (re)loaded.
+
+        Parameters:
+            settle (bool) -- only pick up a change once its fingerprint is unchanged since the previous scan
+        """
+        styles = checkpoints.find_styles(self.checkpoints_dir, self.epoch)
+        loaded = []
+        for name, style_dir in styles.items():
+            fingerprint = self.fingerprint(style_dir)
+            previous, self.seen[name] = self.seen.get(name), fingerprint
+            with self.lock:
+                current = self.entries.get(name)
+            if (current is not None and current.fingerprint == fingerprint) or self.failed.get(name) == fingerprint:
+                continue
+            if settle and previous != fingerprint:
+                continue  # still being written; look again on the next scan
+            try:
+                self.load(name, style_dir, fingerprint)
+                self.failed.pop(name, None)
+                loaded.append(name)
+            except Exception as e:
+                self.failed[name] = fingerprint
+                print(f"cannot load [{name}], {'keeping the previous version' if current else 'skipping it'}: {e}")
+        for name in set(self.names()) - set(styles):
+            self.retire(name)
+            self.seen.pop(name, None)
+        return loaded
+
+    def start_watching(self, interval=2.0):
+        """Scan the checkpoints directory every <interval> seconds in a background thread (once per registry)."""
+        if self.watcher is None:
+            self.watcher = threading.Thread(target=self._watch, args=(interval,), name="checkpoint-watcher", daemon=True)
+            self.watcher.start()
+        return self.watcher
+
+    def _watch(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.scan(settle=True)
+            except Exception as e:
+                print(f"checkpoint scan failed: {e}")
+
+
+def _compiled(stylizer):
+    """Return the CompiledGenerator a Stylizer runs (directly or as the fallback of its backend), or None."""
+    backend = getattr(stylizer, "netG", None)
+    compiled = getattr(getattr(backend, "fallback", backend), "net", None)
+    return compiled if isinstance(compiled, CompiledGenerator) else None
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(checkpoints_dir, epoch="latest", sizes=(256,), **stylizer_options):
+    """Return the process-wide StyleRegistry of <checkpoints_dir> for these options, creating it on first use."""
+    stylizer_options = {k: v for k, v in stylizer_options.items() if v is not None}
+    stylizer_options["device"] = torch.device(stylizer_options.get("device") or default_device())
+    key = (str(Path(checkpoints_dir).resolve()), epoch, tuple(sorted((k, str(v)) for k, v in stylizer_options.items())))
+    with _registries_lock:
+        if key not in _registries:
+            _registries[key] = StyleRegistry(checkpoints_dir, epoch, sizes, **stylizer_options)
+        return _registries[key]
@@ -0,0 +1,197 @@
+"""Standalone HTTP inference service for the style generators, decoupled from the Streamlit front end.
+
+Only the standard library is used on top of the inference stack: <http.server.ThreadingHTTPServer> speaking
+HTTP/1.1, so clients keep their connections alive between requests. The service pre-forks <--workers> processes
+that share one listening socket (the kernel spreads connections over them), and starts a new worker in place of
+one that dies. Every worker:
+    -- serves a connection per thread but runs at most <--concurrency> stylizations at a time, and limits torch to
+       its share of the CPU cores divided by that, so neither the workers nor their threads oversubscribe the machine;
+    -- warms up every style into its own StyleRegistry (serving/registry.py) before it accepts connections;
+    -- keeps watching the checkpoints directory and hot-swaps new and changed styles.
+
+Endpoints:
+    POST /stylize/<style>  -- body: image bytes (any format PIL reads); response: the stylized image as PNG
+    GET  /styles           -- JSON list of the loaded styles
+    GET  /health           -- 200 once the worker has warmed up
+
+serving/client.py is the matching client with a keep-alive connection pool; main.py uses it when
+INFERENCE_SERVICE_URL is set.
+
+Example:
+    python -m serving.service --checkpoints_dir checkpoints --port 8000 --workers 2
+    curl --data-binary @photo.jpg http://localhost:8000/stylize/style_monet_pretrained -o photo_monet.png
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import re
+import signal
+import socket
+import threading
+import time
+from multiprocessing.connection import wait
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+STYLE_NAME = re.compile(r"^[A-Za-z0-9_][A-Za-z0-9_.-]*$")
+MIN_UPTIME = 10.0  # seconds; a worker that dies sooner is restarted only after this delay
+
+
+class StylizeHandler(BaseHTTPRequestHandler):
+    """Request handler of a service worker; the worker's StyleRegistry is <self.server.registry>."""
+
+    protocol_version = "HTTP/1.1"  # keep-alive
+    server_version = "StylizeService/1.0"
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"ready": True, "pid": os.getpid(), "styles": self.server.registry.names()})
+        elif self.path == "/styles":
+            self._send_json(200, self.server.registry.names())
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if not self.path.startswith("/stylize/"):
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+        style = self.path[len("/stylize/") :].split("?")[0]
+        length = self.headers.get("Content-Length")
+        if length is None:
+            self.close_connection = True  # the body, if any, cannot be told apart from the next request
+            self._send_json(411, {"error": "Content-Length is required"})
+            return
+        length = int(length)
+        if length > self.server.max_body:
+            self.close_connection = True  # the unread body makes the connection unusable
+            self._send_json(413, {"error": f"image larger than {self.server.max_body} bytes"})
+            return
+        body = self.rfile.read(length)
+
+        registry = self.server.registry
+        if not STYLE_NAME.match(style) or not (registry.checkpoints_dir / style / f"{registry.epoch}_net_G.pth").is_file():
+            self._send_json(404, {"error": f"unknown style {style}"})
+            return
+        from .inference import load_image
+        from util import util
+
+        start = time.perf_counter()
+        try:
+            real = load_image(io.BytesIO(body))
+        except Exception as e:
+            self._send_json(400, {"error": f"cannot read the image: {e}"})
+            return
+        try:
+            with self.server.inference_slots, registry.acquire(style) as stylizer:
+                fake = stylizer(real)
+            output = io.BytesIO()
+            util.im2pil(util.tensor2im(fake)).save(output, format="PNG")
+        except Exception as e:
+            self._send_json(500, {"error": f"stylization failed: {e}"})
+            return
+        self._send(200, output.getvalue(), "image/png", {"X-Inference-Seconds": f"{time.perf_counter() - start:.3f}"})
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode(), "application/json")
+
+    def _send(self, status, body, content_type, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        print(f"[worker {os.getpid()}] {self.address_string()} {format % args}")
+
+
+def serve(sock, checkpoints_dir, sizes, threads, concurrency, max_body, **registry_options):
+    """Run one worker: warm up every style, then serve requests on the shared listening socket <sock>.
+
+    Connections are served by one thread each, but at most <concurrency> of them run a generator at a time, each
+    with <threads> torch threads; the others wait for a slot.
+    """
+    import torch
+    from .warmup import warm_up
+
+    torch.set_num_threads(threads)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    registry = warm_up(checkpoints_dir, sizes, signal_ready=False, **registry_options)
+    registry.start_watching()
+
+    server = ThreadingHTTPServer(sock.getsockname()[:2], StylizeHandler, bind_and_activate=False)
+    server.socket.close()
+    server.socket = sock
+    server.server_name, server.server_port = socket.getfqdn(sock.getsockname()[0]), sock.getsockname()[1]
+    server.daemon_threads = True
+    server.registry = registry
+    server.max_body = max_body
+    server.inference_slots = threading.BoundedSemaphore(concurrency)
+    print(f"[worker {os.getpid()}] serving {registry.names()}, {concurrency} at a time with {threads} threads each")
+    server.serve_forever()
+
+
+def run(host, port, workers, checkpoints_dir, sizes, max_body, concurrency=1, **registry_options):
+    """Bind the listening socket, fork <workers> worker processes on it and supervise them (Ctrl-C/SIGTERM stops all).
+
+    A worker that exits is replaced by a new one; one that dies within <MIN_UPTIME> seconds of its start is replaced
+    only after that delay, so a worker that cannot start does not spin.
+    """
+    sock = socket.create_server((host, port), backlog=128)
+    threads = max(1, (os.cpu_count() or 1) // (workers * concurrency))
+    context = multiprocessing.get_context("fork")  # the workers inherit the listening socket
+
+    def start():
+        p = context.Process(target=serve, args=(sock, checkpoints_dir, sizes, threads, concurrency, max_body), kwargs=registry_options, daemon=True)
+        p.start()
+        return p, time.monotonic()
+
+    processes = [start() for _ in range(workers)]
+    print(f"stylize service listening on http://{host}:{port} with {workers} workers")
+    stopping = False
+
+    def stop(*args):
+        nonlocal stopping
+        stopping = True
+        for p, _ in processes:
+            p.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while not stopping:
+            wait([p.sentinel for p, _ in processes])
+            for i, (p, started) in enumerate(processes):
+                if p.is_alive() or stopping:
+                    continue
+                print(f"worker {p.pid} exited with code {p.exitcode}, starting a new one")
+                time.sleep(max(0.0, MIN_UPTIME - (time.monotonic() - started)))
+                processes[i] = start()
+    except KeyboardInterrupt:
+        stop()
+    finally:
+        for p, _ in processes:
+            p.join()
+        sock.close()
+
+
+if __name__ == "__main__":
+    from .warmup import sizes_from_env
+
+    parser = argparse.ArgumentParser(description="Serve the style generators over HTTP.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8000, help="port to listen on")
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("SERVICE_WORKERS", 2)), help="number of worker processes")
+    parser.add_argument("--concurrency", type=int, default=int(os.environ.get("SERVICE_CONCURRENCY", 1)), help="stylizations a worker runs at a time; its CPU cores are split between them")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(sizes_from_env()), help="square processing sizes every worker warms up at")
+    parser.add_argument("--max_body", type=int, default=50 << 20, help="largest accepted image, in bytes")
+    parser.add_argument("--compile_cache_dir", type=str, default=os.environ.get("COMPILE_CACHE_DIR"), help="compile cache the workers share")
+    parser.add_argument("--precision", type=str, default=os.environ.get("INFERENCE_PRECISION", "fp32"), help="fp32 | bf16 | auto")
+    parser.add_argument("--channels_last", action="store_true", default=os.environ.get("INFERENCE_CHANNELS_LAST", "0") == "1", help="run the generators in channels_last")
+    args = parser.parse_args()
+    run(args.host, args.port, args.workers, Path(args.checkpoints_dir), tuple(args.sizes), args.max_body, args.concurrency, compile_cache_dir=args.compile_cache_dir, precision=args.precision, channels_last=args.channels_last)
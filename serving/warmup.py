@@ -0,0 +1,114 @@
+"""Start-up warm-up of the style generators and the readiness signal that gates traffic on it.
+
+Without a warm-up, the first request for each style pays for loading its checkpoint, for oneDNN's kernel
+selection at the request's input size and for growing the allocator's pools. <warm_up> does this work up front
+for every style found under the checkpoints directory:
+    -- the style is loaded into the process-wide StyleRegistry (serving/registry.py) requests acquire it from;
+    -- with a compile cache, the artifacts of the warm-up sizes are compiled (or loaded from disk);
+    -- dummy forward passes run at every warm-up size, so kernels and buffers are ready for real inputs
+       (see <Stylizer.warm_up>).
+
+Readiness is a marker file (READINESS_FILE, default /tmp/stylizer.ready): it is removed when a warm-up starts
+and written once the warm-up has finished, so an orchestrator health check like 'test -f $READINESS_FILE' holds
+traffic until then. A style that fails to warm up is logged and skipped; it is loaded on its first request.
+
+The readiness file must be written by the process that serves the styles: serving/app.py starts <start_warm_up>
+in the Streamlit server process when the server starts, and the warm-up then keeps watching the checkpoints
+directory for new and changed styles. main.py calls <start_warm_up> too (a no-op if the launcher already started it),
+so a plain 'streamlit run main.py' warms up on its first session, without touching the readiness file.
+
+Run as a module, this fills the on-disk compile cache ahead of time (e.g. while building an image); it does not
+signal readiness, since the process exits once it is done.
+
+Example:
+    python -m serving.warmup --checkpoints_dir checkpoints --sizes 256 512 --compile_cache_dir compiled
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+from .registry import get_registry
+
+WARMUP_SIZES = (256,)
+
+
+def readiness_file(environ=os.environ):
+    return Path(environ.get("READINESS_FILE", "/tmp/stylizer.ready"))
+
+
+def is_ready(path=None):
+    return (path or readiness_file()).is_file()
+
+
+def mark_ready(path=None, styles=()):
+    path = path or readiness_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("\n".join(styles) + "\n")
+
+
+def clear_ready(path=None):
+    (path or readiness_file()).unlink(missing_ok=True)
+
+
+def sizes_from_env(environ=os.environ):
+    """Read the warm-up sizes from WARMUP_SIZES, e.g. '256,512' (default: 256)."""
+    value = environ.get("WARMUP_SIZES")
+    return tuple(int(size) for size in value.split(",")) if value else WARMUP_SIZES
+
+
+def warm_up(checkpoints_dir, sizes=WARMUP_SIZES, ready_path=None, signal_ready=True, **registry_options):
+    """Load and warm up every style of <checkpoints_dir>, then write the readiness file.
+
+    Parameters:
+        checkpoints_dir (str) -- directory holding the style checkpoints
+        sizes (tuple)         -- square processing sizes every style is warmed up at
+        ready_path (Path)     -- the readiness file; READINESS_FILE by default
+        signal_ready (bool)   -- if False, the readiness file is left alone (another process owns it)
+        registry_options      -- keyword arguments of <registry.get_registry> (epoch, device, backend, precision, ...)
+
+    Returns the StyleRegistry holding the warmed-up styles. Per-style load and warm-up times are logged by the registry.
+    """
+    if signal_ready:
+        clear_ready(ready_path)
+    start = time.perf_counter()
+    registry = get_registry(checkpoints_dir, sizes=sizes, **registry_options)
+    registry.scan()
+    names = registry.names()
+    if signal_ready:
+        mark_ready(ready_path, names)
+    print(f"warm-up finished: {len(names)} styles at sizes {list(sizes)} in {time.perf_counter() - start:.2f}s")
+    return registry
+
+
+_warm_up_thread = None
+
+
+def start_warm_up(checkpoints_dir, sizes=WARMUP_SIZES, watch_interval=2.0, **kwargs):
+    """Run <warm_up> in a background thread, once per process, then watch the checkpoints for hot swaps."""
+    global _warm_up_thread
+
+    def run():
+        warm_up(checkpoints_dir, sizes, **kwargs).start_watching(watch_interval)
+
+    if _warm_up_thread is None:
+        _warm_up_thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        _warm_up_thread.start()
+    return _warm_up_thread
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compile (and check) every style generator into the compile cache.", formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    parser.add_argument("--checkpoints_dir", type=str, default="./checkpoints", help="directory holding the style checkpoints")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(sizes_from_env()), help="square processing sizes to compile for")
+    parser.add_argument("--compile_cache_dir", type=str, default=os.environ.get("COMPILE_CACHE_DIR"), help="compile cache to populate")
+    parser.add_argument("--precision", type=str, default=os.environ.get("INFERENCE_PRECISION", "fp32"), help="fp32 | bf16 | auto, as served by the app")
+    parser.add_argument("--channels_last", action="store_true", default=os.environ.get("INFERENCE_CHANNELS_LAST", "0") == "1", help="channels_last, as served by the app")
+    args = parser.parse_args()
+    if not args.compile_cache_dir:
+        print("no compile cache to populate; the serving process warms up its own styles (see serving/app.py)")
+        sys.exit(0)
+    warm_up(args.checkpoints_dir, tuple(args.sizes), signal_ready=False, compile_cache_dir=args.compile_cache_dir, precision=args.precision, channels_last=args.channels_last)
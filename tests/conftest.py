@@ -0,0 +1,28 @@
+"""Test setup: make the app modules (serving, translation_manager) and the vendored CycleGAN packages (models, data,
+util) importable, and provide a small style checkpoint."""
+
+import sys
+from pathlib import Path
+
+import pytest
+import torch
+
+ROOT = Path(__file__).resolve().parent.parent
+for path in (ROOT, ROOT / "Cyclegan"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+
+@pytest.fixture(scope="session")
+def style_dir(tmp_path_factory):
+    """A small randomly initialized style checkpoint (ResNet generator, 6 blocks, ngf 8) in the layout of checkpoints/."""
+    from models import networks
+
+    style_dir = tmp_path_factory.mktemp("checkpoints") / "style_small"
+    style_dir.mkdir()
+    options = {"input_nc": 3, "output_nc": 3, "ngf": 8, "netG": "resnet_6blocks", "norm": "instance", "no_dropout": True}
+    (style_dir / "test_opt.txt").write_text("".join(f"{key:>25}: {value}\n" for key, value in options.items()))
+    torch.manual_seed(0)
+    net = networks.define_G(options["input_nc"], options["output_nc"], options["ngf"], options["netG"], options["norm"], not options["no_dropout"])
+    torch.save(net.state_dict(), style_dir / "latest_net_G.pth")
+    return style_dir
@@ -0,0 +1,50 @@
+import threading
+import time
+
+import torch
+
+from serving import checkpoints
+from serving.compile_cache import CompileCache, wrap_generator
+from util import util
+
+
+def test_compiled_output_matches_eager(style_dir, tmp_path):
+    net = checkpoints.load_generator(style_dir)
+    compiled = wrap_generator(net, style_dir / "latest_net_G.pth", tmp_path)
+    image = util.natural_image(3, 64)
+    compiled.prepare(tuple(image.shape))
+    assert compiled.cache.artifact_path(compiled.cache.key(compiled.ckpt_hash, "float32", tuple(image.shape))).is_file()
+    with torch.no_grad():
+        torch.testing.assert_close(compiled(image), net(image), atol=1e-5, rtol=0)
+        smaller = image[:, :, :40, :56]  # same bucket, other size: outputs never depend on the bucket
+        torch.testing.assert_close(compiled(smaller), net(smaller), atol=1e-5, rtol=0)
+
+
+def test_concurrent_requests_load_an_artifact_once(style_dir, tmp_path):
+    net = checkpoints.load_generator(style_dir)
+    key = CompileCache(tmp_path).key(checkpoints.checkpoint_hash(style_dir / "latest_net_G.pth"), "float32", (1, 3, 64, 64))
+    CompileCache(tmp_path).compile(net, key)
+    cache = CompileCache(tmp_path)  # a restarted process: the artifact is on disk only
+    loads, load = [], cache._load
+
+    def slow_load(*args):  # long enough for every thread to ask while the first one loads
+        loads.append(args)
+        time.sleep(0.2)
+        return load(*args)
+
+    cache._load = slow_load
+    modules = []
+    threads = [threading.Thread(target=lambda: modules.append(cache.get(key))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(loads) == 1
+    assert len(modules) == 8 and all(module is modules[0] is not None for module in modules)
+
+
+def test_precisions_are_separate_artifacts(tmp_path):
+    cache = CompileCache(tmp_path)
+    fp32, bf16 = cache.key("abc", "float32", (1, 3, 64, 64)), cache.key("abc", "bfloat16-channels_last", (1, 3, 64, 64))
+    assert fp32 != bf16 and cache.artifact_path(fp32) != cache.artifact_path(bf16)
+    assert cache.key("abc", "float32", (1, 3, 50, 60)) == fp32  # shapes of one bucket share it
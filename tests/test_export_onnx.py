@@ -0,0 +1,28 @@
+import pytest
+import torch
+
+from serving import checkpoints
+from serving.backends import create_backend
+from serving.export_onnx import export_generator, onnx_path
+from util import util
+
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+
+@pytest.fixture(scope="module")
+def onnx_style(style_dir):
+    max_diff = export_generator(style_dir, size=64)
+    assert max_diff < 1e-4  # the export's own check, at another shape than the traced one
+    yield style_dir
+    onnx_path(style_dir).unlink()
+
+
+@pytest.mark.parametrize("batch, height, width", [(1, 64, 64), (2, 48, 80)])
+def test_onnxruntime_output_matches_torch(onnx_style, batch, height, width):
+    backend = create_backend(checkpoints.load_generator(onnx_style), onnx_style, backend="onnxruntime")
+    assert backend.name == "onnxruntime"
+    image = torch.cat([util.natural_image(3, 128, seed) for seed in range(batch)])[:, :, :height, :width]
+    with torch.no_grad():
+        expected = checkpoints.load_generator(onnx_style)(image)
+    torch.testing.assert_close(backend(image), expected, atol=1e-4, rtol=0)
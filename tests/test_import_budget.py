@@ -0,0 +1,9 @@
+import pytest
+
+from serving import import_budget
+
+
+@pytest.mark.parametrize("module", sorted(import_budget.BUDGETS))
+def test_entry_point_imports_no_optional_package(module):
+    _, _, forbidden = import_budget.measure(module, repeat=1)
+    assert forbidden == []
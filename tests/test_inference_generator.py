@@ -0,0 +1,34 @@
+import pytest
+import torch
+
+from models.inference_generator import PrepackedGenerator, to_inference_generator
+from serving import checkpoints
+from util import util
+
+
+@pytest.fixture(scope="module")
+def frames():
+    """Two uint8 2x48x64x3 frames and the same frames as the normalized input of the training graph."""
+    image = torch.cat([util.natural_image(3, 64, seed) for seed in range(2)])[:, :, :48, :]
+    uint8 = ((image + 1) * 127.5).round().to(torch.uint8).permute(0, 2, 3, 1).contiguous()
+    return uint8, uint8.permute(0, 3, 1, 2).float() / 127.5 - 1
+
+
+def reference(net, normalized):
+    with torch.no_grad():
+        return torch.stack([torch.from_numpy(util.tensor2im(output.unsqueeze(0))) for output in net(normalized)])
+
+
+@pytest.mark.parametrize("prepacked", [False, True])
+def test_uint8_output_matches_training_graph(style_dir, frames, prepacked):
+    net = checkpoints.load_generator(style_dir)
+    uint8, normalized = frames
+    fast = PrepackedGenerator(to_inference_generator(net)) if prepacked else to_inference_generator(net)
+    with torch.no_grad():
+        output = fast(uint8)
+        # eager: HxWx3 in, HxWx3 out; prepacked: the trace fixes NxHxWx3 inputs, but not their batch size
+        single = fast(uint8[:1])[0] if prepacked else fast(uint8[0])
+    expected = reference(net, normalized)
+    assert output.dtype == torch.uint8 and output.shape == expected.shape
+    assert (output.int() - expected.int()).abs().max() <= 1  # within one intensity level
+    assert torch.equal(single, output[0])
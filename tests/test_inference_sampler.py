@@ -0,0 +1,18 @@
+import pytest
+
+from data.inference_sampler import InferenceSampler
+
+
+@pytest.mark.parametrize("world_size", [1, 2, 3, 4, 7])
+@pytest.mark.parametrize("n", [0, 1, 5, 6, 12])
+def test_every_input_is_stylized_exactly_once(n, world_size):
+    shares = [list(InferenceSampler(range(n), num_replicas=world_size, rank=rank)) for rank in range(world_size)]
+    assert sorted(i for share in shares for i in share) == list(range(n))  # no padding, nothing dropped
+
+
+@pytest.mark.parametrize("world_size", [2, 3, 4, 7])
+def test_ranks_get_strided_shares_in_dataset_order(world_size):
+    for rank in range(world_size):
+        sampler = InferenceSampler(range(10), num_replicas=world_size, rank=rank)
+        assert list(sampler) == list(range(rank, 10, world_size))
+        assert len(sampler) == len(range(rank, 10, world_size))
@@ -0,0 +1,74 @@
+import hashlib
+import os
+
+import pytest
+
+from util import manifest as manifest_module
+from util.manifest import Manifest
+
+
+@pytest.fixture
+def run_dir(tmp_path):
+    """An input file and a results directory holding the one result file of it."""
+    source = tmp_path / "photo.png"
+    source.write_bytes(b"photo content")
+    results = tmp_path / "results"
+    (results / "images").mkdir(parents=True)
+    (results / "images" / "photo_fake.png").write_bytes(b"result")
+    return source, results
+
+
+def finish(path, source, checkpoint="ckpt"):
+    """Record <source> as done in a fresh manifest at <path>, the way test.py does."""
+    manifest = Manifest(path, checkpoint)
+    manifest.loaded([str(source)], [hashlib.sha256(source.read_bytes()).hexdigest()])
+    manifest.add(str(source), [["fake", "photo_fake.png"]])
+    manifest.close()
+
+
+def test_resume_skips_finished_inputs(run_dir):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    assert Manifest(results / "manifest.jsonl", "ckpt", resume=True).finished([str(source), "other.png"]) == {str(source)}
+
+
+def test_unchanged_inputs_are_not_hashed_again(run_dir, monkeypatch):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    monkeypatch.setattr(manifest_module, "file_sha256", lambda path: pytest.fail(f"{path} was hashed"))
+    assert Manifest(results / "manifest.jsonl", "ckpt", resume=True).finished([str(source)]) == {str(source)}
+
+
+def test_touched_input_with_same_content_is_finished(run_dir):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    st = os.stat(source)
+    os.utime(source, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert Manifest(results / "manifest.jsonl", "ckpt", resume=True).finished([str(source)]) == {str(source)}
+
+
+@pytest.mark.parametrize("change", ["content", "checkpoint", "output"])
+def test_changed_inputs_are_stylized_again(run_dir, change):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    if change == "content":
+        source.write_bytes(b"another photo")
+    elif change == "output":
+        (results / "images" / "photo_fake.png").unlink()
+    checkpoint = "new ckpt" if change == "checkpoint" else "ckpt"
+    assert Manifest(results / "manifest.jsonl", checkpoint, resume=True).finished([str(source)]) == set()
+
+
+def test_line_cut_short_by_a_crash_is_ignored(run_dir):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    with open(results / "manifest.jsonl", "at") as f:
+        f.write('{"input": "other.png", "sha2')
+    assert Manifest(results / "manifest.jsonl", "ckpt", resume=True).finished([str(source), "other.png"]) == {str(source)}
+
+
+def test_without_resume_the_manifest_starts_empty(run_dir):
+    source, results = run_dir
+    finish(results / "manifest.jsonl", source)
+    Manifest(results / "manifest.jsonl", "ckpt").close()
+    assert Manifest(results / "manifest.jsonl", "ckpt", resume=True).finished([str(source)]) == set()
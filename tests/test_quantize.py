@@ -0,0 +1,38 @@
+import pytest
+import torch
+
+from serving import checkpoints
+from serving.backends import create_backend
+from serving.quantize import int8_path, load_int8, quantize_generator, save_int8
+from util import util
+
+pytestmark = pytest.mark.skipif("x86" not in torch.backends.quantized.supported_engines, reason="the x86 quantization engine is not available")
+
+MIN_PSNR = 25.0  # dB on the 0-255 scale, against the fp32 output; 8-bit activations typically reach 26-30 dB
+
+
+@pytest.fixture(scope="module")
+def int8_style(style_dir):
+    fp32 = checkpoints.load_generator(style_dir)
+    calibration = [util.natural_image(3, 64, seed) for seed in range(4)]
+    save_int8(quantize_generator(fp32, calibration), calibration[0], int8_path(style_dir))
+    yield style_dir
+    int8_path(style_dir).unlink()
+
+
+@pytest.mark.parametrize("height, width", [(64, 64), (96, 128)])  # traced at 64x64; served at any size
+def test_int8_output_matches_fp32(int8_style, height, width):
+    fp32, int8 = checkpoints.load_generator(int8_style), load_int8(int8_path(int8_style))
+    image = util.natural_image(3, 128, seed=10)[:, :, :height, :width]  # not one of the calibration images
+    with torch.no_grad():
+        reference, output = fp32(image), int8(image)
+    assert output.shape == reference.shape
+    assert util.psnr(output, reference) >= MIN_PSNR
+
+
+def test_int8_backend_serves_the_quantized_generator(int8_style):
+    backend = create_backend(checkpoints.load_generator(int8_style), int8_style, backend="int8")
+    assert backend.name == "int8"
+    image = util.natural_image(3, 64, seed=11)
+    with torch.no_grad():
+        assert util.psnr(backend(image), checkpoints.load_generator(int8_style)(image)) >= MIN_PSNR
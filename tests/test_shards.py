@@ -0,0 +1,58 @@
+import hashlib
+import pickle
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from data.shards import ShardReader, ShardWriter
+from pack_shards import load_payload
+
+
+@pytest.fixture
+def images(tmp_path):
+    """Five PNG files of different sizes."""
+    rng = np.random.default_rng(0)
+    paths = []
+    for i in range(5):
+        path = tmp_path / "images" / f"im{i}.png"
+        path.parent.mkdir(exist_ok=True)
+        Image.fromarray(rng.integers(0, 256, (8 + 4 * i, 12 + 2 * i, 3), dtype=np.uint8)).save(path)
+        paths.append(path)
+    return paths
+
+
+def pack(paths, directory, payload):
+    writer = ShardWriter(directory, payload, shard_bytes=600)  # small shards: the samples span several files
+    for path in paths:
+        data, size, sha256 = load_payload(path, payload)
+        writer.add(data, size, path, sha256)
+    writer.close()
+    return ShardReader(directory)
+
+
+@pytest.mark.parametrize("payload", ["encoded", "raw"])
+def test_pack_read_round_trip(images, tmp_path, payload):
+    reader = pack(images, tmp_path / "packed", payload)
+    assert reader.meta["shards"] > 1
+    assert reader.paths == [str(path) for path in images]
+    for i, path in enumerate(images):
+        with Image.open(path) as original:
+            assert reader.size(i) == original.size
+            assert np.array_equal(np.asarray(reader.image(i)), np.asarray(original.convert("RGB")))
+        assert reader.content_hash(i) == hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+def test_reader_is_sent_to_workers_without_its_maps(images, tmp_path):
+    reader = pack(images, tmp_path / "packed", "encoded")
+    reader.image(0)
+    copy = pickle.loads(pickle.dumps(reader))
+    assert reader.maps and not copy.maps
+    assert np.array_equal(np.asarray(copy.image(3)), np.asarray(reader.image(3)))
+
+
+def test_packs_without_hashes_have_no_content_hash(images, tmp_path):
+    pack(images, tmp_path / "packed", "encoded")
+    with np.load(tmp_path / "packed" / "index.npz") as index:
+        np.savez(tmp_path / "packed" / "index.npz", **{key: index[key] for key in index.files if key != "sha256"})
+    assert ShardReader(tmp_path / "packed").content_hash(0) is None
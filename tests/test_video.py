@@ -0,0 +1,82 @@
+import queue
+import threading
+
+import numpy as np
+import torch
+from PIL import Image
+
+from util.video import StageStats, VideoStylizer, iter_gif_frames
+
+
+class CountingIdentity(torch.nn.Module):
+    """Return the input unchanged and record the batch size of every forward pass."""
+
+    def __init__(self):
+        super().__init__()
+        self.batches = []
+
+    def forward(self, input):
+        self.batches.append(input.shape[0])
+        return input
+
+
+def scenes(n_scenes=3, frames_per_scene=4, size=(32, 48)):
+    """Frames of <n_scenes> unrelated random scenes, each held for <frames_per_scene> frames with a slight flicker."""
+    rng = np.random.default_rng(0)
+    frames = []
+    for _ in range(n_scenes):
+        scene = rng.integers(0, 250, (*size, 3), dtype=np.uint8)
+        frames += [scene + i % 2 for i in range(frames_per_scene)]
+    return frames
+
+
+def write_gif(path, frames, duration=40):
+    images = [Image.fromarray(frame) for frame in frames]
+    images[0].save(path, save_all=True, append_images=images[1:], duration=duration, loop=0)
+
+
+def test_stable_frames_reuse_the_keyframe_output(tmp_path):
+    write_gif(tmp_path / "clip.gif", scenes())
+    net = CountingIdentity()
+    stylizer = VideoStylizer(net, "cpu", batch_size=8)
+    stats = stylizer.run(tmp_path / "clip.gif", tmp_path / "out.gif")
+    assert sum(net.batches) == 3  # one keyframe per scene
+    assert stylizer.reused == 9
+    assert stats["encode"].frames == 12
+    assert sum(duration for _, duration in iter_gif_frames(tmp_path / "out.gif")) == 12 * 40  # no frame is lost
+
+
+def test_no_reuse_when_disabled(tmp_path):
+    write_gif(tmp_path / "clip.gif", scenes())
+    net = CountingIdentity()
+    stylizer = VideoStylizer(net, "cpu", batch_size=8, diff_threshold=0)
+    stylizer.run(tmp_path / "clip.gif", tmp_path / "out.gif")
+    assert sum(net.batches) == 12 and stylizer.reused == 0
+
+
+def test_output_frames_follow_the_stream_order(tmp_path):
+    frames = scenes()
+    write_gif(tmp_path / "clip.gif", frames)
+    VideoStylizer(CountingIdentity(), "cpu", batch_size=2).run(tmp_path / "clip.gif", tmp_path / "out.gif")
+    outputs = [frame for frame, _ in iter_gif_frames(tmp_path / "out.gif")]  # identical frames are merged by the GIF writer
+    keyframes = frames[::4]
+    assert len(outputs) == len(keyframes)
+    for i, output in enumerate(outputs):  # up to palette quantization, each output is its own scene's keyframe
+        assert np.argmin([np.abs(output.astype(int) - keyframe.astype(int)).mean() for keyframe in keyframes]) == i
+
+
+def test_reused_frames_do_not_wait_for_a_full_batch():
+    stylizer = VideoStylizer(CountingIdentity(), "cpu", batch_size=8)
+    stylizer.stats, stylizer.reused = {"infer": StageStats("infer")}, 0
+    decoded, stylized = queue.Queue(), queue.Queue()
+    thread = threading.Thread(target=stylizer._infer, args=(decoded, stylized), daemon=True)
+    thread.start()
+    keyframe = np.zeros((8, 8, 3), dtype=np.uint8)
+    decoded.put((keyframe, 40))
+    for _ in range(3):
+        decoded.put((None, 40))  # a static clip: no further keyframe arrives
+    outputs = [stylized.get(timeout=5) for _ in range(4)]  # the stream has not ended
+    assert all(np.array_equal(frame, keyframe) for frame, _ in outputs)
+    decoded.put(None)
+    thread.join(5)
+    assert stylized.get(timeout=5) is None
@@ -2,7 +2,6 @@ import json
 import os
 from pathlib import Path
 from typing import Dict, Any, Optional
-import streamlit as st
 
 class TranslationManager:
     """Manager for downloading and managing translations from JSON files"""
@@ -118,10 +117,15 @@ class TranslationManager:
             for code in self.available_languages.keys()
         }
     
-    @st.cache_resource
+    @staticmethod
     def get_cached_instance():
         """Cached instance of the translation manager for Streamlit"""
-        return TranslationManager()
+        import streamlit as st  # only the Streamlit app needs it; workers and CLI jobs must not import it
+
+        return st.cache_resource(_create_translation_manager)()
+
+def _create_translation_manager() -> TranslationManager:
+    return TranslationManager()
 
 _translator = None
 